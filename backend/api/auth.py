@@ -2,33 +2,87 @@
 Authentication API endpoints
 """
 from datetime import datetime, timedelta
-from fastapi import APIRouter, Depends, HTTPException, status, Response
-from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-from core.database import get_db
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Response
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
 from core.auth import (
     authenticate_user, 
     create_access_token, 
+    create_refresh_token,
+    decode_refresh_token,
+    decode_token,
     get_current_active_user,
-    ACCESS_TOKEN_EXPIRE_HOURS
+    hash_token,
+    verified_token_cache,
+    ACCESS_TOKEN_EXPIRE_MINUTES,
+    REFRESH_TOKEN_EXPIRE_DAYS
 )
+from core.token_revocation import token_revocations
+from core.user_cache import UserPrincipal, user_principal_cache
 from models.user import User
-from schemas.auth import LoginRequest, LoginResponse, UserResponse, ErrorResponse
+from services.user_activity import user_activity
+from schemas.auth import LoginRequest, LoginResponse, RefreshRequest, UserResponse, ErrorResponse
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# The refresh cookie is only sent to the auth endpoints
+REFRESH_COOKIE_PATH = "/auth"
+
+
+def issue_tokens(response: Response, user: User, user_response: UserResponse) -> LoginResponse:
+    """Create an access/refresh token pair and set both HttpOnly cookies"""
+    access_token = create_access_token(
+        data={
+            "sub": str(user.id),
+            "email": user.email,
+            "role": user.role.value
+        },
+        expires_delta=timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_refresh_token(user.id)
+    
+    # Set HttpOnly cookies
+    response.set_cookie(
+        key="access_token",
+        value=access_token,
+        httponly=True,
+        secure=False,  # Set to True in production with HTTPS
+        samesite="lax",
+        max_age=ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    )
+    response.set_cookie(
+        key="refresh_token",
+        value=refresh_token,
+        httponly=True,
+        secure=False,  # Set to True in production with HTTPS
+        samesite="lax",
+        path=REFRESH_COOKIE_PATH,
+        max_age=REFRESH_TOKEN_EXPIRE_DAYS * 86400
+    )
+    
+    return LoginResponse(
+        access_token=access_token,
+        token_type="bearer",
+        expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+        refresh_token=refresh_token,
+        user=user_response
+    )
 
 
 @router.post("/login", response_model=LoginResponse)
 async def login(
     login_data: LoginRequest,
     response: Response,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Login endpoint - authenticate user and return JWT token"""
     
     # Authenticate user
-    user = authenticate_user(db, login_data.email, login_data.password)
+    user = await authenticate_user(db, login_data.email, login_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -42,57 +96,129 @@ async def login(
             detail="Inactive user account"
         )
     
-    # Create access token
-    access_token_expires = timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
-    access_token = create_access_token(
-        data={
-            "sub": str(user.id),
-            "email": user.email,
-            "role": user.role.value
-        },
-        expires_delta=access_token_expires
-    )
+    # Update last login (buffered and written in bulk, login itself stays read-only)
+    last_login = user_activity.record(user.id, "last_login")
     
-    # Update last login
-    user.last_login = datetime.utcnow()
-    db.commit()
+    return issue_tokens(response, user, UserResponse.from_orm(user).copy(update={"last_login": last_login}))
+
+
+@router.post("/refresh", response_model=LoginResponse)
+async def refresh(
+    request: Request,
+    response: Response,
+    refresh_data: Optional[RefreshRequest] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Exchange a refresh token for a new token pair without re-entering the password
+
+    Refresh tokens are single-use: the presented token is revoked, so a
+    replayed (stolen) refresh token is rejected.
+    """
+    token = (refresh_data.refresh_token if refresh_data else None) or request.cookies.get("refresh_token")
+    if not token:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token missing"
+        )
+    payload = decode_refresh_token(token)
     
-    # Set HttpOnly cookie
-    response.set_cookie(
-        key="access_token",
-        value=access_token,
-        httponly=True,
-        secure=False,  # Set to True in production with HTTPS
-        samesite="lax",
-        max_age=ACCESS_TOKEN_EXPIRE_HOURS * 3600  # Convert hours to seconds
-    )
+    user = await db.get(User, int(payload["sub"]))
+    if user is None or not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token"
+        )
     
-    return LoginResponse(
-        access_token=access_token,
-        token_type="bearer",
-        expires_in=ACCESS_TOKEN_EXPIRE_HOURS * 3600,
-        user=UserResponse.from_orm(user)
+    rotated = await token_revocations.revoke(
+        db, payload["jti"], "refresh", datetime.utcfromtimestamp(payload["exp"]), user.id
     )
+    if not rotated:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Refresh token has been revoked"
+        )
+    
+    return issue_tokens(response, user, UserResponse.from_orm(user))
+
+
+async def load_user_response(db: AsyncSession, principal: UserPrincipal) -> UserResponse:
+    """Full user record for the profile endpoints (the principal only carries auth fields)"""
+    user = await db.get(User, principal.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return UserResponse.from_orm(user)
 
 
 @router.get("/me", response_model=UserResponse)
 async def get_current_user_info(
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user information"""
-    return UserResponse.from_orm(current_user)
+    return await load_user_response(db, current_user)
 
 
 @router.post("/logout")
-async def logout(response: Response):
-    """Logout endpoint - clear authentication cookie"""
+async def logout(
+    request: Request,
+    response: Response,
+    refresh_data: Optional[RefreshRequest] = None,
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Logout endpoint - revoke the presented tokens and clear the cookies"""
+    access_token = credentials.credentials if credentials else request.cookies.get("access_token")
+    if access_token:
+        try:
+            token_data = decode_token(access_token)
+            if token_data.jti and token_data.exp:
+                await token_revocations.revoke(
+                    db, token_data.jti, "access", datetime.utcfromtimestamp(token_data.exp), token_data.user_id
+                )
+            verified_token_cache.invalidate(hash_token(access_token))
+        except HTTPException:
+            pass  # Already invalid, nothing to revoke
+    
+    refresh_token = (refresh_data.refresh_token if refresh_data else None) or request.cookies.get("refresh_token")
+    if refresh_token:
+        try:
+            payload = decode_refresh_token(refresh_token)
+            await token_revocations.revoke(
+                db, payload["jti"], "refresh", datetime.utcfromtimestamp(payload["exp"]), int(payload["sub"])
+            )
+        except HTTPException:
+            pass
+    
     response.delete_cookie(key="access_token")
+    response.delete_cookie(key="refresh_token", path=REFRESH_COOKIE_PATH)
     return {"message": "Successfully logged out"}
 
 
 @router.get("/verify", response_model=UserResponse)
 async def verify_token(
-    current_user: User = Depends(get_current_active_user)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Verify if token is valid and return user info"""
-    return UserResponse.from_orm(current_user)
+    return await load_user_response(db, current_user)
+
+
+@router.get("/cache-stats")
+async def get_principal_cache_stats(
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Hit/miss counters of this worker's auth caches (admins only)"""
+    if current_user.role.value not in ["ADMIN", "SUPER_ADMIN"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    return {
+        "users": user_principal_cache.stats(),
+        "tokens": verified_token_cache.stats(),
+        "revocations": token_revocations.stats(),
+    }
@@ -1,12 +1,12 @@
 """
 Lead Lifecycle API endpoints for Stage 6
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional
-from core.database import get_db
+from core.database import get_async_db
 from core.auth import get_current_active_user
-from models.user import User
+from core.user_cache import UserPrincipal
 from models.lead import Lead, LeadStatus
 from models.lead_status_history import LeadStatusHistory
 from schemas.lead_lifecycle import (
@@ -15,9 +15,16 @@ from schemas.lead_lifecycle import (
     ConvertRequest, 
     DropRequest, 
     CNPRequest,
+    BulkLifecycleRequest,
+    BulkLifecycleResponse,
     StatusHistoryResponse
 )
-from services.lead_lifecycle_service import LeadLifecycleService
+from services.lead_lifecycle_service import (
+    LIFECYCLE_BULK_MAX_LEADS,
+    STATUS_HISTORY_PAGE_SIZE,
+    LeadConflictError,
+    LeadLifecycleService
+)
 from datetime import datetime
 
 router = APIRouter(prefix="/leads", tags=["lead-lifecycle"])
@@ -40,8 +47,8 @@ DROP_REASONS = [
 async def update_lead_status(
     lead_id: int,
     request: StatusUpdateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Update lead status with history tracking"""
     try:
@@ -50,9 +57,15 @@ async def update_lead_status(
             lead_id=lead_id,
             new_status=request.status,
             changed_by=current_user.id,
-            reason=request.reason
+            reason=request.reason,
+            expected_version=request.expected_version
         )
         return result
+    except LeadConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -63,8 +76,8 @@ async def update_lead_status(
 async def update_interest_level(
     lead_id: int,
     request: InterestUpdateRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Update lead interest level (0-5)"""
     try:
@@ -72,9 +85,15 @@ async def update_interest_level(
         result = await service.update_interest_level(
             lead_id=lead_id,
             interest_level=request.interest_level,
-            changed_by=current_user.id
+            changed_by=current_user.id,
+            expected_version=request.expected_version
         )
         return result
+    except LeadConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -85,8 +104,8 @@ async def update_interest_level(
 async def mark_as_cnp(
     lead_id: int,
     request: CNPRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Mark lead as CNP (Could Not Pick) with tracking"""
     try:
@@ -94,9 +113,15 @@ async def mark_as_cnp(
         result = await service.mark_as_cnp(
             lead_id=lead_id,
             reason=request.reason,
-            changed_by=current_user.id
+            changed_by=current_user.id,
+            expected_version=request.expected_version
         )
         return result
+    except LeadConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -107,8 +132,8 @@ async def mark_as_cnp(
 async def convert_lead(
     lead_id: int,
     request: ConvertRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Convert lead to customer (requires product and payment)"""
     try:
@@ -118,9 +143,15 @@ async def convert_lead(
             product=request.product,
             payment_amount=request.payment_amount,
             notes=request.notes,
-            changed_by=current_user.id
+            changed_by=current_user.id,
+            expected_version=request.expected_version
         )
         return result
+    except LeadConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -131,8 +162,8 @@ async def convert_lead(
 async def drop_lead(
     lead_id: int,
     request: DropRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
     """Drop lead with reason (moves to dropped pool)"""
     try:
@@ -141,25 +172,68 @@ async def drop_lead(
             lead_id=lead_id,
             reason=request.reason,
             notes=request.notes,
-            changed_by=current_user.id
+            changed_by=current_user.id,
+            expected_version=request.expected_version
         )
         return result
+    except LeadConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
 
+@router.post("/bulk/lifecycle", response_model=BulkLifecycleResponse, status_code=status.HTTP_200_OK)
+async def bulk_lifecycle_update(
+    request: BulkLifecycleRequest,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Apply one lifecycle action (status, interest, cnp, convert, drop) to many leads"""
+    # Check permissions (team leads and above; agents change their leads one at a time)
+    if current_user.role.value not in ["ADMIN", "SUPER_ADMIN", "MANAGER", "TEAM_LEAD"]:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied"
+        )
+    
+    if not request.lead_ids or len(set(request.lead_ids)) > LIFECYCLE_BULK_MAX_LEADS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Send between 1 and {LIFECYCLE_BULK_MAX_LEADS} lead ids per request"
+        )
+    
+    service = LeadLifecycleService(db)
+    return await service.bulk_update(
+        lead_ids=request.lead_ids,
+        action=request.action,
+        params=request.params,
+        changed_by=current_user.id
+    )
+
 @router.get("/{lead_id}/status-history", response_model=list[StatusHistoryResponse])
 async def get_status_history(
     lead_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    response: Response,
+    limit: int = Query(STATUS_HISTORY_PAGE_SIZE, ge=1, le=500, description="Entries per page"),
+    after: Optional[str] = Query(None, description="X-Next-Cursor of the previous page"),
+    since: Optional[datetime] = Query(None, description="Only entries changed after this time"),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: UserPrincipal = Depends(get_current_active_user)
 ):
-    """Get status change history for a lead"""
+    """Get status change history for a lead, newest first
+
+    The cursor for the next (older) page is returned in the X-Next-Cursor header.
+    """
     try:
         service = LeadLifecycleService(db)
-        history = await service.get_status_history(lead_id)
+        history, next_cursor = await service.get_status_history(lead_id, limit=limit, after=after, since=since)
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
         return history
     except Exception as e:
         raise HTTPException(
@@ -1,12 +1,15 @@
 """
 Lead API endpoints
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from core.database import get_db
+import json
+from typing import Any, Awaitable, Callable, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import get_async_db
 from core.auth import get_current_active_user
-from models.user import User
+from core.user_cache import UserPrincipal
 from models.lead import Lead, LeadStatus, LeadSource, LeadPriority
 from schemas.lead import (
     LeadCreate, 
@@ -14,36 +17,138 @@ from schemas.lead import (
     LeadResponse, 
     LeadListResponse,
     WebhookLeadCreate,
-    LeadStatsResponse
+    LeadStatsResponse,
+    WebhookIngestionResponse,
+    WebhookIngestionStatus,
+    WebhookQueueStats
 )
+from services.idempotency_service import IdempotencyService
+from services.lead_lifecycle_service import LeadConflictError
 from services.lead_service import LeadService
+from services.webhook_ingestion import (
+    QueueFullError,
+    WEBHOOK_BULK_MAX_LEADS,
+    webhook_queue,
+    webhook_to_lead_create
+)
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
+# Stores a handler's response for its Idempotency-Key (see run_idempotent)
+RecordResponse = Callable[[Any], Awaitable[None]]
+
+# Simple webhook authentication (in production, use proper API keys)
+WEBHOOK_KEY = os.getenv("WEBHOOK_KEY", "webhook_key_123")
+
+
+def verify_webhook_key(key: str) -> None:
+    """Reject webhook calls with the wrong key"""
+    if key != WEBHOOK_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook key"
+        )
+
+
+async def run_idempotent(
+    db: AsyncSession,
+    scope: str,
+    idempotency_key: Optional[str],
+    status_code: int,
+    handler: Callable[[Optional[RecordResponse]], Awaitable[Any]]
+) -> Any:
+    """Run handler once per Idempotency-Key; retries replay the stored response
+
+    handler gets a record_response callback (None without a key). A handler
+    that commits its own transaction awaits it just before that commit, so
+    the response is stored atomically with the work; otherwise the response
+    is stored after the handler returns.
+    """
+    if not idempotency_key:
+        return await handler(None)
+    
+    idempotency = IdempotencyService(db)
+    record = await idempotency.begin(scope, idempotency_key)
+    if record is not None:
+        if record.status_code is None:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="A request with this Idempotency-Key is still being processed"
+            )
+        return JSONResponse(
+            content=json.loads(record.response_body),
+            status_code=record.status_code,
+            headers={"Idempotent-Replayed": "true"}
+        )
+    
+    staged = False
+    
+    async def record_response(body: Any) -> None:
+        nonlocal staged
+        await idempotency.stage(scope, idempotency_key, status_code, jsonable_encoder(body))
+        staged = True
+    
+    try:
+        result = await handler(record_response)
+    except Exception:
+        await idempotency.release(scope, idempotency_key)
+        raise
+    if not staged:
+        await idempotency.complete(scope, idempotency_key, status_code, jsonable_encoder(result))
+    return result
+
+
+def store_response_with_lead(record_response: Optional[RecordResponse]):
+    """create_lead before_commit hook storing the lead's response in its transaction"""
+    if record_response is None:
+        return None
+    
+    async def before_commit(lead: Lead) -> None:
+        await record_response(build_lead_response(lead))
+    return before_commit
+
+
+def build_lead_response(lead: Lead) -> LeadResponse:
+    """Build lead response with creator and assignee names
+
+    Expects creator/assignee to be eager-loaded by LeadService.
+    """
+    response_data = LeadResponse.from_orm(lead)
+    if lead.creator:
+        response_data.creator_name = lead.creator.name
+    if lead.assignee:
+        response_data.assignee_name = lead.assignee.name
+    return response_data
+
 
 @router.post("/", response_model=LeadResponse, status_code=status.HTTP_201_CREATED)
 async def create_lead(
     lead_data: LeadCreate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Create a new lead"""
+    """Create a new lead (retries with the same Idempotency-Key replay the first response)"""
     try:
         lead_service = LeadService(db)
-        lead = lead_service.create_lead(lead_data, current_user.id)
         
-        # Add creator and assignee names for response
-        response_data = LeadResponse.from_orm(lead)
-        if lead.creator:
-            response_data.creator_name = lead.creator.name
-        if lead.assignee:
-            response_data.assignee_name = lead.assignee.name
+        async def create(record_response):
+            lead = await lead_service.create_lead(
+                lead_data, current_user.id, before_commit=store_response_with_lead(record_response)
+            )
+            # Add creator and assignee names for response
+            return build_lead_response(lead)
         
-        return response_data
+        return await run_idempotent(
+            db, f"lead_create:{current_user.id}", idempotency_key, status.HTTP_201_CREATED, create
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error creating lead: {str(e)}")
         raise HTTPException(
@@ -61,10 +166,11 @@ async def get_leads(
     priority: Optional[LeadPriority] = Query(None, description="Filter by priority"),
     assigned_to: Optional[int] = Query(None, description="Filter by assigned user"),
     search: Optional[str] = Query(None, description="Search in name, email, phone, company"),
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    after: Optional[str] = Query(None, description="Cursor from next_cursor; seeks past it instead of using page"),
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get leads with filtering and pagination"""
+    """Get leads with filtering and pagination (page/per_page or after cursor)"""
     try:
         lead_service = LeadService(db)
         
@@ -72,7 +178,7 @@ async def get_leads(
         skip = (page - 1) * per_page
         
         # Get leads
-        leads, total = lead_service.get_leads(
+        leads, total, next_cursor = await lead_service.get_leads(
             skip=skip,
             limit=per_page,
             status=status,
@@ -81,30 +187,28 @@ async def get_leads(
             assigned_to=assigned_to,
             search=search,
             user_role=current_user.role.value,
-            user_id=current_user.id
+            user_id=current_user.id,
+            after=after
         )
         
         # Convert to response format
-        lead_responses = []
-        for lead in leads:
-            response_data = LeadResponse.from_orm(lead)
-            if lead.creator:
-                response_data.creator_name = lead.creator.name
-            if lead.assignee:
-                response_data.assignee_name = lead.assignee.name
-            lead_responses.append(response_data)
+        lead_responses = [build_lead_response(lead) for lead in leads]
         
-        # Calculate total pages
-        total_pages = (total + per_page - 1) // per_page
+        # Calculate total pages (cursor pages carry no total)
+        total_pages = (total + per_page - 1) // per_page if total is not None else None
         
         return LeadListResponse(
             leads=lead_responses,
             total=total,
             page=page,
             per_page=per_page,
-            total_pages=total_pages
+            total_pages=total_pages,
+            next_cursor=next_cursor
         )
         
+    except ValueError as e:
+        # `status` is shadowed by the filter parameter here
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"Error getting leads: {str(e)}")
         raise HTTPException(
@@ -116,13 +220,13 @@ async def get_leads(
 @router.get("/{lead_id}", response_model=LeadResponse)
 async def get_lead(
     lead_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get a specific lead by ID"""
     try:
         lead_service = LeadService(db)
-        lead = lead_service.get_lead(lead_id)
+        lead = await lead_service.get_lead(lead_id)
         
         if not lead:
             raise HTTPException(
@@ -139,13 +243,7 @@ async def get_lead(
             )
         
         # Add creator and assignee names for response
-        response_data = LeadResponse.from_orm(lead)
-        if lead.creator:
-            response_data.creator_name = lead.creator.name
-        if lead.assignee:
-            response_data.assignee_name = lead.assignee.name
-        
-        return response_data
+        return build_lead_response(lead)
         
     except HTTPException:
         raise
@@ -161,15 +259,15 @@ async def get_lead(
 async def update_lead(
     lead_id: int,
     lead_data: LeadUpdate,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a lead"""
     try:
         lead_service = LeadService(db)
         
         # Check if lead exists
-        existing_lead = lead_service.get_lead(lead_id)
+        existing_lead = await lead_service.get_lead(lead_id, use_replica=False)
         if not existing_lead:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -185,19 +283,18 @@ async def update_lead(
             )
         
         # Update lead
-        lead = lead_service.update_lead(lead_id, lead_data, current_user.id)
+        lead = await lead_service.update_lead(lead_id, lead_data, current_user.id)
         
         # Add creator and assignee names for response
-        response_data = LeadResponse.from_orm(lead)
-        if lead.creator:
-            response_data.creator_name = lead.creator.name
-        if lead.assignee:
-            response_data.assignee_name = lead.assignee.name
-        
-        return response_data
+        return build_lead_response(lead)
         
     except HTTPException:
         raise
+    except LeadConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error updating lead: {str(e)}")
         raise HTTPException(
@@ -209,15 +306,15 @@ async def update_lead(
 @router.delete("/{lead_id}")
 async def delete_lead(
     lead_id: int,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a lead (soft delete)"""
     try:
         lead_service = LeadService(db)
         
         # Check if lead exists
-        existing_lead = lead_service.get_lead(lead_id)
+        existing_lead = await lead_service.get_lead(lead_id, use_replica=False)
         if not existing_lead:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -232,7 +329,7 @@ async def delete_lead(
             )
         
         # Delete lead
-        success = lead_service.delete_lead(lead_id)
+        success = await lead_service.delete_lead(lead_id)
         
         if not success:
             raise HTTPException(
@@ -244,6 +341,11 @@ async def delete_lead(
         
     except HTTPException:
         raise
+    except LeadConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         logger.error(f"Error deleting lead: {str(e)}")
         raise HTTPException(
@@ -254,13 +356,13 @@ async def delete_lead(
 
 @router.get("/stats/overview", response_model=LeadStatsResponse)
 async def get_lead_stats(
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    current_user: UserPrincipal = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get lead statistics"""
     try:
         lead_service = LeadService(db)
-        stats = lead_service.get_lead_stats(
+        stats = await lead_service.get_lead_stats(
             user_role=current_user.role.value,
             user_id=current_user.id
         )
@@ -288,40 +390,31 @@ async def get_lead_stats(
 async def create_lead_webhook(
     lead_data: WebhookLeadCreate,
     key: str = Query(..., description="Webhook authentication key"),
-    db: Session = Depends(get_db)
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Create a lead via webhook (external API)"""
+    """Create a lead via webhook (external API)
+
+    Providers should send their event id as Idempotency-Key so retries do
+    not create duplicate leads.
+    """
     try:
-        # Simple webhook authentication (in production, use proper API keys)
-        if key != "webhook_key_123":  # This should be in environment variables
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid webhook key"
-            )
+        verify_webhook_key(key)
         
         # Convert webhook data to LeadCreate format
-        lead_create_data = LeadCreate(
-            name=lead_data.name,
-            email=lead_data.email,
-            phone=lead_data.phone,
-            company=lead_data.company,
-            source=LeadSource(lead_data.source) if lead_data.source else LeadSource.OTHER,
-            notes=lead_data.notes,
-            budget=lead_data.budget,
-            language=lead_data.language
-        )
+        lead_create_data = webhook_to_lead_create(lead_data)
         
         lead_service = LeadService(db)
-        lead = lead_service.create_lead(lead_create_data, created_by=None)  # No user for webhook
         
-        # Add creator and assignee names for response
-        response_data = LeadResponse.from_orm(lead)
-        if lead.creator:
-            response_data.creator_name = lead.creator.name
-        if lead.assignee:
-            response_data.assignee_name = lead.assignee.name
+        async def create(record_response):
+            lead = await lead_service.create_lead(
+                lead_create_data, created_by=None,  # No user for webhook
+                before_commit=store_response_with_lead(record_response)
+            )
+            # Add creator and assignee names for response
+            return build_lead_response(lead)
         
-        return response_data
+        return await run_idempotent(db, "webhook", idempotency_key, status.HTTP_201_CREATED, create)
         
     except HTTPException:
         raise
@@ -331,3 +424,77 @@ async def create_lead_webhook(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Failed to create lead via webhook"
         )
+
+
+def enqueue_webhook_leads(leads: List[WebhookLeadCreate]) -> WebhookIngestionResponse:
+    """Hand leads to the ingestion queue, shedding load when it is full"""
+    try:
+        ingestion_id = webhook_queue.submit(leads)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": "5"}
+        )
+    return WebhookIngestionResponse(ingestion_id=ingestion_id, status="queued", accepted=len(leads))
+
+
+@router.post("/webhook/async", response_model=WebhookIngestionResponse, status_code=status.HTTP_202_ACCEPTED)
+async def queue_lead_webhook(
+    lead_data: WebhookLeadCreate,
+    key: str = Query(..., description="Webhook authentication key"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Accept a webhook lead for batched background insertion"""
+    verify_webhook_key(key)
+    
+    async def enqueue(record_response):
+        return enqueue_webhook_leads([lead_data])
+    
+    return await run_idempotent(db, "webhook_async", idempotency_key, status.HTTP_202_ACCEPTED, enqueue)
+
+
+@router.post("/webhook/bulk", response_model=WebhookIngestionResponse, status_code=status.HTTP_202_ACCEPTED)
+async def queue_lead_webhook_bulk(
+    leads_data: List[WebhookLeadCreate],
+    key: str = Query(..., description="Webhook authentication key"),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Accept an array of webhook leads for batched background insertion"""
+    verify_webhook_key(key)
+    if not leads_data or len(leads_data) > WEBHOOK_BULK_MAX_LEADS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Send between 1 and {WEBHOOK_BULK_MAX_LEADS} leads per request"
+        )
+    
+    async def enqueue(record_response):
+        return enqueue_webhook_leads(leads_data)
+    
+    return await run_idempotent(db, "webhook_bulk", idempotency_key, status.HTTP_202_ACCEPTED, enqueue)
+
+
+@router.get("/webhook/ingestions/{ingestion_id}", response_model=WebhookIngestionStatus)
+async def get_webhook_ingestion(
+    ingestion_id: str,
+    key: str = Query(..., description="Webhook authentication key")
+):
+    """Get progress of a queued webhook ingestion"""
+    verify_webhook_key(key)
+    ingestion = webhook_queue.get_ingestion(ingestion_id)
+    if ingestion is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Ingestion not found or expired"
+        )
+    return ingestion
+
+
+@router.get("/webhook/queue", response_model=WebhookQueueStats)
+async def get_webhook_queue_stats(
+    current_user: UserPrincipal = Depends(get_current_active_user)
+):
+    """Get webhook ingestion queue depth and lag"""
+    return webhook_queue.stats()
@@ -0,0 +1,69 @@
+"""
+Backfill normalized phone_e164 / email_norm on existing leads
+
+Usage:
+    python backfill_lead_contacts.py [--batch-size 1000] [--all]
+
+Runs migrate first, which adds the columns and their indexes if the leads
+table predates them, then walks leads by id in batches, committing after
+each batch. By default only rows with an empty phone_e164 are filled;
+--all re-normalizes every lead.
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from sqlalchemy import bindparam, select, update
+from core.database import SessionLocal, engine
+from core.normalization import normalize_email, normalize_phone
+from core.schema import migrate
+from models.lead import Lead
+
+
+def backfill(batch_size: int, refresh_all: bool) -> int:
+    db = SessionLocal()
+    updated = 0
+    last_id = 0
+    try:
+        while True:
+            query = select(Lead.id, Lead.phone, Lead.email).where(Lead.id > last_id)
+            if not refresh_all:
+                query = query.where(Lead.phone_e164.is_(None))
+            rows = db.execute(query.order_by(Lead.id).limit(batch_size)).all()
+            if not rows:
+                break
+            # Core executemany, one statement per batch; leaves Lead.version alone (the
+            # ORM bulk UPDATE would demand a version per row for its version_id_col)
+            leads = Lead.__table__
+            db.execute(
+                update(leads)
+                .where(leads.c.id == bindparam("lead_id"))
+                .values(phone_e164=bindparam("phone_e164"), email_norm=bindparam("email_norm")),
+                [
+                    {"lead_id": row.id, "phone_e164": normalize_phone(row.phone), "email_norm": normalize_email(row.email)}
+                    for row in rows
+                ]
+            )
+            db.commit()
+            updated += len(rows)
+            last_id = rows[-1].id
+            print(f"  normalized {updated} leads (last id {last_id})")
+        return updated
+    except Exception as e:
+        db.rollback()
+        print(f"Error backfilling lead contacts: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill normalized lead phone/email columns")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--all", action="store_true", help="Re-normalize leads that already have values")
+    args = parser.parse_args()
+    # Add missing columns/indexes and stamp the schema version
+    migrate(engine)
+    total = backfill(args.batch_size, args.all)
+    print(f"✅ Backfilled normalized contacts for {total} leads")
@@ -0,0 +1,228 @@
+"""
+Synthetic data generator for benchmarking the Tracklie API at production scale
+
+Bulk-inserts users in every role, leads and their status history into the
+database configured by DATABASE_URL (SQLite or MySQL), then rebuilds the
+lead counter rollup and the search token index. Rows are written with
+Core executemany inserts in batches, bypassing the ORM.
+
+All benchmark users share one password and get predictable emails
+(see bench_email), which is what benchmarks.scenarios logs in with.
+
+Usage (from the backend directory):
+    python -m benchmarks.generate_data --users 300 --leads 1000000 --history-per-lead 10
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from sqlalchemy import func, insert, select
+
+from core.auth import hash_password
+from core.database import SessionLocal, engine
+from core.normalization import normalize_email, normalize_phone
+from core.schema import migrate
+from models.lead import Lead, LeadPriority, LeadSource, LeadStatus
+from models.lead_status_history import LeadStatusHistory
+from models.user import User, UserRole
+from services.lead_counter_service import rebuild_lead_counters
+from services.lead_search import rebuild_search_tokens
+
+BENCH_PASSWORD = "bench123"
+
+# Share of generated users per role (salespeople own most leads)
+ROLE_WEIGHTS = {
+    UserRole.SUPER_ADMIN: 1,
+    UserRole.ADMIN: 4,
+    UserRole.MANAGER: 6,
+    UserRole.TEAM_LEAD: 10,
+    UserRole.SALESPERSON: 60,
+    UserRole.RECOVERY_AGENT: 10,
+    UserRole.FINANCE_MANAGER: 4,
+    UserRole.ANALYST: 5,
+}
+
+STATUS_WEIGHTS = {
+    LeadStatus.NEW: 30, LeadStatus.IN_PROGRESS: 20, LeadStatus.CNP: 12,
+    LeadStatus.INTERESTED_1: 4, LeadStatus.INTERESTED_2: 4, LeadStatus.INTERESTED_3: 3,
+    LeadStatus.INTERESTED_4: 2, LeadStatus.INTERESTED_5: 2, LeadStatus.QUALIFIED: 5,
+    LeadStatus.CONVERTED: 6, LeadStatus.LOST: 4, LeadStatus.DROPPED: 8,
+}
+
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Ananya", "Vikram", "Sneha", "Arjun", "Kavya", "Rahul", "Meera"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Gupta", "Nair", "Singh", "Mehta", "Rao", "Das"]
+COMPANIES = ["Infotech", "Textiles", "Logistics", "Foods", "Pharma", "Motors", "Realty", "Finserv"]
+CITIES = ["Mumbai", "Delhi", "Bengaluru", "Chennai", "Pune", "Hyderabad", "Kolkata", "Jaipur"]
+
+
+def bench_email(role: UserRole, index: int) -> str:
+    """Login email of the index-th (1-based) generated user with role"""
+    return f"bench-{role.value.lower()}-{index}@bench.tracklie.com"
+
+
+def role_counts(total_users: int) -> Dict[UserRole, int]:
+    """Split total_users across roles by ROLE_WEIGHTS (at least one per role)"""
+    weight_sum = sum(ROLE_WEIGHTS.values())
+    return {role: max(1, total_users * weight // weight_sum) for role, weight in ROLE_WEIGHTS.items()}
+
+
+def generate_users(total_users: int) -> Dict[UserRole, List[int]]:
+    """Insert benchmark users (skipping ones from earlier runs); returns ids by role"""
+    password_hash = hash_password(BENCH_PASSWORD)
+    with engine.connect() as connection:
+        existing = set(connection.scalars(select(User.email).where(User.email.like("bench-%@bench.tracklie.com"))))
+    rows = [
+        {
+            "email": bench_email(role, i),
+            "password_hash": password_hash,
+            "name": f"Bench {role.value.title()} {i}",
+            "role": role,
+            "is_active": True,
+        }
+        for role, count in role_counts(total_users).items()
+        for i in range(1, count + 1)
+        if bench_email(role, i) not in existing
+    ]
+    with engine.begin() as connection:
+        if rows:
+            connection.execute(insert(User), rows)
+        users = connection.execute(
+            select(User.id, User.role).where(User.email.like("bench-%@bench.tracklie.com"))
+        ).all()
+    ids: Dict[UserRole, List[int]] = {role: [] for role in UserRole}
+    for user_id, role in users:
+        ids[role].append(user_id)
+    return ids
+
+
+def lead_row(rng: random.Random, lead_id: int, created_at: datetime, owners: List[int], creators: List[int]) -> dict:
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    email = f"lead{lead_id}@example.com" if rng.random() < 0.8 else None
+    phone = f"9{lead_id:09d}"
+    status = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()))[0]
+    return {
+        "id": lead_id,
+        "name": name,
+        "email": email,
+        "phone": phone,
+        "phone_e164": normalize_phone(phone),
+        "email_norm": normalize_email(email),
+        "company": f"{rng.choice(LAST_NAMES)} {rng.choice(COMPANIES)}",
+        "city": rng.choice(CITIES),
+        "status": status,
+        "source": rng.choice(list(LeadSource)),
+        "priority": rng.choice(list(LeadPriority)),
+        "interest_level": rng.randint(0, 5),
+        "created_by": rng.choice(creators),
+        "assigned_to": rng.choice(owners) if rng.random() < 0.9 else None,
+        "created_at": created_at,
+        "updated_at": created_at,
+    }
+
+
+def history_rows(rng: random.Random, lead: dict, count: int, changers: List[int]) -> List[dict]:
+    """count status changes for a lead, ending in the lead's current status"""
+    rows = []
+    changed_at = lead["created_at"]
+    old_status = None
+    for i in range(count):
+        changed_at += timedelta(minutes=rng.randint(5, 60 * 24 * 3))
+        if i == count - 1:
+            new_status = lead["status"].value
+        else:
+            new_status = rng.choice(list(LeadStatus)).value
+        rows.append({
+            "lead_id": lead["id"],
+            "old_status": old_status,
+            "new_status": new_status,
+            "changed_by": lead["assigned_to"] or rng.choice(changers),
+            "change_reason": "Synthetic benchmark history",
+            "changed_at": changed_at,
+        })
+        old_status = new_status
+    return rows
+
+
+def generate_leads(
+    rng: random.Random,
+    user_ids: Dict[UserRole, List[int]],
+    total_leads: int,
+    history_per_lead: int,
+    batch_size: int,
+    days: int = 365
+) -> tuple[int, int]:
+    """Insert leads and their history in batches; returns (leads, history rows)"""
+    owners = user_ids[UserRole.SALESPERSON] + user_ids[UserRole.RECOVERY_AGENT]
+    creators = user_ids[UserRole.ADMIN] + user_ids[UserRole.MANAGER] + user_ids[UserRole.TEAM_LEAD]
+    with engine.connect() as connection:
+        first_id = (connection.scalar(select(func.max(Lead.id))) or 0) + 1
+    start = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / max(total_leads, 1)
+
+    history_total = 0
+    for batch_start in range(0, total_leads, batch_size):
+        leads = [
+            lead_row(rng, first_id + i, start + step * i, owners, creators)
+            for i in range(batch_start, min(batch_start + batch_size, total_leads))
+        ]
+        history = [row for lead in leads for row in history_rows(rng, lead, history_per_lead, owners)]
+        with engine.begin() as connection:
+            connection.execute(insert(Lead), leads)
+            if history:
+                connection.execute(insert(LeadStatusHistory), history)
+        history_total += len(history)
+        print(f"  {batch_start + len(leads)}/{total_leads} leads, {history_total} history rows")
+    return total_leads, history_total
+
+
+def generate(
+    users: int,
+    leads: int,
+    history_per_lead: int,
+    batch_size: int = 10000,
+    seed: int = 42,
+    search_index: bool = True
+) -> Dict[str, float]:
+    """Generate a full synthetic dataset; returns counts and timings"""
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    migrate(engine)
+    user_ids = generate_users(users)
+    lead_count, history_count = generate_leads(rng, user_ids, leads, history_per_lead, batch_size)
+    inserted_at = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        rebuild_lead_counters(db)
+        if search_index:
+            rebuild_search_tokens(db)
+    finally:
+        db.close()
+
+    return {
+        "users": sum(len(ids) for ids in user_ids.values()),
+        "leads": lead_count,
+        "status_history": history_count,
+        "insert_s": round(inserted_at - started, 1),
+        "rebuild_s": round(time.perf_counter() - inserted_at, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic benchmark data")
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--leads", type=int, default=1_000_000)
+    parser.add_argument("--history-per-lead", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skip-search-index", action="store_true", help="Leave lead_search_tokens empty")
+    args = parser.parse_args()
+    result = generate(
+        args.users, args.leads, args.history_per_lead, args.batch_size, args.seed,
+        search_index=not args.skip_search_index
+    )
+    print(f"✅ Generated {result['users']} users, {result['leads']} leads, "
+          f"{result['status_history']} status history rows "
+          f"(insert {result['insert_s']}s, rebuild {result['rebuild_s']}s)")
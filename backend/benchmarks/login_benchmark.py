@@ -0,0 +1,100 @@
+"""
+Concurrent login benchmark for the Tracklie API
+
+Fires logins from many clients at once (the morning login storm) while a
+probe keeps hitting /health, so a blocked event loop shows up as probe
+latency rather than only as slower logins.
+
+Usage (against a running server):
+    python -m benchmarks.login_benchmark --base-url http://localhost:8000 \\
+        --email admin@tracklie.com --password admin123 --concurrency 50 --logins 500
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+
+from benchmarks.load_test import percentile
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+    }
+
+
+async def run_logins(
+    base_url: str,
+    email: str,
+    password: str,
+    concurrency: int,
+    total_logins: int,
+    probe_interval: float = 0.05
+) -> Dict[str, object]:
+    """Run total_logins logins from concurrency clients and probe /health meanwhile"""
+    login_latencies: List[float] = []
+    probe_latencies: List[float] = []
+    errors = 0
+    remaining = total_logins
+    done = False
+    limits = httpx.Limits(max_connections=concurrency + 1, max_keepalive_connections=concurrency + 1)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                started = time.perf_counter()
+                try:
+                    response = await client.post("/auth/login", json={"email": email, "password": password})
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                login_latencies.append(time.perf_counter() - started)
+
+        async def probe():
+            while not done:
+                started = time.perf_counter()
+                try:
+                    await client.get("/health")
+                except httpx.HTTPError:
+                    pass
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(probe_interval)
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done = True
+        await probe_task
+
+    return {
+        "concurrency": concurrency,
+        "logins": len(login_latencies),
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "logins_per_sec": round(len(login_latencies) / elapsed, 1) if elapsed else 0.0,
+        "login": summarize(login_latencies),
+        "health_probe": summarize(probe_latencies),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent login benchmark")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", default="admin@tracklie.com")
+    parser.add_argument("--password", default="admin123")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--logins", type=int, default=500)
+    args = parser.parse_args()
+    result = asyncio.run(run_logins(args.base_url, args.email, args.password, args.concurrency, args.logins))
+    print(json.dumps(result, indent=2))
@@ -0,0 +1,144 @@
+"""
+Performance regression gate against a committed baseline
+
+Reruns the benchmark scenarios and compares every endpoint under /leads
+(api/leads.py and api/lead_lifecycle.py) with benchmarks/baseline.json:
+
+- SQL statements per request may not grow by more than --query-tolerance
+  (default 0.5; cache warm-up makes the average slightly fractional, while
+  a new lazy load adds at least one query per request, one per row in lists).
+  The count comes from the Server-Timing header, so a run whose responses
+  lack it (query monitor off, e.g. ENVIRONMENT=production) fails too;
+- p95 latency may not grow by more than --latency-tolerance (a fraction)
+  plus --latency-slack-ms, which absorbs noise on fast endpoints.
+
+Exits with status 1 when the query count regressed or is missing. Latency
+baselines only mean something on the hardware and data they were recorded
+on, so a latency regression only fails the gate when the baseline was
+recorded (with --update) on this host, or with --strict-latency; otherwise
+it is printed as a warning.
+
+The committed baseline was recorded in-process on SQLite with
+`benchmarks.generate_data --leads 20000` (other options at their defaults).
+
+Usage (from the backend directory, against data from benchmarks.generate_data):
+    python -m benchmarks.regression_gate --in-process
+    python -m benchmarks.regression_gate --in-process --update   # record a new baseline
+"""
+import asyncio
+import json
+import os
+import socket
+import sys
+from typing import Dict, List, Tuple
+
+from benchmarks.scenarios import SCENARIOS, build_parser, run
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Endpoints the gate protects (both lead routers are mounted under /leads)
+GATED_PREFIX = "/leads"
+
+DEFAULT_SCENARIOS = [name for name in SCENARIOS if name != "login"]
+
+
+def endpoint_metrics(report: dict) -> Dict[str, dict]:
+    """{"scenario: METHOD /path": summary} for gated endpoints in a scenarios report"""
+    metrics = {}
+    for scenario, result in report["scenarios"].items():
+        for endpoint, summary in result["endpoints"].items():
+            if endpoint.split(" ", 1)[1].startswith(GATED_PREFIX):
+                metrics[f"{scenario}: {endpoint}"] = summary
+    return metrics
+
+
+def compare(
+    baseline: dict,
+    current: dict,
+    latency_tolerance: float = 0.5,
+    latency_slack_ms: float = 5.0,
+    query_tolerance: float = 0.5,
+    latency_fatal: bool = True
+) -> Tuple[List[str], List[str]]:
+    """Human-readable (regressions, warnings) of current against baseline
+
+    Latency regressions are reported as warnings unless latency_fatal.
+    """
+    regressions, warnings = [], []
+    before = endpoint_metrics(baseline)
+    after = endpoint_metrics(current)
+    for key, old in sorted(before.items()):
+        new = after.get(key)
+        if new is None:
+            regressions.append(f"{key}: missing from this run")
+            continue
+        if new["errors"]:
+            regressions.append(f"{key}: {new['errors']} of {new['requests']} requests failed")
+        # Without a statement count the gate is blind to N+1s
+        if old.get("queries_per_request") is None:
+            regressions.append(f"{key}: baseline has no queries/request (no Server-Timing header when recorded)")
+        elif new.get("queries_per_request") is None:
+            regressions.append(f"{key}: queries/request missing (no Server-Timing header; is the query monitor on?)")
+        elif new["queries_per_request"] > old["queries_per_request"] + query_tolerance:
+            regressions.append(
+                f"{key}: {new['queries_per_request']} queries/request (baseline {old['queries_per_request']})"
+            )
+        limit = old["p95_ms"] * (1 + latency_tolerance) + latency_slack_ms
+        if new["p95_ms"] > limit:
+            (regressions if latency_fatal else warnings).append(
+                f"{key}: p95 {new['p95_ms']}ms (baseline {old['p95_ms']}ms, limit {round(limit, 2)}ms)"
+            )
+    return regressions, warnings
+
+
+def main(argv=None) -> int:
+    parser = build_parser()
+    parser.description = "Fail when lead endpoints regress against the stored baseline"
+    parser.set_defaults(scenarios=DEFAULT_SCENARIOS, requests=300, concurrency=10)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--latency-tolerance", type=float, default=0.5, help="Allowed p95 growth (fraction)")
+    parser.add_argument("--latency-slack-ms", type=float, default=5.0)
+    parser.add_argument("--query-tolerance", type=float, default=0.5, help="Allowed growth in queries/request")
+    parser.add_argument(
+        "--strict-latency", action="store_true", help="Fail on p95 regressions even if the baseline is from another host"
+    )
+    args = parser.parse_args(argv)
+
+    current = asyncio.run(run(args))
+    current["host"] = socket.gethostname()
+    if args.update:
+        with open(args.baseline, "w") as f:
+            f.write(json.dumps(current, indent=2) + "\n")
+        print(f"✅ Wrote baseline for {len(endpoint_metrics(current))} endpoints to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    if baseline.get("total_leads") != current["total_leads"]:
+        print(f"⚠️  Baseline was recorded with {baseline.get('total_leads')} leads, this run has {current['total_leads']}")
+
+    latency_fatal = args.strict_latency or baseline.get("host") == current["host"]
+    if not latency_fatal:
+        print(f"⚠️  Baseline was recorded on {baseline.get('host') or 'another host'}; p95 regressions only warn")
+
+    regressions, warnings = compare(
+        baseline, current, args.latency_tolerance, args.latency_slack_ms, args.query_tolerance, latency_fatal
+    )
+    for key, summary in sorted(endpoint_metrics(current).items()):
+        print(f"  {key}: p95 {summary['p95_ms']}ms, {summary['queries_per_request']} queries/request")
+    if warnings:
+        print("⚠️  Latency regressions (not fatal):")
+        for warning in warnings:
+            print(f"  - {warning}")
+    if regressions:
+        print("❌ Performance regressions:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+    print("✅ No performance regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,257 @@
+"""
+End-to-end API benchmark scenarios
+
+Drives the main read and write paths with benchmark users created by
+benchmarks.generate_data and reports, per scenario and per endpoint within
+it, latency percentiles, throughput, errors and the number of SQL
+statements per request (read from the Server-Timing header, so run the
+server outside production).
+
+Scenarios:
+    leads_list      GET /leads/ pages as an admin
+    leads_filtered  GET /leads/?status=... as salespeople (role-scoped)
+    stats_overview  GET /leads/stats/overview
+    lifecycle       PATCH /leads/{id}/status, PATCH /leads/{id}/interest, POST /leads/{id}/cnp
+    login           POST /auth/login
+
+Usage (from the backend directory):
+    python -m benchmarks.scenarios --base-url http://localhost:8000 --concurrency 50 --requests 2000
+    python -m benchmarks.scenarios --in-process --requests 200 --output results.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import re
+import statistics
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.generate_data import BENCH_PASSWORD, bench_email, role_counts
+from benchmarks.load_test import percentile
+from models.lead import LeadStatus
+from models.user import UserRole
+
+SERVER_TIMING_QUERIES = re.compile(r'desc="(\d+) queries"')
+
+# (endpoint template, method, path, json body, headers) for one request
+Request = Tuple[str, str, str, Optional[dict], Dict[str, str]]
+
+
+@dataclass
+class BenchmarkContext:
+    """Tokens and ids the scenarios draw their requests from"""
+    admin_headers: Dict[str, str]
+    salesperson_headers: List[Dict[str, str]]
+    lead_ids: List[int]
+    login_emails: List[str]
+    total_leads: int = field(default=0)
+
+
+def leads_list(ctx: BenchmarkContext, rng: random.Random) -> Request:
+    return "GET /leads/", "GET", f"/leads/?per_page=50&page={rng.randint(1, 20)}", None, ctx.admin_headers
+
+
+def leads_filtered(ctx: BenchmarkContext, rng: random.Random) -> Request:
+    status = rng.choice([LeadStatus.NEW, LeadStatus.IN_PROGRESS, LeadStatus.CNP]).value
+    return "GET /leads/", "GET", f"/leads/?per_page=50&status={status}", None, rng.choice(ctx.salesperson_headers)
+
+
+def stats_overview(ctx: BenchmarkContext, rng: random.Random) -> Request:
+    headers = ctx.admin_headers if rng.random() < 0.5 else rng.choice(ctx.salesperson_headers)
+    return "GET /leads/stats/overview", "GET", "/leads/stats/overview", None, headers
+
+
+def lifecycle(ctx: BenchmarkContext, rng: random.Random) -> Request:
+    lead_id = rng.choice(ctx.lead_ids)
+    action = rng.random()
+    if action < 0.4:
+        status = rng.choice([LeadStatus.IN_PROGRESS, LeadStatus.INTERESTED_2, LeadStatus.QUALIFIED]).value
+        body = {"status": status, "reason": "benchmark"}
+        return "PATCH /leads/{lead_id}/status", "PATCH", f"/leads/{lead_id}/status", body, ctx.admin_headers
+    if action < 0.8:
+        body = {"interest_level": rng.randint(0, 5)}
+        return "PATCH /leads/{lead_id}/interest", "PATCH", f"/leads/{lead_id}/interest", body, ctx.admin_headers
+    return "POST /leads/{lead_id}/cnp", "POST", f"/leads/{lead_id}/cnp", {"reason": "benchmark"}, ctx.admin_headers
+
+
+def login(ctx: BenchmarkContext, rng: random.Random) -> Request:
+    body = {"email": rng.choice(ctx.login_emails), "password": BENCH_PASSWORD}
+    return "POST /auth/login", "POST", "/auth/login", body, {}
+
+
+SCENARIOS: Dict[str, Callable[[BenchmarkContext, random.Random], Request]] = {
+    "leads_list": leads_list,
+    "leads_filtered": leads_filtered,
+    "stats_overview": stats_overview,
+    "lifecycle": lifecycle,
+    "login": login,
+}
+
+
+async def login_headers(client: httpx.AsyncClient, email: str) -> Dict[str, str]:
+    response = await client.post("/auth/login", json={"email": email, "password": BENCH_PASSWORD})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def prepare_context(
+    client: httpx.AsyncClient, users: int = 300, salespeople: int = 10, lead_sample: int = 500
+) -> BenchmarkContext:
+    """Log in benchmark users and sample the newest lead_sample lead ids to act on"""
+    counts = role_counts(users)
+    admin_headers = await login_headers(client, bench_email(UserRole.ADMIN, 1))
+    salesperson_headers = [
+        await login_headers(client, bench_email(UserRole.SALESPERSON, i))
+        for i in range(1, min(salespeople, counts[UserRole.SALESPERSON]) + 1)
+    ]
+    lead_ids, after, total = [], None, 0
+    while len(lead_ids) < lead_sample:
+        params = {"per_page": 100, **({"after": after} if after else {})}
+        response = await client.get("/leads/", params=params, headers=admin_headers)
+        response.raise_for_status()
+        page = response.json()
+        lead_ids += [lead["id"] for lead in page["leads"]]
+        if after is None:
+            total = page["total"]  # cursor pages carry no total
+        after = page.get("next_cursor")
+        if not after:
+            break
+    if not lead_ids:
+        raise RuntimeError("No leads found; run benchmarks.generate_data first")
+    login_emails = [bench_email(role, i) for role, count in counts.items() for i in range(1, count + 1)]
+    return BenchmarkContext(admin_headers, salesperson_headers, lead_ids, login_emails, total)
+
+
+def latency_summary(latencies: List[float], queries: List[int]) -> dict:
+    return {
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        "queries_per_request": round(statistics.fmean(queries), 2) if queries else None,
+        "max_queries": max(queries) if queries else None,
+    }
+
+
+class ScenarioSamples:
+    """Latencies and query counts of one scenario, overall and per endpoint"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.queries: List[int] = []
+        self.errors = 0
+        self.endpoints: Dict[str, "ScenarioSamples"] = {}
+
+    def add(self, endpoint: str, latency: float, queries: Optional[int], error: bool) -> None:
+        for samples in (self, self.endpoints.setdefault(endpoint, ScenarioSamples())):
+            samples.latencies.append(latency)
+            if queries is not None:
+                samples.queries.append(queries)
+            samples.errors += error
+
+    def summary(self) -> dict:
+        return {"requests": len(self.latencies), "errors": self.errors, **latency_summary(self.latencies, self.queries)}
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    ctx: BenchmarkContext,
+    name: str,
+    concurrency: int,
+    total_requests: int,
+    seed: int = 42
+) -> dict:
+    """Send total_requests requests of one scenario from concurrency workers"""
+    make_request = SCENARIOS[name]
+    rng = random.Random(seed)
+    samples = ScenarioSamples()
+    remaining = total_requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            endpoint, method, path, body, headers = make_request(ctx, rng)
+            queries = None
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body, headers=headers)
+                error = response.status_code >= 400
+                match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+                if match:
+                    queries = int(match.group(1))
+            except httpx.HTTPError:
+                error = True
+            samples.add(endpoint, time.perf_counter() - started, queries, error)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    return {
+        "scenario": name,
+        "concurrency": concurrency,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_sec": round(len(samples.latencies) / elapsed, 1) if elapsed else 0.0,
+        **samples.summary(),
+        "endpoints": {endpoint: endpoint_samples.summary() for endpoint, endpoint_samples in sorted(samples.endpoints.items())},
+    }
+
+
+async def run_benchmark(
+    client: httpx.AsyncClient,
+    scenarios: List[str],
+    concurrency: int,
+    total_requests: int,
+    users: int = 300
+) -> dict:
+    """Run each scenario in turn and collect their summaries"""
+    ctx = await prepare_context(client, users)
+    results = {}
+    for name in scenarios:
+        results[name] = await run_scenario(client, ctx, name, concurrency, total_requests)
+    return {
+        "concurrency": concurrency,
+        "requests_per_scenario": total_requests,
+        "total_leads": ctx.total_leads,
+        "scenarios": results,
+    }
+
+
+async def run(args: argparse.Namespace) -> dict:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if not args.in_process:
+        async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=120) as client:
+            return await run_benchmark(client, args.scenarios, args.concurrency, args.requests, args.users)
+
+    # Serve the app inside this process (no network hop); still runs its lifespan
+    from main import app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=120) as client:
+            return await run_benchmark(client, args.scenarios, args.concurrency, args.requests, args.users)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="End-to-end API benchmark scenarios")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--in-process", action="store_true", help="Run the app in this process instead of --base-url")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario")
+    parser.add_argument("--users", type=int, default=300, help="--users given to generate_data")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    report = asyncio.run(run(args))
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+    print(output)
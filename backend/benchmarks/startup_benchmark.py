@@ -0,0 +1,77 @@
+"""
+Startup-time benchmark for the Tracklie API
+
+Starts a fresh uvicorn process and measures the time from spawning it
+(interpreter start + import of main) to the first 200 from /health,
+which is what a new worker costs during a scale-out or restart.
+
+Usage (from the backend directory, against a migrated database):
+    python -m benchmarks.startup_benchmark --runs 5 --port 8765
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_startup(port: int, timeout: float = 60.0, poll_interval: float = 0.01) -> float:
+    """Seconds from process spawn to the first 200 on /health"""
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        with httpx.Client(timeout=1.0) as client:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"Server exited with code {process.returncode} before becoming healthy")
+                try:
+                    if client.get(f"http://127.0.0.1:{port}/health").status_code == 200:
+                        return time.perf_counter() - started
+                except httpx.HTTPError:
+                    pass
+                time.sleep(poll_interval)
+        raise TimeoutError(f"/health did not return 200 within {timeout}s")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def measure_import(runs: int) -> List[float]:
+    """Seconds for `import main` alone in a fresh interpreter"""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], cwd=BACKEND_DIR, check=True)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def summarize(timings: List[float]) -> Dict[str, float]:
+    return {
+        "min_ms": round(min(timings) * 1000, 1),
+        "median_ms": round(statistics.median(timings) * 1000, 1),
+        "max_ms": round(max(timings) * 1000, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="API startup-time benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    result = {
+        "runs": args.runs,
+        "import_main": summarize(measure_import(args.runs)),
+        "spawn_to_first_health_200": summarize([measure_startup(args.port) for _ in range(args.runs)]),
+    }
+    print(json.dumps(result, indent=2))
@@ -1,26 +1,65 @@
 """
 Authentication utilities for JWT tokens and password hashing
 """
+import asyncio
 import hashlib
+import os
 import secrets
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from core.database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.cache import ExpiringLRUCache
+from core.database import get_async_db
+from core.token_revocation import token_revocations
+from core.user_cache import UserPrincipal, user_principal_cache
 from models.user import User, UserRole
 from schemas.auth import TokenData
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Configuration
 SECRET_KEY = "tracklie-secret-key-change-in-production"  # Should be in env
 ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_HOURS = 1
+# Short-lived access tokens, renewed through /auth/refresh with a refresh token
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
+
+# Per-worker cache of verified tokens (keyed by token hash, kept until exp)
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "50000"))
+verified_token_cache = ExpiringLRUCache(AUTH_TOKEN_CACHE_SIZE, ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+
+# Password hashing: the first scheme hashes new passwords; older schemes still verify
+PASSWORD_HASH_SCHEMES = os.getenv("PASSWORD_HASH_SCHEMES", "sha256_crypt").split(",")
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "0")) or None
+# Threads hashing/verifying passwords off the event loop (crypt releases the GIL)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+
+def build_password_context(schemes: List[str], rounds: Optional[int] = None) -> CryptContext:
+    """CryptContext flagging hashes in an older scheme, or with other rounds, for rehash"""
+    settings = {}
+    if rounds:
+        scheme = schemes[0]
+        settings = {
+            f"{scheme}__default_rounds": rounds,
+            f"{scheme}__min_rounds": rounds,
+            f"{scheme}__max_rounds": rounds,
+        }
+    return CryptContext(schemes=schemes, deprecated="auto", **settings)
+
 
 # Password hashing context (using SHA256 as requested)
-pwd_context = CryptContext(schemes=["sha256_crypt"], deprecated="auto")
+pwd_context = build_password_context(PASSWORD_HASH_SCHEMES, PASSWORD_HASH_ROUNDS)
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
 
 # HTTP Bearer token scheme
 security = HTTPBearer()
@@ -36,21 +75,69 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+async def hash_password_async(password: str) -> str:
+    """hash_password on the password executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, hash_password, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify on the password executor; returns (valid, new hash if the stored one is outdated)"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        password_executor, pwd_context.verify_and_update, plain_password, hashed_password
+    )
+
+
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
-    """Create JWT access token"""
+    """Create JWT access token (with a jti so it can be revoked)"""
     to_encode = data.copy()
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
-        expire = datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
+        expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
-def verify_token(token: str) -> TokenData:
-    """Verify and decode JWT token"""
+def create_refresh_token(user_id: int) -> str:
+    """Create JWT refresh token; only accepted by /auth/refresh"""
+    expire = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    to_encode = {"sub": str(user_id), "exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"}
+    return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+
+
+def decode_refresh_token(token: str) -> Dict[str, Any]:
+    """Verify a refresh token's signature, expiry and type; returns its payload"""
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        payload = {}
+    if payload.get("type") != "refresh" or not payload.get("sub") or not payload.get("jti"):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+        )
+    return payload
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def decode_token(token: str) -> TokenData:
+    """Verify and decode JWT access token
+
+    The signature is checked once per token per worker; later calls are
+    served from verified_token_cache until the token's exp.
+    """
+    token_hash = hash_token(token)
+    cached = verified_token_cache.get(token_hash)
+    if cached is not None:
+        return cached
+    
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -63,24 +150,44 @@ def verify_token(token: str) -> TokenData:
         email: str = payload.get("email")
         role: str = payload.get("role")
         
-        if user_id is None or email is None:
+        if user_id is None or email is None or payload.get("type") == "refresh":
             raise credentials_exception
             
         token_data = TokenData(
             user_id=user_id,
             email=email,
-            role=UserRole(role) if role else None
+            role=UserRole(role) if role else None,
+            jti=payload.get("jti"),
+            exp=payload.get("exp")
         )
+        if token_data.exp is not None:
+            verified_token_cache.put(token_hash, token_data, ttl_seconds=token_data.exp - time.time())
         return token_data
     except JWTError:
         raise credentials_exception
 
 
-def get_current_user(
+async def verify_token(token: str, db: AsyncSession) -> TokenData:
+    """Decode an access token and reject it if it has been revoked
+
+    The revocation check is a bloom filter lookup; the database is only
+    consulted when the filter reports a possible match.
+    """
+    token_data = decode_token(token)
+    if token_data.jti and await token_revocations.is_revoked(db, token_data.jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    """Get current authenticated user"""
+    db: AsyncSession = Depends(get_async_db)
+) -> UserPrincipal:
+    """Get current authenticated user (served from the principal cache when possible)"""
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -88,11 +195,15 @@ def get_current_user(
     )
     
     token = credentials.credentials
-    token_data = verify_token(token)
+    token_data = await verify_token(token, db)
     
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    user = user_principal_cache.get(token_data.user_id)
     if user is None:
-        raise credentials_exception
+        db_user = await db.get(User, token_data.user_id)
+        if db_user is None:
+            raise credentials_exception
+        user = UserPrincipal.from_user(db_user)
+        user_principal_cache.put(user.id, user)
     
     if not user.is_active:
         raise HTTPException(
@@ -103,7 +214,7 @@ def get_current_user(
     return user
 
 
-def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_active_user(current_user: UserPrincipal = Depends(get_current_user)) -> UserPrincipal:
     """Get current active user"""
     if not current_user.is_active:
         raise HTTPException(
@@ -113,11 +224,21 @@ def get_current_active_user(current_user: User = Depends(get_current_user)) -> U
     return current_user
 
 
-def authenticate_user(db: Session, email: str, password: str) -> Optional[User]:
-    """Authenticate user with email and password"""
-    user = db.query(User).filter(User.email == email).first()
+async def authenticate_user(db: AsyncSession, email: str, password: str) -> Optional[User]:
+    """Authenticate user with email and password
+
+    Verification runs off the event loop. A hash made with an outdated
+    scheme or rounds setting is replaced with a fresh one on success.
+    """
+    result = await db.execute(select(User).where(User.email == email))
+    user = result.scalar_one_or_none()
     if not user:
         return None
-    if not verify_password(password, user.password_hash):
+    valid, new_hash = await verify_and_update_password(password, user.password_hash)
+    if not valid:
         return None
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+        logger.info(f"Rehashed password for user {user.id} with current settings")
     return user
@@ -1,7 +1,13 @@
-from sqlalchemy import create_engine
+from contextlib import contextmanager
+from typing import Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncAttrs, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from dotenv import load_dotenv
+from core.metrics import instrument_engine
+from core.pool_monitor import MonitoredAsyncQueuePool, pool_monitor
 import os
 
 load_dotenv()
@@ -12,19 +18,152 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL environment variable is not set")
 
+# Sync drivers and their asyncio counterparts
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "mysql+pymysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def get_async_database_url(url: str) -> str:
+    """Derive the asyncio driver URL from a sync database URL"""
+    parsed = make_url(url)
+    drivername = ASYNC_DRIVERS.get(parsed.drivername, parsed.drivername)
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
+
+
+# Async URL can be overridden explicitly, otherwise derived from DATABASE_URL
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL") or get_async_database_url(DATABASE_URL)
+
+ECHO_SQL = os.getenv("ENVIRONMENT") == "development"
+
+# Connection pool settings (per engine, per worker process)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+
+
+def pool_options(url: str, poolclass=None) -> dict:
+    """Queue pool sizing for a URL (SQLite keeps SQLAlchemy's default pool)"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    options = dict(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+    if poolclass is not None:
+        options["poolclass"] = poolclass
+    return options
+
+
 # Create SQLAlchemy engine
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
-    pool_recycle=300,
-    echo=True if os.getenv("ENVIRONMENT") == "development" else False
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=ECHO_SQL,
+    **pool_options(DATABASE_URL)
 )
 
+# Create async engine used by the API routes (its pool is watched by pool_monitor)
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=ECHO_SQL,
+    **pool_options(ASYNC_DATABASE_URL, MonitoredAsyncQueuePool)
+)
+pool_monitor.attach(async_engine)
+instrument_engine(engine)
+instrument_engine(async_engine)
+
+# Optional read replica for read-only service methods
+REPLICA_DATABASE_URL = os.getenv("REPLICA_DATABASE_URL")
+ASYNC_REPLICA_DATABASE_URL = os.getenv("ASYNC_REPLICA_DATABASE_URL") or (
+    get_async_database_url(REPLICA_DATABASE_URL) if REPLICA_DATABASE_URL else None
+)
+replica_engine = create_async_engine(
+    ASYNC_REPLICA_DATABASE_URL,
+    pool_pre_ping=True,
+    pool_recycle=DB_POOL_RECYCLE,
+    echo=ECHO_SQL,
+    **pool_options(ASYNC_REPLICA_DATABASE_URL)
+) if ASYNC_REPLICA_DATABASE_URL else None
+if replica_engine is not None:
+    instrument_engine(replica_engine)
+
+
+class ReplicaState:
+    """Replica health as last measured by services/replica_monitor.py
+
+    Starts unhealthy, so reads stay on the primary until the first
+    heartbeat shows the replica is within REPLICA_MAX_LAG_SECONDS.
+    """
+    healthy: bool = False
+    lag_seconds: Optional[float] = None
+
+
+replica_state = ReplicaState()
+
+
+class RoutingSession(Session):
+    """Session that sends reads inside read_from_replica() to the replica
+
+    Everything else, and every read after this session has written
+    (read-your-writes), goes to the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if (
+            replica_engine is not None
+            and replica_state.healthy
+            and self.info.get("replica_reads")
+            and not self.info.get("wrote")
+            and not self._flushing
+            and getattr(clause, "is_select", False)
+        ):
+            return replica_engine.sync_engine
+        return super().get_bind(mapper=mapper, clause=clause, **kw)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _mark_session_wrote(session, flush_context):
+    session.info["wrote"] = True
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _mark_session_dml(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info["wrote"] = True
+
+
+@contextmanager
+def read_from_replica(db: AsyncSession, enabled: bool = True):
+    """Route this session's SELECTs in the block to the replica (when healthy)"""
+    previous = db.info.get("replica_reads", False)
+    db.info["replica_reads"] = enabled
+    try:
+        yield
+    finally:
+        db.info["replica_reads"] = previous
+
+
 # Create SessionLocal class
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create Base class for models
-Base = declarative_base()
+# Create AsyncSessionLocal class (objects stay usable after commit)
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    sync_session_class=RoutingSession,
+    autoflush=False,
+    expire_on_commit=False
+)
+
+# Create Base class for models (AsyncAttrs allows awaiting lazy relationships)
+Base = declarative_base(cls=AsyncAttrs)
 
 # Dependency to get DB session
 def get_db():
@@ -33,3 +172,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency to get async DB session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
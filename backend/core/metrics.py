@@ -0,0 +1,192 @@
+"""
+Request metrics in Prometheus text format
+
+MetricsMiddleware times every HTTP request and files it under its route
+template (``/leads/{lead_id}``, not the raw path, so label cardinality is
+bounded by the number of routes). Queries are attributed to the request
+that ran them through a context variable set by the middleware and read
+by cursor-execute events on each instrumented engine.
+
+Everything is kept in plain per-worker dicts; /metrics renders them on
+demand, so the per-request cost is a few dict updates.
+"""
+import bisect
+import time
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Label for requests that matched no route (404s on arbitrary paths)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RequestStats:
+    """Database work done while serving one request
+
+    statements maps each SQL string to [executions, distinct parameter
+    reprs (at most two are kept)], which is enough to spot N+1 patterns.
+    """
+    __slots__ = ("queries", "db_seconds", "statements")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: Dict[str, list] = {}
+
+
+current_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("current_request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if current_request_stats.get() is not None:
+        conn.info.setdefault("query_started_at", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = current_request_stats.get()
+    started = conn.info.get("query_started_at")
+    if stats is None or not started:
+        return
+    stats.queries += 1
+    stats.db_seconds += time.perf_counter() - started.pop()
+    entry = stats.statements.get(statement)
+    if entry is None:
+        entry = stats.statements[statement] = [0, set()]
+    entry[0] += 1
+    if len(entry[1]) < 2:
+        entry[1].add(repr(parameters))
+
+
+def instrument_engine(engine) -> None:
+    """Attribute an (async) engine's queries to the current request"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class RouteMetrics:
+    """Counters and latency histogram for one (method, route)"""
+    __slots__ = ("statuses", "bucket_counts", "duration_sum", "errors", "queries", "db_seconds")
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.bucket_counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.duration_sum = 0.0
+        self.errors = 0
+        self.queries = 0
+        self.db_seconds = 0.0
+
+    @property
+    def count(self) -> int:
+        return sum(self.bucket_counts)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class MetricsRegistry:
+    """Per-worker request metrics"""
+
+    def __init__(self):
+        self.routes: Dict[Tuple[str, str], RouteMetrics] = {}
+        self.in_flight = 0
+
+    def observe(self, method: str, route: str, status_code: int, duration: float, stats: RequestStats) -> None:
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        metrics.statuses[status_code] = metrics.statuses.get(status_code, 0) + 1
+        metrics.bucket_counts[bisect.bisect_left(LATENCY_BUCKETS, duration)] += 1
+        metrics.duration_sum += duration
+        if status_code >= 500:
+            metrics.errors += 1
+        metrics.queries += stats.queries
+        metrics.db_seconds += stats.db_seconds
+
+    def clear(self) -> None:
+        self.routes.clear()
+
+    def render_prometheus(self) -> List[str]:
+        """Request metrics in Prometheus text format"""
+        requests, buckets, errors, queries, db_time = [], [], [], [], []
+        for (method, route), metrics in sorted(self.routes.items()):
+            labels = f'method="{method}",route="{_escape(route)}"'
+            for status_code, count in sorted(metrics.statuses.items()):
+                requests.append(f'tracklie_http_requests_total{{{labels},status="{status_code}"}} {count}')
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, metrics.bucket_counts):
+                cumulative += count
+                buckets.append(f'tracklie_http_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            buckets.append(f'tracklie_http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {metrics.count}')
+            buckets.append(f"tracklie_http_request_duration_seconds_sum{{{labels}}} {round(metrics.duration_sum, 6)}")
+            buckets.append(f"tracklie_http_request_duration_seconds_count{{{labels}}} {metrics.count}")
+            errors.append(f"tracklie_http_request_errors_total{{{labels}}} {metrics.errors}")
+            queries.append(f"tracklie_db_queries_total{{{labels}}} {metrics.queries}")
+            db_time.append(f"tracklie_db_query_seconds_total{{{labels}}} {round(metrics.db_seconds, 6)}")
+
+        lines = []
+        for name, kind, help_text, samples in (
+            ("tracklie_http_requests_total", "counter", "HTTP requests by route and status", requests),
+            ("tracklie_http_request_duration_seconds", "histogram", "HTTP request latency by route", buckets),
+            ("tracklie_http_request_errors_total", "counter", "HTTP requests answered with 5xx", errors),
+            ("tracklie_http_requests_in_flight", "gauge", "HTTP requests currently being served",
+             [f"tracklie_http_requests_in_flight {self.in_flight}"]),
+            ("tracklie_db_queries_total", "counter", "SQL statements executed while serving requests", queries),
+            ("tracklie_db_query_seconds_total", "counter", "Time spent in SQL statements while serving requests", db_time),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.extend(samples)
+        return lines
+
+
+metrics_registry = MetricsRegistry()
+
+
+def route_label(scope) -> str:
+    """Route template the request matched (set in the scope by the router)"""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" in scope:
+        # Plain Starlette routes (docs, openapi.json) have fixed paths
+        return scope["path"]
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Record count, latency, errors and DB work per route"""
+
+    def __init__(self, app, registry: MetricsRegistry = metrics_registry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        started = time.perf_counter()
+        self.registry.in_flight += 1
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.registry.in_flight -= 1
+            current_request_stats.reset(token)
+            self.registry.observe(
+                scope["method"], route_label(scope), status_code, time.perf_counter() - started, stats
+            )
@@ -0,0 +1,45 @@
+"""
+Normalization of lead contact details for duplicate detection
+"""
+from typing import Optional
+
+# Numbers without a country code are assumed to be Indian
+DEFAULT_COUNTRY_CODE = "91"
+NATIONAL_NUMBER_LENGTH = 10
+# E.164 numbers have at most 15 digits, so phone_e164 never exceeds 16 characters
+E164_MAX_DIGITS = 15
+
+
+def normalize_phone(phone: Optional[str]) -> Optional[str]:
+    """Best-effort E.164 form of a phone number ("098765 43210" -> "+919876543210")
+
+    None if the number has no digits or too many to be a valid E.164 number.
+    """
+    if not phone:
+        return None
+    digits = "".join(filter(str.isdigit, phone))
+    if not digits:
+        return None
+
+    if phone.strip().startswith("+"):
+        pass
+    elif digits.startswith("00"):
+        # International dialing prefix
+        digits = digits[2:]
+    else:
+        if len(digits) == NATIONAL_NUMBER_LENGTH + 1 and digits.startswith("0"):
+            # Trunk prefix
+            digits = digits[1:]
+        if len(digits) == NATIONAL_NUMBER_LENGTH:
+            digits = DEFAULT_COUNTRY_CODE + digits
+    if len(digits) > E164_MAX_DIGITS:
+        return None
+    return f"+{digits}"
+
+
+def normalize_email(email: Optional[str]) -> Optional[str]:
+    """Case- and whitespace-insensitive form of an email address"""
+    if not email:
+        return None
+    normalized = email.strip().lower()
+    return normalized or None
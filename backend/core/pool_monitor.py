@@ -0,0 +1,164 @@
+"""
+Database connection pool monitoring and back-pressure
+
+PoolMonitor tracks checked-out connections and the requests currently
+waiting for one (MonitoredAsyncQueuePool reports checkouts that have to
+queue because no connection is free and overflow is used up; checkouts
+served at once, or by opening a new connection, are not waits). When the
+oldest waiter has been queued longer than DB_POOL_SHED_WAIT_SECONDS,
+PoolBackpressureMiddleware answers new requests with 503 + Retry-After
+instead of adding them to the queue until they hit pool_timeout.
+"""
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, List
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+DB_POOL_SHED_WAIT_SECONDS = float(os.getenv("DB_POOL_SHED_WAIT_SECONDS", "1.0"))
+DB_POOL_SHED_RETRY_AFTER_SECONDS = int(os.getenv("DB_POOL_SHED_RETRY_AFTER_SECONDS", "2"))
+
+
+class PoolMonitor:
+    """Connection pool gauges for one engine"""
+
+    def __init__(self):
+        self.pool = None
+        self.checked_out = 0
+        self._waiters: Dict[int, float] = {}
+        self._waiter_ids = itertools.count()
+        self.wait_seconds_total = 0.0
+        self.waits = 0
+        self.timeouts = 0
+        self.shed_requests = 0
+
+    def attach(self, engine) -> None:
+        """Follow checkouts on an (async) engine's pool"""
+        sync_engine = getattr(engine, "sync_engine", engine)
+        self.pool = sync_engine.pool
+        event.listen(sync_engine, "checkout", self._on_checkout)
+        event.listen(sync_engine, "checkin", self._on_checkin)
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        self.checked_out += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        self.checked_out = max(0, self.checked_out - 1)
+
+    @contextmanager
+    def waiting(self):
+        """Mark the caller as queued for a connection while the block runs"""
+        waiter_id = next(self._waiter_ids)
+        started = time.monotonic()
+        self._waiters[waiter_id] = started
+        try:
+            yield
+        except PoolTimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            del self._waiters[waiter_id]
+            self.waits += 1
+            self.wait_seconds_total += time.monotonic() - started
+
+    def waiting_count(self) -> int:
+        return len(self._waiters)
+
+    def oldest_wait_seconds(self) -> float:
+        """How long the longest-queued request has been waiting right now"""
+        if not self._waiters:
+            return 0.0
+        return time.monotonic() - min(self._waiters.values())
+
+    def snapshot(self) -> Dict[str, float]:
+        queue_pool = isinstance(self.pool, QueuePool)
+        return {
+            "pool_size": self.pool.size() if queue_pool else 0,
+            "checked_out": self.checked_out,
+            "overflow": max(0, self.pool.overflow()) if queue_pool else 0,
+            "waiting": self.waiting_count(),
+            "oldest_wait_seconds": round(self.oldest_wait_seconds(), 3),
+            "wait_seconds_total": round(self.wait_seconds_total, 3),
+            "waits": self.waits,
+            "timeouts": self.timeouts,
+            "shed_requests": self.shed_requests,
+        }
+
+    def render_prometheus(self) -> List[str]:
+        """Gauges and counters in Prometheus text format"""
+        stats = self.snapshot()
+        lines = []
+        for name, kind, help_text in (
+            ("pool_size", "gauge", "Configured persistent connections"),
+            ("checked_out", "gauge", "Connections currently checked out"),
+            ("overflow", "gauge", "Overflow connections currently open"),
+            ("waiting", "gauge", "Requests waiting for a connection"),
+            ("oldest_wait_seconds", "gauge", "Time the oldest waiter has been queued"),
+            ("wait_seconds_total", "counter", "Total time spent waiting for connections"),
+            ("waits", "counter", "Connection checkouts that queued for a free connection"),
+            ("timeouts", "counter", "Checkouts that hit pool_timeout"),
+            ("shed_requests", "counter", "Requests rejected with 503 because the pool was saturated"),
+        ):
+            metric = f"tracklie_db_pool_{name}"
+            if kind == "counter" and not metric.endswith("_total"):
+                metric += "_total"
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} {kind}")
+            lines.append(f"{metric} {stats[name]}")
+        return lines
+
+
+pool_monitor = PoolMonitor()
+
+
+class MonitoredAsyncQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports checkout waits to pool_monitor"""
+
+    def _must_wait(self) -> bool:
+        """No idle connection and no overflow left: the checkout blocks on the queue"""
+        return self._pool.empty() and -1 < self._max_overflow <= self._overflow
+
+    def _do_get(self):
+        if not self._must_wait():
+            return super()._do_get()
+        with pool_monitor.waiting():
+            return super()._do_get()
+
+
+class PoolBackpressureMiddleware:
+    """Shed requests with 503 while the connection pool queue is too slow"""
+
+    def __init__(
+        self,
+        app,
+        monitor: PoolMonitor = pool_monitor,
+        max_wait_seconds: float = DB_POOL_SHED_WAIT_SECONDS,
+        retry_after_seconds: int = DB_POOL_SHED_RETRY_AFTER_SECONDS,
+        exempt_paths=("/health", "/metrics")
+    ):
+        self.app = app
+        self.monitor = monitor
+        self.max_wait_seconds = max_wait_seconds
+        self.retry_after_seconds = retry_after_seconds
+        self.exempt_paths = set(exempt_paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] == "http"
+            and self.max_wait_seconds > 0
+            and scope["path"] not in self.exempt_paths
+            and self.monitor.oldest_wait_seconds() > self.max_wait_seconds
+        ):
+            self.monitor.shed_requests += 1
+            response = JSONResponse(
+                {"detail": "Database is busy, please retry shortly"},
+                status_code=503,
+                headers={"Retry-After": str(self.retry_after_seconds)}
+            )
+            await response(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
@@ -0,0 +1,95 @@
+"""
+Per-request query diagnostics - Server-Timing, query budget and N+1 detection
+
+QueryMonitorMiddleware reads the RequestStats that MetricsMiddleware
+collects for the request (see core/metrics.py) and
+
+- adds a Server-Timing header (db time, query count, total time) outside
+  production, so the numbers show up in the browser's network panel;
+- logs requests that ran more than QUERY_BUDGET statements;
+- logs a suspected N+1 when the same statement ran at least
+  N_PLUS_ONE_THRESHOLD times with different parameters.
+"""
+import os
+import time
+from typing import List, Tuple
+from core.metrics import RequestStats, current_request_stats, route_label
+import logging
+
+logger = logging.getLogger(__name__)
+
+QUERY_BUDGET = int(os.getenv("QUERY_BUDGET", "25"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+SERVER_TIMING_ENABLED = os.getenv("ENVIRONMENT", "development") != "production"
+
+
+def suspected_n_plus_one(stats: RequestStats, threshold: int = N_PLUS_ONE_THRESHOLD) -> List[Tuple[str, int]]:
+    """(statement, executions) for statements repeated with different parameters"""
+    if threshold <= 0:
+        return []
+    return [
+        (statement, count)
+        for statement, (count, parameters) in stats.statements.items()
+        if count >= threshold and len(parameters) > 1
+    ]
+
+
+def server_timing(stats: RequestStats, total_seconds: float) -> str:
+    """Server-Timing header value for a request"""
+    return (
+        f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries", '
+        f"total;dur={total_seconds * 1000:.1f}"
+    )
+
+
+class QueryMonitorMiddleware:
+    """Expose and police the database work of each request"""
+
+    def __init__(
+        self,
+        app,
+        query_budget: int = QUERY_BUDGET,
+        n_plus_one_threshold: int = N_PLUS_ONE_THRESHOLD,
+        server_timing_enabled: bool = SERVER_TIMING_ENABLED
+    ):
+        self.app = app
+        self.query_budget = query_budget
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.server_timing_enabled = server_timing_enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = current_request_stats.get()
+        token = None
+        if stats is None:
+            # Not running under MetricsMiddleware: collect stats here
+            stats = RequestStats()
+            token = current_request_stats.set(stats)
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start" and self.server_timing_enabled:
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(stats, time.perf_counter() - started).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if token is not None:
+                current_request_stats.reset(token)
+            self.report(scope, stats)
+
+    def report(self, scope, stats: RequestStats) -> None:
+        request = f"{scope['method']} {route_label(scope)}"
+        if self.query_budget > 0 and stats.queries > self.query_budget:
+            logger.warning(
+                f"{request} ran {stats.queries} queries (budget {self.query_budget}) "
+                f"in {stats.db_seconds * 1000:.1f}ms"
+            )
+        for statement, count in suspected_n_plus_one(stats, self.n_plus_one_threshold):
+            logger.warning(f"Suspected N+1 in {request}: ran {count} times: {' '.join(statement.split())[:200]}")
@@ -0,0 +1,132 @@
+"""
+Schema management - explicit migrations and the startup version check
+
+The app no longer creates tables on import. migrate.py brings the database
+up to date (missing tables, columns and indexes) and stamps SCHEMA_VERSION; at
+startup the app only reads that one row and compares it with the version
+this code expects.
+
+Bump SCHEMA_VERSION whenever a model change needs migrate.py to be run.
+"""
+import os
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import inspect, select, text
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.exc import DBAPIError
+from core.database import Base, async_engine
+from models import SchemaVersion  # importing models registers every table on Base.metadata
+from services.lead_counter_service import rebuild_lead_counters
+import logging
+
+logger = logging.getLogger(__name__)
+
+# 2: leads.version, 3: lead_status_history (lead_id, changed_at, id) index,
+# 4: idempotency_keys.claimed_at
+SCHEMA_VERSION = 4
+
+# strict: refuse to start on a mismatch, warn: log and start anyway, off: skip the check
+SCHEMA_VERSION_CHECK = os.getenv("SCHEMA_VERSION_CHECK", "strict")
+
+
+class SchemaVersionError(RuntimeError):
+    """The database schema does not match what this code expects"""
+
+
+def add_missing_columns(engine, table_names: List[str]) -> List[str]:
+    """ALTER TABLE ... ADD COLUMN for model columns missing from existing tables
+
+    New columns need a server default (or to be nullable) to be added to
+    tables that already hold rows.
+    """
+    inspector = inspect(engine)
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+        existing = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            ddl = CreateColumn(column).compile(dialect=engine.dialect)
+            with engine.begin() as connection:
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def create_missing_indexes(engine, table_names: Optional[List[str]] = None) -> List[str]:
+    """Create indexes declared on the models but missing from existing tables"""
+    inspector = inspect(engine)
+    if table_names is None:
+        table_names = inspector.get_table_names()
+    created = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in table_names:
+            continue
+        existing = {index["name"] for index in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            if index.dialect_options["mysql"].get("prefix") == "FULLTEXT" and engine.dialect.name != "mysql":
+                continue
+            index.create(bind=engine)
+            created.append(index.name)
+    return created
+
+
+def stamp_schema_version(connection, version: int = SCHEMA_VERSION) -> None:
+    """Record that the schema is at version"""
+    table = SchemaVersion.__table__
+    connection.execute(table.delete())
+    connection.execute(table.insert().values(id=1, version=version, applied_at=datetime.utcnow()))
+
+
+def migrate(engine) -> List[str]:
+    """Create missing tables, columns and indexes, then stamp SCHEMA_VERSION
+
+    A lead_counters table created for an existing leads table is filled from
+    it right away. Returns the names of the columns and indexes added to existing tables.
+    """
+    # Tables created below are complete; only older ones need checking
+    existing_tables = inspect(engine).get_table_names()
+    Base.metadata.create_all(bind=engine)
+    created = add_missing_columns(engine, existing_tables)
+    created += create_missing_indexes(engine, existing_tables)
+    if "leads" in existing_tables and "lead_counters" not in existing_tables:
+        # Stats read only the rollup, and writes to older leads would
+        # decrement buckets that were never filled
+        with Session(bind=engine) as db:
+            rebuild_lead_counters(db)
+    with engine.begin() as connection:
+        stamp_schema_version(connection)
+    logger.info(f"Schema migrated to version {SCHEMA_VERSION} ({len(created)} columns/indexes added)")
+    return created
+
+
+async def get_schema_version(engine=async_engine) -> Optional[int]:
+    """Version stamped in the database (None if it was never migrated)"""
+    try:
+        async with engine.connect() as connection:
+            return await connection.scalar(select(SchemaVersion.version).where(SchemaVersion.id == 1))
+    except DBAPIError as e:
+        # Missing schema_version table: the database predates migrate.py
+        logger.debug(f"Could not read schema version: {str(e)}")
+        return None
+
+
+async def check_schema_version(engine=async_engine, mode: str = SCHEMA_VERSION_CHECK) -> Optional[int]:
+    """Compare the database's schema version with SCHEMA_VERSION (one query)"""
+    if mode == "off":
+        return None
+    version = await get_schema_version(engine)
+    if version != SCHEMA_VERSION:
+        message = (
+            f"Database schema version is {version}, this code expects {SCHEMA_VERSION}; "
+            "run `python migrate.py` first"
+        )
+        if mode == "strict":
+            raise SchemaVersionError(message)
+        logger.warning(message)
+    return version
@@ -0,0 +1,183 @@
+"""
+Token revocation - bloom filter in front of the revoked_tokens table
+
+Every authenticated request asks whether its token's jti was revoked. The
+answer is almost always "no", and the bloom filter gives it from memory.
+Only a filter hit (a revoked token, or a false positive at roughly
+REVOCATION_FILTER_ERROR_RATE) is confirmed against revoked_tokens.
+
+Revocations made by other workers reach this worker's filter through
+sync(), run every REVOCATION_SYNC_INTERVAL_SECONDS from the app lifespan.
+Bloom filters cannot forget, so the filter is rebuilt from unexpired rows
+every REVOCATION_REBUILD_INTERVAL_SECONDS after expired rows are purged.
+"""
+import asyncio
+import hashlib
+import math
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.revoked_token import RevokedToken
+import logging
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_FILTER_CAPACITY = int(os.getenv("REVOCATION_FILTER_CAPACITY", "100000"))
+REVOCATION_FILTER_ERROR_RATE = float(os.getenv("REVOCATION_FILTER_ERROR_RATE", "0.001"))
+REVOCATION_SYNC_INTERVAL_SECONDS = float(os.getenv("REVOCATION_SYNC_INTERVAL_SECONDS", "5"))
+REVOCATION_REBUILD_INTERVAL_SECONDS = float(os.getenv("REVOCATION_REBUILD_INTERVAL_SECONDS", "3600"))
+# Re-read rows revoked slightly before the last sync, in case their commit landed late
+REVOCATION_SYNC_OVERLAP = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Fixed-size bloom filter over strings (double hashing of one sha256)"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str):
+        digest = hashlib.sha256(key.encode()).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:16], "big") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class TokenRevocationList:
+    """Per-worker revocation filter backed by revoked_tokens"""
+
+    def __init__(self, capacity: int = REVOCATION_FILTER_CAPACITY, error_rate: float = REVOCATION_FILTER_ERROR_RATE):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.filter = BloomFilter(capacity, error_rate)
+        self.synced_until: Optional[datetime] = None
+        self.checks = 0
+        self.filter_hits = 0
+        self.confirmed = 0
+
+    async def is_revoked(self, db: AsyncSession, jti: str) -> bool:
+        """True if the token was revoked; only filter hits query the database"""
+        self.checks += 1
+        if jti not in self.filter:
+            return False
+        self.filter_hits += 1
+        revoked = await db.get(RevokedToken, jti) is not None
+        if revoked:
+            self.confirmed += 1
+        return revoked
+
+    async def revoke(
+        self,
+        db: AsyncSession,
+        jti: str,
+        token_type: str,
+        expires_at: datetime,
+        user_id: Optional[int] = None
+    ) -> bool:
+        """Record a revocation; False if the token was already revoked"""
+        db.add(RevokedToken(
+            jti=jti,
+            user_id=user_id,
+            token_type=token_type,
+            revoked_at=datetime.utcnow(),
+            expires_at=expires_at
+        ))
+        try:
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            self.filter.add(jti)
+            return False
+        self.filter.add(jti)
+        if self.filter.count > self.capacity:
+            logger.warning(
+                f"Revocation filter holds {self.filter.count} tokens (capacity {self.capacity}); "
+                "false positives will rise until the next rebuild"
+            )
+        return True
+
+    async def load(self, db: AsyncSession) -> int:
+        """Rebuild the filter from every unexpired revocation"""
+        now = datetime.utcnow()
+        jtis = (await db.scalars(select(RevokedToken.jti).where(RevokedToken.expires_at > now))).all()
+        rebuilt = BloomFilter(self.capacity, self.error_rate)
+        for jti in jtis:
+            rebuilt.add(jti)
+        self.filter = rebuilt
+        self.synced_until = now
+        return len(jtis)
+
+    async def sync(self, db: AsyncSession) -> int:
+        """Add revocations recorded (by any worker) since the last sync"""
+        if self.synced_until is None:
+            return await self.load(db)
+        now = datetime.utcnow()
+        jtis = (await db.scalars(
+            select(RevokedToken.jti).where(RevokedToken.revoked_at >= self.synced_until - REVOCATION_SYNC_OVERLAP)
+        )).all()
+        for jti in jtis:
+            if jti not in self.filter:
+                self.filter.add(jti)
+        self.synced_until = now
+        return len(jtis)
+
+    async def purge_expired(self, db: AsyncSession) -> int:
+        """Delete revocations of tokens that have expired anyway"""
+        result = await db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow()))
+        await db.commit()
+        return result.rowcount
+
+    def clear(self) -> None:
+        self.filter = BloomFilter(self.capacity, self.error_rate)
+        self.synced_until = None
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "entries": self.filter.count,
+            "capacity": self.capacity,
+            "filter_bytes": len(self.filter.bits),
+            "checks": self.checks,
+            "filter_hits": self.filter_hits,
+            "confirmed_revoked": self.confirmed,
+            "false_positives": self.filter_hits - self.confirmed,
+        }
+
+
+token_revocations = TokenRevocationList()
+
+
+async def maintain_revocations_periodically(
+    session_factory,
+    sync_interval: float = REVOCATION_SYNC_INTERVAL_SECONDS,
+    rebuild_interval: float = REVOCATION_REBUILD_INTERVAL_SECONDS
+) -> None:
+    """Background loop: sync the filter often, purge and rebuild it rarely"""
+    last_rebuild = None
+    while True:
+        try:
+            async with session_factory() as db:
+                now = datetime.utcnow()
+                if last_rebuild is None or (now - last_rebuild).total_seconds() >= rebuild_interval:
+                    purged = await token_revocations.purge_expired(db)
+                    loaded = await token_revocations.load(db)
+                    last_rebuild = now
+                    logger.info(f"Rebuilt revocation filter with {loaded} tokens ({purged} expired purged)")
+                else:
+                    await token_revocations.sync(db)
+        except Exception as e:
+            logger.error(f"Error maintaining token revocations: {str(e)}")
+        await asyncio.sleep(sync_interval)
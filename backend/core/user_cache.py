@@ -0,0 +1,49 @@
+"""
+Per-worker cache of authenticated user principals
+
+get_current_user resolves the bearer token's user id through this cache
+instead of querying the users table on every request. Entries expire after
+AUTH_USER_CACHE_TTL_SECONDS and are dropped as soon as a user's role,
+active flag or name is changed (or the user is deleted) through the ORM in
+this worker; the TTL bounds staleness for changes made by other workers.
+"""
+import os
+from dataclasses import dataclass
+from sqlalchemy import event, inspect
+from core.cache import ExpiringLRUCache
+from models.user import User, UserRole
+
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL_SECONDS = float(os.getenv("AUTH_USER_CACHE_TTL_SECONDS", "60"))
+
+# Changes to these columns invalidate a cached principal
+PRINCIPAL_FIELDS = ("role", "is_active", "name", "email")
+
+
+@dataclass(frozen=True)
+class UserPrincipal:
+    """The parts of a user that authorization checks need"""
+    id: int
+    email: str
+    name: str
+    role: UserRole
+    is_active: bool
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserPrincipal":
+        return cls(id=user.id, email=user.email, name=user.name, role=user.role, is_active=user.is_active)
+
+
+user_principal_cache = ExpiringLRUCache(AUTH_USER_CACHE_SIZE, AUTH_USER_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(User, "after_update")
+def _invalidate_changed_principal(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in PRINCIPAL_FIELDS):
+        user_principal_cache.invalidate(target.id)
+
+
+@event.listens_for(User, "after_delete")
+def _invalidate_deleted_principal(mapper, connection, target):
+    user_principal_cache.invalidate(target.id)
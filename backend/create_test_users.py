@@ -6,12 +6,10 @@ import os
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from sqlalchemy.orm import Session
-from core.database import SessionLocal, engine, Base
+from core.database import SessionLocal, engine
 from models.user import User, UserRole
 from core.auth import hash_password
-
-# Create tables
-Base.metadata.create_all(bind=engine)
+from core.schema import migrate
 
 def create_test_users():
     """Create test users with different roles"""
@@ -101,4 +99,6 @@ def create_test_users():
         db.close()
 
 if __name__ == "__main__":
+    # Create tables and stamp the schema version
+    migrate(engine)
     create_test_users()
@@ -0,0 +1,55 @@
+"""
+Rebuild or verify the lead_counters rollup table
+
+Usage:
+    python lead_counters.py rebuild   # recompute every bucket from the leads table
+    python lead_counters.py check     # report drift, exit code 1 if any
+
+migrate fills the table when it first creates it; run rebuild whenever
+check reports drift. Rebuild while lead writes are quiet: writes that land during
+the rebuild may be counted twice or not at all.
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.database import SessionLocal, engine
+from core.schema import migrate
+from services.lead_counter_service import find_counter_drift, rebuild_lead_counters
+
+
+def rebuild() -> int:
+    db = SessionLocal()
+    try:
+        buckets = rebuild_lead_counters(db)
+        print(f"✅ Rebuilt {buckets} lead counter buckets")
+        return 0
+    finally:
+        db.close()
+
+
+def check() -> int:
+    db = SessionLocal()
+    try:
+        drift = find_counter_drift(db)
+        if not drift:
+            print("✅ Lead counters are consistent with the leads table")
+            return 0
+        print(f"❌ {len(drift)} lead counter buckets have drifted:")
+        for (assigned_to, status, source, priority), (stored, actual) in sorted(drift.items()):
+            print(f"  assigned_to={assigned_to} {status}/{source or '-'}/{priority}: stored={stored} actual={actual}")
+        return 1
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the lead_counters rollup table")
+    parser.add_argument("command", choices=["rebuild", "check"])
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        # Create tables and stamp the schema version (check stays read-only)
+        migrate(engine)
+        sys.exit(rebuild())
+    sys.exit(check())
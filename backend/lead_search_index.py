@@ -0,0 +1,38 @@
+"""
+Rebuild the lead_search_tokens index used by the token search backend
+
+Usage:
+    python lead_search_index.py rebuild [--batch-size 1000]
+
+Needed once when switching LEAD_SEARCH_BACKEND to "tokens" on an existing
+database; LeadService keeps the index current afterwards. The MySQL
+FULLTEXT backend is maintained by the database and needs no rebuild.
+"""
+import argparse
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.database import SessionLocal, engine
+from core.schema import migrate
+from services.lead_search import rebuild_search_tokens
+
+
+def rebuild(batch_size: int) -> int:
+    db = SessionLocal()
+    try:
+        indexed = rebuild_search_tokens(db, batch_size=batch_size)
+        print(f"✅ Indexed search tokens for {indexed} leads")
+        return 0
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Maintain the lead search token index")
+    parser.add_argument("command", choices=["rebuild"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    # Create tables and stamp the schema version
+    migrate(engine)
+    sys.exit(rebuild(args.batch_size))
@@ -1,17 +1,49 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from dotenv import load_dotenv
 import os
-from core.database import engine, Base
+from core.database import AsyncSessionLocal, replica_engine
 from api.auth import router as auth_router
 from api.leads import router as leads_router
 from api.lead_lifecycle import router as lead_lifecycle_router
+from core.metrics import MetricsMiddleware, metrics_registry
+from core.pool_monitor import PoolBackpressureMiddleware, pool_monitor
+from core.query_monitor import QueryMonitorMiddleware
+from core.schema import check_schema_version
+from core.token_revocation import maintain_revocations_periodically
+from services.idempotency_service import IDEMPOTENCY_PURGE_INTERVAL_SECONDS, purge_expired_periodically
+from services.replica_monitor import monitor_replica_periodically
+from services.user_activity import user_activity
+from services.webhook_ingestion import webhook_queue
 
 # Load environment variables
 load_dotenv()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Tables are managed by migrate.py; startup only checks the schema version
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background workers on startup and drain them on shutdown"""
+    await check_schema_version()
+    await webhook_queue.start()
+    await user_activity.start()
+    idempotency_purger = asyncio.create_task(
+        purge_expired_periodically(AsyncSessionLocal, IDEMPOTENCY_PURGE_INTERVAL_SECONDS)
+    )
+    revocation_sync = asyncio.create_task(maintain_revocations_periodically(AsyncSessionLocal))
+    replica_monitor = asyncio.create_task(monitor_replica_periodically()) if replica_engine is not None else None
+    yield
+    if replica_monitor is not None:
+        replica_monitor.cancel()
+    revocation_sync.cancel()
+    idempotency_purger.cancel()
+    await webhook_queue.stop()
+    await user_activity.stop()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -19,7 +51,8 @@ app = FastAPI(
     description="Advanced CRM System with Role-Based Access Control",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS settings
@@ -29,12 +62,23 @@ origins = [
     "http://127.0.0.1:3000",
 ]
 
+# Shed load while requests queue too long for a DB connection (inside CORS so
+# browsers can read the 503)
+app.add_middleware(PoolBackpressureMiddleware)
+
+# Server-Timing header, query budget and N+1 warnings (uses the stats collected below)
+app.add_middleware(QueryMonitorMiddleware)
+
+# Per-route request/DB metrics for /metrics (outside load shedding so 503s are counted)
+app.add_middleware(MetricsMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 # Include routers
@@ -59,6 +103,11 @@ def health_check():
         "message": "Tracklie CRM API is operational"
     }
 
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of request metrics and runtime gauges"""
+    return "\n".join(metrics_registry.render_prometheus() + pool_monitor.render_prometheus()) + "\n"
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,28 @@
+"""
+Bring the database schema up to date
+
+Usage:
+    python migrate.py          # create missing tables/columns/indexes, stamp the schema version
+    python migrate.py --check  # only report the current schema version
+
+Run this on deploy, before starting the API; the API itself only checks
+the stamped version at startup (see core/schema.py).
+"""
+import sys
+import os
+import asyncio
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.database import engine
+from core.schema import SCHEMA_VERSION, get_schema_version, migrate
+
+
+if __name__ == "__main__":
+    current = asyncio.run(get_schema_version())
+    print(f"Database schema version: {current} (code expects {SCHEMA_VERSION})")
+    if "--check" in sys.argv:
+        sys.exit(0 if current == SCHEMA_VERSION else 1)
+    created = migrate(engine)
+    for name in created:
+        print(f"  added {name}")
+    print(f"✅ Schema is at version {SCHEMA_VERSION}")
@@ -2,5 +2,11 @@
 from .user import User, UserRole
 from .lead import Lead, LeadStatus, LeadSource, LeadPriority
 from .lead_status_history import LeadStatusHistory
+from .lead_counter import LeadCounter
+from .lead_search_token import LeadSearchToken
+from .idempotency_key import IdempotencyKey
+from .revoked_token import RevokedToken
+from .replica_heartbeat import ReplicaHeartbeat
+from .schema_version import SchemaVersion
 
-__all__ = ["User", "UserRole", "Lead", "LeadStatus", "LeadSource", "LeadPriority", "LeadStatusHistory"]
+__all__ = ["User", "UserRole", "Lead", "LeadStatus", "LeadSource", "LeadPriority", "LeadStatusHistory", "LeadCounter", "LeadSearchToken", "IdempotencyKey", "RevokedToken", "ReplicaHeartbeat", "SchemaVersion"]
@@ -0,0 +1,28 @@
+"""
+Idempotency key model for replaying responses to retried requests
+"""
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy.sql import func
+from core.database import Base
+
+
+class IdempotencyKey(Base):
+    """Response stored for an Idempotency-Key until it expires
+
+    key_hash is sha256(scope + key), so the row stays compact regardless of
+    how long the client's key is. A row without a status_code is a claim
+    for a request that is still being processed; claimed_at starts its lease.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key_hash = Column(String(64), primary_key=True)
+    scope = Column(String(50), nullable=False)
+    status_code = Column(Integer, nullable=True)
+    response_body = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    claimed_at = Column(DateTime(timezone=True), nullable=True, default=datetime.utcnow)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<IdempotencyKey(scope='{self.scope}', status_code={self.status_code}, expires_at={self.expires_at})>"
@@ -1,10 +1,11 @@
 """
 Lead model for SQLAlchemy
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Index
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.sql import func
 from core.database import Base
+from core.normalization import normalize_email, normalize_phone
 import enum
 
 
@@ -46,6 +47,23 @@ class LeadPriority(str, enum.Enum):
 class Lead(Base):
     """Lead model"""
     __tablename__ = "leads"
+    __table_args__ = (
+        # Keyset pagination seeks on (created_at, id) for GET /leads/
+        Index("ix_leads_created_at_id", "created_at", "id"),
+        # Filtered listings (equality columns first, then the sort key) so each
+        # shape of GET /leads/ is an ordered index walk with no sort step
+        Index("ix_leads_assigned_to_created_at_id", "assigned_to", "created_at", "id"),
+        Index("ix_leads_assigned_to_status_created_at_id", "assigned_to", "status", "created_at", "id"),
+        Index("ix_leads_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_leads_status_source_created_at_id", "status", "source", "created_at", "id"),
+        Index("ix_leads_source_created_at_id", "source", "created_at", "id"),
+        Index("ix_leads_priority_created_at_id", "priority", "created_at", "id"),
+        # Duplicate detection probes; id included so the probe is index-only
+        Index("ix_leads_phone_e164_id", "phone_e164", "id"),
+        Index("ix_leads_email_norm_id", "email_norm", "id"),
+        # Relevance search on MySQL (see services/lead_search.py)
+        Index("ix_leads_search_fulltext", "name", "email", "phone", "company", mysql_prefix="FULLTEXT").ddl_if(dialect="mysql"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     
@@ -55,6 +73,10 @@ class Lead(Base):
     phone = Column(String(20), nullable=False, index=True)
     company = Column(String(255), nullable=True)
     
+    # Normalized contact details for duplicate detection (set from phone/email)
+    phone_e164 = Column(String(20), nullable=True)
+    email_norm = Column(String(255), nullable=True)
+    
     # Lead Details
     job_title = Column(String(255), nullable=True)
     industry = Column(String(255), nullable=True)
@@ -91,10 +113,24 @@ class Lead(Base):
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
     
+    # Optimistic concurrency: bumped by every write (ORM flushes check it too)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    __mapper_args__ = {"version_id_col": version}
+    
     # Relationships
     creator = relationship("User", foreign_keys=[created_by], back_populates="created_leads")
     assignee = relationship("User", foreign_keys=[assigned_to], back_populates="assigned_leads")
     status_history = relationship("LeadStatusHistory", back_populates="lead", cascade="all, delete-orphan")
     
+    @validates("phone")
+    def _set_phone_e164(self, key, value):
+        self.phone_e164 = normalize_phone(value)
+        return value
+    
+    @validates("email")
+    def _set_email_norm(self, key, value):
+        self.email_norm = normalize_email(value)
+        return value
+    
     def __repr__(self):
         return f"<Lead(id={self.id}, name='{self.name}', phone='{self.phone}', status='{self.status}')>"
@@ -0,0 +1,29 @@
+"""
+Lead counter rollup model for dashboard statistics
+"""
+from sqlalchemy import Column, Integer, String, UniqueConstraint
+from core.database import Base
+
+
+class LeadCounter(Base):
+    """Number of leads per (assignee, status, source, priority) bucket
+
+    Maintained incrementally by the lead services in the same transaction as
+    the lead write. Enum columns hold the enum names exactly as stored in the
+    leads table; unassigned leads use assigned_to=0 and missing source uses ''
+    so every bucket is matched by the unique key.
+    """
+    __tablename__ = "lead_counters"
+    __table_args__ = (
+        UniqueConstraint("assigned_to", "status", "source", "priority", name="uq_lead_counters_bucket"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    assigned_to = Column(Integer, nullable=False, default=0)
+    status = Column(String(20), nullable=False)
+    source = Column(String(20), nullable=False, default="")
+    priority = Column(String(20), nullable=False)
+    lead_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<LeadCounter(assigned_to={self.assigned_to}, {self.status}/{self.source}/{self.priority}={self.lead_count})>"
@@ -0,0 +1,24 @@
+"""
+Lead search token model (application-maintained inverted index)
+"""
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from core.database import Base
+
+
+class LeadSearchToken(Base):
+    """One searchable token of a lead's name, email, phone or company
+
+    Used by the token search backend where MySQL FULLTEXT is unavailable
+    (e.g. SQLite). The (token, lead_id) primary key makes prefix lookups a
+    range scan on the token.
+    """
+    __tablename__ = "lead_search_tokens"
+    __table_args__ = (
+        Index("ix_lead_search_tokens_lead_id", "lead_id"),
+    )
+
+    token = Column(String(64), primary_key=True)
+    lead_id = Column(Integer, ForeignKey("leads.id", ondelete="CASCADE"), primary_key=True)
+
+    def __repr__(self):
+        return f"<LeadSearchToken(token='{self.token}', lead_id={self.lead_id})>"
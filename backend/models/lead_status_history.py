@@ -1,7 +1,7 @@
 """
 Lead Status History model for tracking status changes
 """
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -10,6 +10,10 @@ from core.database import Base
 class LeadStatusHistory(Base):
     """Track lead status changes with timestamps and user info"""
     __tablename__ = "lead_status_history"
+    __table_args__ = (
+        # One lead's history, newest first, seeking on (changed_at, id) for cursors and `since`
+        Index("ix_lead_status_history_lead_id_changed_at_id", "lead_id", "changed_at", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     lead_id = Column(Integer, ForeignKey("leads.id"), nullable=False)
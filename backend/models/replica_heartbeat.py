@@ -0,0 +1,16 @@
+"""
+Replica heartbeat model - a timestamp written on the primary and read back from the replica
+"""
+from sqlalchemy import Column, Integer, DateTime
+from core.database import Base
+
+
+class ReplicaHeartbeat(Base):
+    """Single row (id=1) whose beat_at lags on the replica by the replication delay"""
+    __tablename__ = "replica_heartbeats"
+
+    id = Column(Integer, primary_key=True)
+    beat_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<ReplicaHeartbeat(beat_at={self.beat_at})>"
@@ -0,0 +1,19 @@
+"""
+Revoked token model - JWT ids that must no longer be accepted
+"""
+from sqlalchemy import Column, Integer, String, DateTime
+from core.database import Base
+
+
+class RevokedToken(Base):
+    """A revoked access or refresh token, kept until the token would have expired"""
+    __tablename__ = "revoked_tokens"
+
+    jti = Column(String(64), primary_key=True)
+    user_id = Column(Integer, nullable=True)
+    token_type = Column(String(10), nullable=False)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<RevokedToken(jti='{self.jti}', token_type='{self.token_type}', expires_at={self.expires_at})>"
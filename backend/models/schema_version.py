@@ -0,0 +1,17 @@
+"""
+Schema version model - the migration level the database was last brought to
+"""
+from sqlalchemy import Column, Integer, DateTime
+from core.database import Base
+
+
+class SchemaVersion(Base):
+    """Single row (id=1) stamped by migrate.py after the schema is up to date"""
+    __tablename__ = "schema_version"
+
+    id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False)
+    applied_at = Column(DateTime(timezone=True), nullable=False)
+
+    def __repr__(self):
+        return f"<SchemaVersion(version={self.version}, applied_at={self.applied_at})>"
@@ -1,8 +1,9 @@
 # Schemas package
-from .auth import LoginRequest, LoginResponse, UserResponse, ErrorResponse
+from .auth import LoginRequest, LoginResponse, RefreshRequest, UserResponse, ErrorResponse
 from .lead import (
     LeadBase, LeadCreate, LeadUpdate, LeadResponse, LeadListResponse,
-    WebhookLeadCreate, LeadStatsResponse
+    WebhookLeadCreate, LeadStatsResponse, WebhookIngestionResponse,
+    WebhookIngestionStatus, WebhookQueueStats
 )
 from .lead_lifecycle import (
     StatusUpdateRequest, InterestUpdateRequest, CNPRequest, ConvertRequest,
@@ -10,9 +11,10 @@ from .lead_lifecycle import (
 )
 
 __all__ = [
-    "LoginRequest", "LoginResponse", "UserResponse", "ErrorResponse",
+    "LoginRequest", "LoginResponse", "RefreshRequest", "UserResponse", "ErrorResponse",
     "LeadBase", "LeadCreate", "LeadUpdate", "LeadResponse", "LeadListResponse",
-    "WebhookLeadCreate", "LeadStatsResponse",
+    "WebhookLeadCreate", "LeadStatsResponse", "WebhookIngestionResponse",
+    "WebhookIngestionStatus", "WebhookQueueStats",
     "StatusUpdateRequest", "InterestUpdateRequest", "CNPRequest", "ConvertRequest",
     "DropRequest", "StatusHistoryResponse", "LeadLifecycleResponse"
 ]
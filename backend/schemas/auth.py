@@ -18,9 +18,15 @@ class LoginResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
     expires_in: int  # seconds
+    refresh_token: Optional[str] = None
     user: "UserResponse"
 
 
+class RefreshRequest(BaseModel):
+    """Refresh request schema (browsers send the refresh_token cookie instead)"""
+    refresh_token: Optional[str] = None
+
+
 class UserResponse(BaseModel):
     """User response schema"""
     id: int
@@ -40,6 +46,8 @@ class TokenData(BaseModel):
     user_id: Optional[int] = None
     email: Optional[str] = None
     role: Optional[UserRole] = None
+    jti: Optional[str] = None
+    exp: Optional[int] = None
 
 
 class ErrorResponse(BaseModel):
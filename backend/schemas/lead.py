@@ -4,6 +4,7 @@ Lead schemas for API validation
 from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, EmailStr, validator
+from core.normalization import E164_MAX_DIGITS, normalize_phone
 from models.lead import LeadStatus, LeadSource, LeadPriority
 
 
@@ -38,6 +39,8 @@ class LeadBase(BaseModel):
         digits_only = ''.join(filter(str.isdigit, v))
         if len(digits_only) < 10:
             raise ValueError('Phone number must be at least 10 digits')
+        if normalize_phone(v) is None:
+            raise ValueError(f'Phone number must be at most {E164_MAX_DIGITS} digits after the country prefix')
         return v
 
     @validator('budget')
@@ -82,6 +85,8 @@ class LeadUpdate(BaseModel):
             digits_only = ''.join(filter(str.isdigit, v))
             if len(digits_only) < 10:
                 raise ValueError('Phone number must be at least 10 digits')
+            if normalize_phone(v) is None:
+                raise ValueError(f'Phone number must be at most {E164_MAX_DIGITS} digits after the country prefix')
         return v
 
     @validator('budget')
@@ -100,6 +105,7 @@ class LeadResponse(LeadBase):
     created_by: Optional[int] = None
     creator_name: Optional[str] = None
     assignee_name: Optional[str] = None
+    version: Optional[int] = None  # Send back as expected_version on lifecycle changes
 
     class Config:
         from_attributes = True
@@ -108,10 +114,11 @@ class LeadResponse(LeadBase):
 class LeadListResponse(BaseModel):
     """Schema for lead list response with pagination"""
     leads: List[LeadResponse]
-    total: int
+    total: Optional[int] = None  # Only on offset pages and the first cursor page
     page: int
     per_page: int
-    total_pages: int
+    total_pages: Optional[int] = None
+    next_cursor: Optional[str] = None  # Pass as `after` to fetch the next page
 
 
 class WebhookLeadCreate(BaseModel):
@@ -133,9 +140,37 @@ class WebhookLeadCreate(BaseModel):
         digits_only = ''.join(filter(str.isdigit, v))
         if len(digits_only) < 10:
             raise ValueError('Phone number must be at least 10 digits')
+        if normalize_phone(v) is None:
+            raise ValueError(f'Phone number must be at most {E164_MAX_DIGITS} digits after the country prefix')
         return v
 
 
+class WebhookIngestionResponse(BaseModel):
+    """Schema for an accepted (queued) webhook ingestion"""
+    ingestion_id: str
+    status: str
+    accepted: int
+
+
+class WebhookIngestionStatus(WebhookIngestionResponse):
+    """Schema for webhook ingestion progress"""
+    created: int
+    failed: int
+    lead_ids: List[int]
+    errors: List[str]
+
+
+class WebhookQueueStats(BaseModel):
+    """Schema for webhook ingestion queue metrics"""
+    depth: int
+    lag_seconds: float
+    last_batch_lag_seconds: float
+    processed: int
+    failed: int
+    batches: int
+    running: bool
+
+
 class LeadStatsResponse(BaseModel):
     """Schema for lead statistics"""
     total_leads: int
@@ -1,12 +1,19 @@
 """
 Pydantic schemas for Lead Lifecycle (Stage 6)
 """
-from pydantic import BaseModel, Field, validator
-from typing import Optional
+from pydantic import BaseModel, Field, ValidationError, validator
+from typing import List, Optional, Union
 from datetime import datetime
+from enum import Enum
 
 
-class StatusUpdateRequest(BaseModel):
+class LifecycleRequest(BaseModel):
+    expected_version: Optional[int] = Field(
+        None, description="Lead version the change is based on; 409 if the lead has changed since"
+    )
+
+
+class StatusUpdateRequest(LifecycleRequest):
     status: str = Field(..., description="New status for the lead")
     reason: Optional[str] = Field(None, description="Reason for status change")
     
@@ -22,7 +29,7 @@ class StatusUpdateRequest(BaseModel):
         return v
 
 
-class InterestUpdateRequest(BaseModel):
+class InterestUpdateRequest(LifecycleRequest):
     interest_level: int = Field(..., ge=0, le=5, description="Interest level from 0 to 5")
     
     @validator('interest_level')
@@ -32,11 +39,11 @@ class InterestUpdateRequest(BaseModel):
         return v
 
 
-class CNPRequest(BaseModel):
+class CNPRequest(LifecycleRequest):
     reason: Optional[str] = Field(None, description="Reason for marking as CNP")
 
 
-class ConvertRequest(BaseModel):
+class ConvertRequest(LifecycleRequest):
     product: str = Field(..., description="Product or service purchased")
     payment_amount: int = Field(..., ge=0, description="Payment amount in INR")
     notes: Optional[str] = Field(None, description="Additional conversion notes")
@@ -48,7 +55,7 @@ class ConvertRequest(BaseModel):
         return v.strip()
 
 
-class DropRequest(BaseModel):
+class DropRequest(LifecycleRequest):
     reason: str = Field(..., description="Reason for dropping the lead")
     notes: Optional[str] = Field(None, description="Additional drop notes")
     
@@ -59,6 +66,64 @@ class DropRequest(BaseModel):
         return v.strip()
 
 
+class BulkLifecycleAction(str, Enum):
+    STATUS = "status"
+    INTEREST = "interest"
+    CNP = "cnp"
+    CONVERT = "convert"
+    DROP = "drop"
+
+
+# Single-lead request whose fields (and validation) each bulk action takes
+BULK_ACTION_REQUESTS = {
+    BulkLifecycleAction.STATUS: StatusUpdateRequest,
+    BulkLifecycleAction.INTEREST: InterestUpdateRequest,
+    BulkLifecycleAction.CNP: CNPRequest,
+    BulkLifecycleAction.CONVERT: ConvertRequest,
+    BulkLifecycleAction.DROP: DropRequest,
+}
+
+
+class BulkLifecycleRequest(BaseModel):
+    lead_ids: List[int] = Field(..., description="Leads to apply the action to")
+    action: BulkLifecycleAction
+    params: Union[StatusUpdateRequest, InterestUpdateRequest, CNPRequest, ConvertRequest, DropRequest] = Field(
+        default_factory=dict,
+        description="Body of the matching single-lead request, e.g. {\"reason\": \"Price - Too expensive\"} for drop"
+    )
+    
+    @validator('params', pre=True, always=True)
+    def validate_params(cls, v, values):
+        # Parsed against the action's request model, not whichever union member fits first
+        action = values.get('action')
+        if action is None:
+            return v
+        try:
+            request = BULK_ACTION_REQUESTS[action].model_validate(v)
+        except ValidationError as e:
+            error = e.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            raise ValueError(f"Invalid {action.value} params ({field}): {error['msg']}")
+        if request.expected_version is not None:
+            raise ValueError("expected_version is not supported for bulk changes")
+        return request
+
+
+class BulkLifecycleResult(BaseModel):
+    lead_id: int
+    success: bool
+    version: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkLifecycleResponse(BaseModel):
+    action: BulkLifecycleAction
+    requested: int
+    succeeded: int
+    failed: int
+    results: List[BulkLifecycleResult]
+
+
 class StatusHistoryResponse(BaseModel):
     id: int
     lead_id: int
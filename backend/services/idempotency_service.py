@@ -0,0 +1,137 @@
+"""
+Idempotency service - claim, complete and replay Idempotency-Key requests
+"""
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from sqlalchemy import and_, delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.idempotency_key import IdempotencyKey
+import logging
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+IDEMPOTENCY_PURGE_INTERVAL_SECONDS = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL_SECONDS", "3600"))
+# A claim with no response after this long is taken to be abandoned (crashed worker)
+IDEMPOTENCY_LEASE_SECONDS = float(os.getenv("IDEMPOTENCY_LEASE_SECONDS", "60"))
+
+
+def hash_idempotency_key(scope: str, key: str) -> str:
+    return hashlib.sha256(f"{scope}:{key}".encode()).hexdigest()
+
+
+class IdempotencyService:
+    """Stores one response per (scope, key) for IDEMPOTENCY_TTL_HOURS
+
+    Usage: begin() either returns the stored record (replay) or claims the
+    key; the caller then does the work and calls complete(), or release()
+    if the work failed so a retry can run it again. Work that commits its
+    own transaction should stage() the response before that commit, so the
+    response and the work are stored together.
+
+    A claim still without a response after IDEMPOTENCY_LEASE_SECONDS is
+    taken over by the next retry.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def begin(self, scope: str, key: str) -> Optional[IdempotencyKey]:
+        """Return the live record for a key, or claim it and return None"""
+        key_hash = hash_idempotency_key(scope, key)
+        record = await self.db.get(IdempotencyKey, key_hash)
+        if record is not None:
+            now = datetime.utcnow()
+            if record.expires_at > now:
+                if record.status_code is None:
+                    if await self._take_over_abandoned(key_hash, now):
+                        return None
+                    await self.db.refresh(record)
+                return record
+            # Expired: drop it and claim afresh
+            await self.db.delete(record)
+            await self.db.flush()
+
+        self.db.add(IdempotencyKey(
+            key_hash=key_hash,
+            scope=scope,
+            expires_at=datetime.utcnow() + timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+        ))
+        try:
+            await self.db.commit()
+            return None
+        except IntegrityError:
+            # A concurrent retry claimed the key first
+            await self.db.rollback()
+            return await self.db.get(IdempotencyKey, key_hash)
+
+    async def _take_over_abandoned(self, key_hash: str, now: datetime) -> bool:
+        """Renew a claim whose lease ran out; True if this caller now holds it"""
+        cutoff = now - timedelta(seconds=IDEMPOTENCY_LEASE_SECONDS)
+        result = await self.db.execute(
+            update(IdempotencyKey)
+            .where(
+                IdempotencyKey.key_hash == key_hash,
+                IdempotencyKey.status_code.is_(None),
+                or_(
+                    IdempotencyKey.claimed_at < cutoff,
+                    and_(IdempotencyKey.claimed_at.is_(None), IdempotencyKey.created_at < cutoff)
+                )
+            )
+            .values(claimed_at=now)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.commit()
+        if result.rowcount == 1:
+            logger.warning(f"Took over abandoned idempotency claim {key_hash[:12]}")
+            return True
+        return False
+
+    async def stage(self, scope: str, key: str, status_code: int, body: Any) -> None:
+        """Set the response for a claimed key in the caller's open transaction"""
+        record = await self.db.get(IdempotencyKey, hash_idempotency_key(scope, key))
+        if record is None:
+            return
+        record.status_code = status_code
+        record.response_body = json.dumps(body, default=str)
+
+    async def complete(self, scope: str, key: str, status_code: int, body: Any) -> None:
+        """Store the response for a claimed key"""
+        await self.stage(scope, key, status_code, body)
+        await self.db.commit()
+
+    async def release(self, scope: str, key: str) -> None:
+        """Drop a claim whose request failed (a response committed with the work is kept)"""
+        await self.db.rollback()
+        await self.db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.key_hash == hash_idempotency_key(scope, key),
+                IdempotencyKey.status_code.is_(None)
+            )
+        )
+        await self.db.commit()
+
+    async def purge_expired(self) -> int:
+        """Delete expired records; returns how many were removed"""
+        result = await self.db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= datetime.utcnow())
+        )
+        await self.db.commit()
+        logger.info(f"Purged {result.rowcount} expired idempotency keys")
+        return result.rowcount
+
+
+async def purge_expired_periodically(session_factory, interval_seconds: float) -> None:
+    """Background loop removing expired idempotency keys"""
+    while True:
+        try:
+            async with session_factory() as db:
+                await IdempotencyService(db).purge_expired()
+        except Exception as e:
+            logger.error(f"Error purging idempotency keys: {str(e)}")
+        await asyncio.sleep(interval_seconds)
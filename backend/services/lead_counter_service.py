@@ -0,0 +1,163 @@
+"""
+Lead counter service - incremental rollup behind the dashboard statistics
+"""
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import String, func, select, type_coerce
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.lead import Lead
+from models.lead_counter import LeadCounter
+import logging
+
+logger = logging.getLogger(__name__)
+
+# (assigned_to, status name, source name, priority name)
+LeadBucket = Tuple[int, str, str, str]
+
+# Dialects whose INSERT supports ON CONFLICT ... DO UPDATE
+ON_CONFLICT_INSERTS = {"sqlite": sqlite_insert, "postgresql": postgresql_insert}
+
+
+def lead_bucket(lead: Lead) -> LeadBucket:
+    """Counter bucket a lead currently falls into"""
+    return (
+        lead.assigned_to or 0,
+        lead.status.name,
+        lead.source.name if lead.source else "",
+        lead.priority.name
+    )
+
+
+def bucket_counts_query():
+    """Group the leads table into counter buckets (used by rebuild and check)"""
+    assigned_to = func.coalesce(Lead.assigned_to, 0)
+    status = type_coerce(Lead.status, String)
+    source = func.coalesce(type_coerce(Lead.source, String), "")
+    priority = type_coerce(Lead.priority, String)
+    return (
+        select(assigned_to, status, source, priority, func.count())
+        .group_by(assigned_to, status, source, priority)
+    )
+
+
+def increment_statement(dialect_name: str, bucket: LeadBucket, delta: int):
+    """Upsert adding delta to a bucket's lead_count"""
+    assigned_to, status, source, priority = bucket
+    values = dict(assigned_to=assigned_to, status=status, source=source, priority=priority, lead_count=delta)
+
+    if dialect_name == "mysql":
+        statement = mysql_insert(LeadCounter).values(**values)
+        return statement.on_duplicate_key_update(lead_count=LeadCounter.lead_count + delta)
+
+    if dialect_name in ON_CONFLICT_INSERTS:
+        statement = ON_CONFLICT_INSERTS[dialect_name](LeadCounter).values(**values)
+        return statement.on_conflict_do_update(
+            index_elements=["assigned_to", "status", "source", "priority"],
+            set_={"lead_count": LeadCounter.lead_count + delta}
+        )
+
+    raise ValueError(f"Lead counters are not supported on dialect '{dialect_name}'")
+
+
+class LeadCounterService:
+    """Keeps lead_counters in step with lead writes"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def record_change(self, before: Optional[LeadBucket], after: Optional[LeadBucket]) -> None:
+        """Move one lead between buckets (None for create/hard delete)
+
+        Runs inside the caller's transaction; the caller commits.
+        """
+        if before == after:
+            return
+
+        dialect_name = self.db.get_bind().dialect.name
+        if before is not None:
+            await self.db.execute(increment_statement(dialect_name, before, -1))
+        if after is not None:
+            await self.db.execute(increment_statement(dialect_name, after, 1))
+
+    async def record_changes(self, changes: List[Tuple[LeadBucket, LeadBucket]]) -> None:
+        """Move many leads between buckets with one upsert per bucket whose net count changed"""
+        deltas: Counter = Counter()
+        for before, after in changes:
+            if before != after:
+                deltas[before] -= 1
+                deltas[after] += 1
+        dialect_name = self.db.get_bind().dialect.name
+        for bucket, delta in deltas.items():
+            if delta:
+                await self.db.execute(increment_statement(dialect_name, bucket, delta))
+
+    async def record_created(self, buckets: List[LeadBucket]) -> None:
+        """Count a batch of new leads with one upsert per distinct bucket"""
+        dialect_name = self.db.get_bind().dialect.name
+        for bucket, delta in Counter(buckets).items():
+            await self.db.execute(increment_statement(dialect_name, bucket, delta))
+
+    async def get_bucket_counts(self, assigned_to: Optional[int] = None) -> List[Tuple[str, str, str, int]]:
+        """(status, source, priority, count) rows, optionally for one assignee"""
+        query = select(
+            LeadCounter.status,
+            LeadCounter.source,
+            LeadCounter.priority,
+            func.sum(LeadCounter.lead_count)
+        )
+        if assigned_to is not None:
+            query = query.where(LeadCounter.assigned_to == assigned_to)
+        query = query.group_by(LeadCounter.status, LeadCounter.source, LeadCounter.priority)
+
+        result = await self.db.execute(query)
+        return [(status, source, priority, int(count or 0)) for status, source, priority, count in result.all()]
+
+
+def expected_bucket_counts(db) -> Dict[LeadBucket, int]:
+    """Recompute bucket counts from the leads table (sync session)"""
+    return {tuple(row[:4]): row[4] for row in db.execute(bucket_counts_query()).all()}
+
+
+def stored_bucket_counts(db) -> Dict[LeadBucket, int]:
+    """Current non-zero bucket counts in lead_counters (sync session)"""
+    rows = db.execute(
+        select(LeadCounter.assigned_to, LeadCounter.status, LeadCounter.source,
+               LeadCounter.priority, LeadCounter.lead_count)
+        .where(LeadCounter.lead_count != 0)
+    ).all()
+    return {tuple(row[:4]): row[4] for row in rows}
+
+
+def find_counter_drift(db) -> Dict[LeadBucket, Tuple[int, int]]:
+    """Buckets whose stored count differs from the leads table: {bucket: (stored, actual)}"""
+    expected = expected_bucket_counts(db)
+    stored = stored_bucket_counts(db)
+    return {
+        bucket: (stored.get(bucket, 0), expected.get(bucket, 0))
+        for bucket in set(expected) | set(stored)
+        if stored.get(bucket, 0) != expected.get(bucket, 0)
+    }
+
+
+def rebuild_lead_counters(db) -> int:
+    """Recompute every counter from scratch in one transaction (sync session)
+
+    Returns the number of buckets written.
+    """
+    try:
+        db.query(LeadCounter).delete()
+        buckets = expected_bucket_counts(db)
+        db.add_all([
+            LeadCounter(assigned_to=assigned_to, status=status, source=source, priority=priority, lead_count=count)
+            for (assigned_to, status, source, priority), count in buckets.items()
+        ])
+        db.commit()
+        logger.info(f"Rebuilt {len(buckets)} lead counter buckets")
+        return len(buckets)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error rebuilding lead counters: {str(e)}")
+        raise
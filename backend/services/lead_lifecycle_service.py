@@ -1,165 +1,378 @@
 """
 Lead Lifecycle Service for Stage 6
+
+Every transition is one conditional UPDATE guarded by the lead's version
+column (increments such as cnp_count are computed in SQL), followed by the
+history insert and counter upserts in the same transaction. The lead is
+never loaded through the ORM or refreshed after commit; the response is
+built from the pre-update row plus the values written.
+
+When the guarded UPDATE matches no row another writer got there first:
+the transition is retried from a fresh read up to LIFECYCLE_MAX_RETRIES
+times, and raises LeadConflictError (409) if it keeps losing or if the
+caller's expected_version is already stale.
+
+Bulk changes apply the same transitions set-based: per chunk of
+LIFECYCLE_BULK_CHUNK_SIZE leads, one UPDATE guarded on every (id, version)
+pair, one multi-row history insert and one counter upsert per bucket.
 """
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+import base64
+import json
+import os
+from sqlalchemy import and_, func, insert, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.database import read_from_replica
 from models.lead import Lead, LeadStatus
 from models.lead_status_history import LeadStatusHistory
-from schemas.lead_lifecycle import StatusHistoryResponse
-from typing import List, Optional
-from datetime import datetime
+from schemas.lead_lifecycle import BulkLifecycleAction, StatusHistoryResponse
+from services.lead_counter_service import LeadBucket, LeadCounterService, lead_bucket
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime, timezone
 import logging
 
 logger = logging.getLogger(__name__)
 
+LIFECYCLE_MAX_RETRIES = int(os.getenv("LIFECYCLE_MAX_RETRIES", "3"))
+LIFECYCLE_BULK_MAX_LEADS = int(os.getenv("LIFECYCLE_BULK_MAX_LEADS", "5000"))
+LIFECYCLE_BULK_CHUNK_SIZE = int(os.getenv("LIFECYCLE_BULK_CHUNK_SIZE", "500"))
+STATUS_HISTORY_PAGE_SIZE = 50
+
+# Columns a transition reads before its guarded UPDATE
+LEAD_STATE_COLUMNS = (
+    Lead.id, Lead.version, Lead.status, Lead.source, Lead.priority,
+    Lead.assigned_to, Lead.cnp_count, Lead.interest_level
+)
+
+
+class LeadConflictError(Exception):
+    """The lead was changed by someone else since it was read"""
+
+
+def bucket_move(state, values: Dict[str, Any]) -> Tuple[LeadBucket, LeadBucket]:
+    """Counter buckets of a lead before and after writing values"""
+    before = lead_bucket(state)
+    if "status" not in values:
+        return before, before
+    assigned_to, _, source, priority = before
+    return before, (assigned_to, values["status"].name, source, priority)
+
+
+def encode_history_cursor(entry: LeadStatusHistory) -> str:
+    """Encode the (changed_at, id) position of a history entry as an opaque cursor"""
+    payload = json.dumps({"changed_at": entry.changed_at.isoformat(), "id": entry.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode a cursor produced by encode_history_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["changed_at"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
+
+def bulk_result(lead_id: int, version: Optional[int] = None, error: Optional[str] = None) -> dict:
+    return {"lead_id": lead_id, "success": error is None, "version": version, "error": error}
+
+
+# build(state, now) -> (lead column values, history column values)
+TransitionBuilder = Callable[[Any, datetime], Tuple[Dict[str, Any], Dict[str, Any]]]
+
+
+def _old_status(state) -> Optional[str]:
+    return state.status.value if state.status else None
+
+
+def status_change(new_status: str, reason: Optional[str] = None) -> TransitionBuilder:
+    status = LeadStatus(new_status)
+    
+    def build(state, now):
+        return {"status": status}, {
+            "old_status": _old_status(state),
+            "new_status": new_status,
+            "change_reason": reason,
+        }
+    return build
+
+
+def interest_change(interest_level: int) -> TransitionBuilder:
+    def build(state, now):
+        return {"interest_level": interest_level}, {
+            "old_status": _old_status(state),
+            "new_status": _old_status(state),
+            "interest_level": interest_level,
+            "change_reason": f"Interest level updated from {state.interest_level} to {interest_level}",
+        }
+    return build
+
+
+def cnp_mark(reason: Optional[str]) -> TransitionBuilder:
+    def build(state, now):
+        attempt = (state.cnp_count or 0) + 1
+        return {
+            "status": LeadStatus.CNP,
+            "cnp_count": func.coalesce(Lead.cnp_count, 0) + 1,
+            "last_cnp_at": now,
+        }, {
+            "old_status": _old_status(state),
+            "new_status": "CNP",
+            "cnp_reason": reason,
+            "change_reason": f"Marked as CNP (attempt #{attempt})",
+        }
+    return build
+
+
+def conversion(product: str, payment_amount: int, notes: Optional[str]) -> TransitionBuilder:
+    def build(state, now):
+        return {
+            "status": LeadStatus.CONVERTED,
+            "product_purchased": product,
+            "payment_amount": payment_amount,
+            "converted_at": now,
+        }, {
+            "old_status": _old_status(state),
+            "new_status": "Converted",
+            "conversion_notes": notes,
+            "change_reason": f"Converted to customer - Product: {product}, Amount: ₹{payment_amount}",
+        }
+    return build
+
+
+def drop(reason: str) -> TransitionBuilder:
+    def build(state, now):
+        return {
+            "status": LeadStatus.DROPPED,
+            "drop_reason": reason,
+            "dropped_at": now,
+        }, {
+            "old_status": _old_status(state),
+            "new_status": "Dropped",
+            "drop_reason": reason,
+            "change_reason": f"Dropped - Reason: {reason}",
+        }
+    return build
+
+
+# Builder for each bulk action, from the action's validated single-lead request
+BULK_BUILDERS: Dict[BulkLifecycleAction, Callable[[Any], TransitionBuilder]] = {
+    BulkLifecycleAction.STATUS: lambda request: status_change(request.status, request.reason),
+    BulkLifecycleAction.INTEREST: lambda request: interest_change(request.interest_level),
+    BulkLifecycleAction.CNP: lambda request: cnp_mark(request.reason),
+    BulkLifecycleAction.CONVERT: lambda request: conversion(request.product, request.payment_amount, request.notes),
+    BulkLifecycleAction.DROP: lambda request: drop(request.reason),
+}
+
 
 class LeadLifecycleService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.counters = LeadCounterService(db)
+
+    async def _transition(
+        self,
+        lead_id: int,
+        changed_by: int,
+        build: TransitionBuilder,
+        expected_version: Optional[int] = None
+    ) -> Tuple[Any, datetime]:
+        """Apply one guarded transition; returns (row before the update, timestamp written)"""
+        for _ in range(LIFECYCLE_MAX_RETRIES):
+            state = (await self.db.execute(select(*LEAD_STATE_COLUMNS).where(Lead.id == lead_id))).first()
+            if state is None:
+                raise ValueError("Lead not found")
+            if expected_version is not None and state.version != expected_version:
+                raise LeadConflictError(
+                    f"Lead {lead_id} is at version {state.version}, not {expected_version}; reload and retry"
+                )
+            
+            now = datetime.utcnow()
+            values, history = build(state, now)
+            result = await self.db.execute(
+                update(Lead)
+                .where(Lead.id == lead_id, Lead.version == state.version)
+                .values(**values, version=Lead.version + 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                await self.db.execute(insert(LeadStatusHistory).values(
+                    lead_id=lead_id, changed_by=changed_by, changed_at=now, **history
+                ))
+                await self.counters.record_change(*bucket_move(state, values))
+                await self.db.commit()
+                return state, now
+            
+            # Lost the race: start over from a fresh read
+            await self.db.rollback()
+            if expected_version is not None:
+                break
+        raise LeadConflictError(f"Lead {lead_id} was changed concurrently; reload and retry")
+
+    async def _bulk_transition(self, lead_ids: List[int], changed_by: int, build: TransitionBuilder) -> Dict[int, dict]:
+        """Apply one transition to a chunk of leads in one transaction
+
+        The lead column values must not depend on a lead's state (only its
+        history row may), so one UPDATE covers the whole chunk. If any lead
+        changed since it was read, the chunk is rolled back and re-read.
+        """
+        results = {lead_id: bulk_result(lead_id, error="Lead not found") for lead_id in lead_ids}
+        for _ in range(LIFECYCLE_MAX_RETRIES):
+            states = (await self.db.execute(select(*LEAD_STATE_COLUMNS).where(Lead.id.in_(lead_ids)))).all()
+            if not states:
+                return results
+            
+            now = datetime.utcnow()
+            history_rows, bucket_moves = [], []
+            for state in states:
+                values, history = build(state, now)
+                history_rows.append({"lead_id": state.id, "changed_by": changed_by, "changed_at": now, **history})
+                bucket_moves.append(bucket_move(state, values))
+            
+            result = await self.db.execute(
+                update(Lead)
+                .where(tuple_(Lead.id, Lead.version).in_([(state.id, state.version) for state in states]))
+                .values(**values, version=Lead.version + 1, updated_at=now)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == len(states):
+                await self.db.execute(insert(LeadStatusHistory).values(history_rows))
+                await self.counters.record_changes(bucket_moves)
+                await self.db.commit()
+                results.update({state.id: bulk_result(state.id, version=state.version + 1) for state in states})
+                return results
+            
+            await self.db.rollback()
+        
+        results.update({
+            state.id: bulk_result(state.id, error="Lead was changed concurrently; reload and retry")
+            for state in states
+        })
+        return results
+
+    async def bulk_update(
+        self,
+        lead_ids: List[int],
+        action: BulkLifecycleAction,
+        params: Any,
+        changed_by: int,
+        chunk_size: Optional[int] = None
+    ) -> dict:
+        """Apply one lifecycle action to many leads, one transaction per chunk
+
+        params is the action's validated single-lead request. A chunk that
+        fails only fails its own leads; results are per lead, in request order.
+        """
+        build = BULK_BUILDERS[action](params)
+        chunk_size = chunk_size or LIFECYCLE_BULK_CHUNK_SIZE
+        lead_ids = list(dict.fromkeys(lead_ids))
+        results: Dict[int, dict] = {}
+        
+        for start in range(0, len(lead_ids), chunk_size):
+            chunk = lead_ids[start:start + chunk_size]
+            try:
+                results.update(await self._bulk_transition(chunk, changed_by, build))
+            except Exception as e:
+                await self.db.rollback()
+                logger.error(f"Error applying bulk {action.value} to {len(chunk)} leads: {str(e)}")
+                results.update({lead_id: bulk_result(lead_id, error=str(e)) for lead_id in chunk})
+        
+        ordered = [results[lead_id] for lead_id in lead_ids]
+        succeeded = sum(result["success"] for result in ordered)
+        logger.info(f"Bulk {action.value} by user {changed_by}: {succeeded}/{len(ordered)} leads updated")
+        
+        return {
+            "action": action,
+            "requested": len(ordered),
+            "succeeded": succeeded,
+            "failed": len(ordered) - succeeded,
+            "results": ordered
+        }
 
     async def update_status(
         self, 
         lead_id: int, 
         new_status: str, 
         changed_by: int, 
-        reason: Optional[str] = None
+        reason: Optional[str] = None,
+        expected_version: Optional[int] = None
     ) -> dict:
         """Update lead status with history tracking"""
         try:
-            # Get the lead
-            lead = self.db.query(Lead).filter(Lead.id == lead_id).first()
-            if not lead:
-                raise ValueError("Lead not found")
-            
-            old_status = lead.status.value if lead.status else None
-            
-            # Update lead status
-            lead.status = LeadStatus(new_status)
-            lead.updated_at = datetime.utcnow()
-            
-            # Create status history record
-            history = LeadStatusHistory(
-                lead_id=lead_id,
-                old_status=old_status,
-                new_status=new_status,
-                changed_by=changed_by,
-                change_reason=reason,
-                changed_at=datetime.utcnow()
+            state, now = await self._transition(
+                lead_id, changed_by, status_change(new_status, reason), expected_version
             )
-            
-            self.db.add(history)
-            self.db.commit()
-            self.db.refresh(lead)
-            
-            logger.info(f"Lead {lead_id} status updated from {old_status} to {new_status} by user {changed_by}")
-            
-            return {
-                "message": "Status updated successfully",
-                "lead_id": lead_id,
-                "old_status": old_status,
-                "new_status": new_status,
-                "updated_at": lead.updated_at
-            }
-            
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error updating lead status: {str(e)}")
             raise e
+        
+        old_status = state.status.value if state.status else None
+        logger.info(f"Lead {lead_id} status updated from {old_status} to {new_status} by user {changed_by}")
+        
+        return {
+            "message": "Status updated successfully",
+            "lead_id": lead_id,
+            "old_status": old_status,
+            "new_status": new_status,
+            "version": state.version + 1,
+            "updated_at": now
+        }
 
     async def update_interest_level(
         self, 
         lead_id: int, 
         interest_level: int, 
-        changed_by: int
+        changed_by: int,
+        expected_version: Optional[int] = None
     ) -> dict:
         """Update lead interest level"""
         try:
-            lead = self.db.query(Lead).filter(Lead.id == lead_id).first()
-            if not lead:
-                raise ValueError("Lead not found")
-            
-            old_interest = lead.interest_level
-            lead.interest_level = interest_level
-            lead.updated_at = datetime.utcnow()
-            
-            # Create history record
-            history = LeadStatusHistory(
-                lead_id=lead_id,
-                old_status=lead.status.value if lead.status else None,
-                new_status=lead.status.value if lead.status else None,
-                changed_by=changed_by,
-                interest_level=interest_level,
-                change_reason=f"Interest level updated from {old_interest} to {interest_level}",
-                changed_at=datetime.utcnow()
+            state, now = await self._transition(
+                lead_id, changed_by, interest_change(interest_level), expected_version
             )
-            
-            self.db.add(history)
-            self.db.commit()
-            self.db.refresh(lead)
-            
-            logger.info(f"Lead {lead_id} interest level updated to {interest_level} by user {changed_by}")
-            
-            return {
-                "message": "Interest level updated successfully",
-                "lead_id": lead_id,
-                "interest_level": interest_level,
-                "updated_at": lead.updated_at
-            }
-            
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error updating interest level: {str(e)}")
             raise e
+        
+        logger.info(f"Lead {lead_id} interest level updated to {interest_level} by user {changed_by}")
+        
+        return {
+            "message": "Interest level updated successfully",
+            "lead_id": lead_id,
+            "interest_level": interest_level,
+            "version": state.version + 1,
+            "updated_at": now
+        }
 
     async def mark_as_cnp(
         self, 
         lead_id: int, 
         reason: Optional[str], 
-        changed_by: int
+        changed_by: int,
+        expected_version: Optional[int] = None
     ) -> dict:
-        """Mark lead as CNP with tracking"""
+        """Mark lead as CNP with tracking (cnp_count is incremented in SQL)"""
         try:
-            lead = self.db.query(Lead).filter(Lead.id == lead_id).first()
-            if not lead:
-                raise ValueError("Lead not found")
-            
-            old_status = lead.status.value if lead.status else None
-            
-            # Update lead status and CNP tracking
-            lead.status = LeadStatus.CNP
-            lead.cnp_count = (lead.cnp_count or 0) + 1
-            lead.last_cnp_at = datetime.utcnow()
-            lead.updated_at = datetime.utcnow()
-            
-            # Create history record
-            history = LeadStatusHistory(
-                lead_id=lead_id,
-                old_status=old_status,
-                new_status="CNP",
-                changed_by=changed_by,
-                cnp_reason=reason,
-                change_reason=f"Marked as CNP (attempt #{lead.cnp_count})",
-                changed_at=datetime.utcnow()
-            )
-            
-            self.db.add(history)
-            self.db.commit()
-            self.db.refresh(lead)
-            
-            logger.info(f"Lead {lead_id} marked as CNP (attempt #{lead.cnp_count}) by user {changed_by}")
-            
-            return {
-                "message": "Lead marked as CNP successfully",
-                "lead_id": lead_id,
-                "cnp_count": lead.cnp_count,
-                "last_cnp_at": lead.last_cnp_at,
-                "updated_at": lead.updated_at
-            }
-            
+            state, now = await self._transition(lead_id, changed_by, cnp_mark(reason), expected_version)
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error marking lead as CNP: {str(e)}")
             raise e
+        
+        # The version guard means nobody else incremented between our read and write
+        cnp_count = (state.cnp_count or 0) + 1
+        logger.info(f"Lead {lead_id} marked as CNP (attempt #{cnp_count}) by user {changed_by}")
+        
+        return {
+            "message": "Lead marked as CNP successfully",
+            "lead_id": lead_id,
+            "cnp_count": cnp_count,
+            "last_cnp_at": now,
+            "version": state.version + 1,
+            "updated_at": now
+        }
 
     async def convert_lead(
         self, 
@@ -167,114 +380,100 @@ class LeadLifecycleService:
         product: str, 
         payment_amount: int, 
         notes: Optional[str], 
-        changed_by: int
+        changed_by: int,
+        expected_version: Optional[int] = None
     ) -> dict:
         """Convert lead to customer (requires product and payment)"""
         try:
-            lead = self.db.query(Lead).filter(Lead.id == lead_id).first()
-            if not lead:
-                raise ValueError("Lead not found")
-            
-            old_status = lead.status.value if lead.status else None
-            
-            # Update lead status and conversion details
-            lead.status = LeadStatus.CONVERTED
-            lead.product_purchased = product
-            lead.payment_amount = payment_amount
-            lead.converted_at = datetime.utcnow()
-            lead.updated_at = datetime.utcnow()
-            
-            # Create history record
-            history = LeadStatusHistory(
-                lead_id=lead_id,
-                old_status=old_status,
-                new_status="Converted",
-                changed_by=changed_by,
-                conversion_notes=notes,
-                change_reason=f"Converted to customer - Product: {product}, Amount: ₹{payment_amount}",
-                changed_at=datetime.utcnow()
+            state, now = await self._transition(
+                lead_id, changed_by, conversion(product, payment_amount, notes), expected_version
             )
-            
-            self.db.add(history)
-            self.db.commit()
-            self.db.refresh(lead)
-            
-            logger.info(f"Lead {lead_id} converted to customer by user {changed_by} - Product: {product}, Amount: ₹{payment_amount}")
-            
-            return {
-                "message": "Lead converted successfully",
-                "lead_id": lead_id,
-                "product": product,
-                "payment_amount": payment_amount,
-                "converted_at": lead.converted_at,
-                "updated_at": lead.updated_at
-            }
-            
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error converting lead: {str(e)}")
             raise e
+        
+        logger.info(f"Lead {lead_id} converted to customer by user {changed_by} - Product: {product}, Amount: ₹{payment_amount}")
+        
+        return {
+            "message": "Lead converted successfully",
+            "lead_id": lead_id,
+            "product": product,
+            "payment_amount": payment_amount,
+            "converted_at": now,
+            "version": state.version + 1,
+            "updated_at": now
+        }
 
     async def drop_lead(
         self, 
         lead_id: int, 
         reason: str, 
         notes: Optional[str], 
-        changed_by: int
+        changed_by: int,
+        expected_version: Optional[int] = None
     ) -> dict:
         """Drop lead with reason (moves to dropped pool)"""
         try:
-            lead = self.db.query(Lead).filter(Lead.id == lead_id).first()
-            if not lead:
-                raise ValueError("Lead not found")
-            
-            old_status = lead.status.value if lead.status else None
-            
-            # Update lead status and drop details
-            lead.status = LeadStatus.DROPPED
-            lead.drop_reason = reason
-            lead.dropped_at = datetime.utcnow()
-            lead.updated_at = datetime.utcnow()
-            
-            # Create history record
-            history = LeadStatusHistory(
-                lead_id=lead_id,
-                old_status=old_status,
-                new_status="Dropped",
-                changed_by=changed_by,
-                drop_reason=reason,
-                change_reason=f"Dropped - Reason: {reason}",
-                changed_at=datetime.utcnow()
-            )
-            
-            self.db.add(history)
-            self.db.commit()
-            self.db.refresh(lead)
-            
-            logger.info(f"Lead {lead_id} dropped by user {changed_by} - Reason: {reason}")
-            
-            return {
-                "message": "Lead dropped successfully",
-                "lead_id": lead_id,
-                "drop_reason": reason,
-                "dropped_at": lead.dropped_at,
-                "updated_at": lead.updated_at
-            }
-            
+            state, now = await self._transition(lead_id, changed_by, drop(reason), expected_version)
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error dropping lead: {str(e)}")
             raise e
+        
+        logger.info(f"Lead {lead_id} dropped by user {changed_by} - Reason: {reason}")
+        
+        return {
+            "message": "Lead dropped successfully",
+            "lead_id": lead_id,
+            "drop_reason": reason,
+            "dropped_at": now,
+            "version": state.version + 1,
+            "updated_at": now
+        }
+
+    async def get_status_history(
+        self,
+        lead_id: int,
+        limit: int = STATUS_HISTORY_PAGE_SIZE,
+        after: Optional[str] = None,
+        since: Optional[datetime] = None
+    ) -> Tuple[List[StatusHistoryResponse], Optional[str]]:
+        """Get one page of a lead's status history, newest first
 
-    async def get_status_history(self, lead_id: int) -> List[StatusHistoryResponse]:
-        """Get status change history for a lead"""
+        after continues from a previous page's cursor; since keeps only
+        entries changed after that time. Both seek on the
+        (lead_id, changed_at, id) index. Returns (entries, next cursor).
+        """
         try:
-            history_records = self.db.query(LeadStatusHistory)\
-                .filter(LeadStatusHistory.lead_id == lead_id)\
-                .order_by(LeadStatusHistory.changed_at.desc())\
-                .all()
-            
-            return [StatusHistoryResponse.from_orm(record) for record in history_records]
+            query = (
+                select(LeadStatusHistory)
+                .where(LeadStatusHistory.lead_id == lead_id)
+                .order_by(LeadStatusHistory.changed_at.desc(), LeadStatusHistory.id.desc())
+            )
+            if since is not None:
+                if since.tzinfo is not None:
+                    # changed_at is written as naive UTC
+                    since = since.astimezone(timezone.utc).replace(tzinfo=None)
+                query = query.where(LeadStatusHistory.changed_at > since)
+            if after:
+                cursor_changed_at, cursor_id = decode_history_cursor(after)
+                query = query.where(or_(
+                    LeadStatusHistory.changed_at < cursor_changed_at,
+                    and_(LeadStatusHistory.changed_at == cursor_changed_at, LeadStatusHistory.id < cursor_id)
+                ))
+            
+            with read_from_replica(self.db):
+                # Fetch one extra row to know whether another page exists
+                result = await self.db.execute(query.limit(limit + 1))
+                history_records = result.scalars().all()
+            
+            next_cursor = None
+            if len(history_records) > limit:
+                history_records = history_records[:limit]
+                next_cursor = encode_history_cursor(history_records[-1])
+            
+            return [StatusHistoryResponse.from_orm(record) for record in history_records], next_cursor
             
         except Exception as e:
             logger.error(f"Error getting status history: {str(e)}")
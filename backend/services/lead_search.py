@@ -0,0 +1,167 @@
+"""
+Lead search backends for the GET /leads/ search box
+
+Backends are picked with LEAD_SEARCH_BACKEND:
+    fulltext - MySQL FULLTEXT index, MATCH ... AGAINST in boolean mode
+    tokens   - lead_search_tokens inverted index (any database, incl. SQLite)
+    like     - legacy ILIKE across name/email/phone/company (full scan)
+Default is fulltext on MySQL and tokens elsewhere. Both indexed backends
+order results by relevance before created_at.
+"""
+import os
+import re
+from typing import List, Optional
+from sqlalchemy import and_, case, delete, false, func, insert, or_, select
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.lead import Lead
+from models.lead_search_token import LeadSearchToken
+import logging
+
+logger = logging.getLogger(__name__)
+
+LEAD_SEARCH_BACKEND = os.getenv("LEAD_SEARCH_BACKEND")
+
+# Lead fields that feed the search index
+SEARCHABLE_FIELDS = {"name", "email", "phone", "company"}
+
+# Only the first few terms of a query are used; tokens are capped to the column size
+MAX_QUERY_TERMS = 5
+MAX_TOKEN_LENGTH = 64
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens of a string, in order, without duplicates"""
+    if not text:
+        return []
+    return list(dict.fromkeys(token[:MAX_TOKEN_LENGTH] for token in TOKEN_PATTERN.findall(text.lower())))
+
+
+def lead_tokens(lead: Lead) -> set:
+    """Searchable tokens for a lead (phone also indexed as its full digit string)"""
+    tokens = set()
+    for value in (lead.name, lead.email, lead.phone, lead.company):
+        tokens.update(tokenize(value))
+    digits = "".join(filter(str.isdigit, lead.phone or ""))
+    if digits:
+        tokens.add(digits[:MAX_TOKEN_LENGTH])
+    return tokens
+
+
+def prefix_range(column, prefix: str):
+    """`column LIKE 'prefix%'` written as a range so any B-tree index applies"""
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(column >= prefix, column < upper)
+
+
+class LikeSearch:
+    """Legacy substring search (no index support, no relevance)"""
+    name = "like"
+
+    def apply(self, query, term: str):
+        return query.where(or_(
+            Lead.name.ilike(f"%{term}%"),
+            Lead.email.ilike(f"%{term}%"),
+            Lead.phone.ilike(f"%{term}%"),
+            Lead.company.ilike(f"%{term}%")
+        ))
+
+    async def index_lead(self, db: AsyncSession, lead: Lead) -> None:
+        return None
+
+    async def index_new_leads(self, db: AsyncSession, leads: List[Lead]) -> None:
+        return None
+
+
+class FullTextSearch(LikeSearch):
+    """MySQL FULLTEXT search over ix_leads_search_fulltext"""
+    name = "fulltext"
+
+    def apply(self, query, term: str):
+        terms = tokenize(term)[:MAX_QUERY_TERMS]
+        if not terms:
+            return query.where(false())
+        # Every term must match, each as a prefix
+        against = " ".join(f"+{t}*" for t in terms)
+        relevance = match(Lead.name, Lead.email, Lead.phone, Lead.company, against=against).in_boolean_mode()
+        return query.where(relevance > 0).order_by(relevance.desc())
+
+
+class TokenIndexSearch(LikeSearch):
+    """Prefix search over the lead_search_tokens table"""
+    name = "tokens"
+
+    def apply(self, query, term: str):
+        terms = tokenize(term)[:MAX_QUERY_TERMS]
+        if not terms:
+            return query.where(false())
+
+        token = LeadSearchToken.token
+        matched = [func.max(case((prefix_range(token, t), 1), else_=0)) for t in terms]
+        # Exact token hits rank above prefix-only hits
+        score = func.sum(case(*[(token == t, 2) for t in terms], else_=1))
+        scores = (
+            select(LeadSearchToken.lead_id, score.label("score"))
+            .where(or_(*[prefix_range(token, t) for t in terms]))
+            .group_by(LeadSearchToken.lead_id)
+            .having(sum(matched[1:], matched[0]) == len(terms))
+            .subquery()
+        )
+        return query.join(scores, scores.c.lead_id == Lead.id).order_by(scores.c.score.desc())
+
+    async def index_lead(self, db: AsyncSession, lead: Lead) -> None:
+        """Replace a lead's tokens (inside the caller's transaction)"""
+        await db.execute(delete(LeadSearchToken).where(LeadSearchToken.lead_id == lead.id))
+        await self.index_new_leads(db, [lead])
+
+    async def index_new_leads(self, db: AsyncSession, leads: List[Lead]) -> None:
+        """Insert tokens for flushed leads that have none yet, in one statement"""
+        rows = [{"token": t, "lead_id": lead.id} for lead in leads for t in lead_tokens(lead)]
+        if rows:
+            await db.execute(insert(LeadSearchToken), rows)
+
+
+SEARCH_BACKENDS = {backend.name: backend for backend in (LikeSearch, FullTextSearch, TokenIndexSearch)}
+
+
+def get_search_backend(dialect_name: str):
+    """Configured search backend, defaulting by database dialect"""
+    name = LEAD_SEARCH_BACKEND or ("fulltext" if dialect_name == "mysql" else "tokens")
+    if name not in SEARCH_BACKENDS:
+        raise ValueError(f"Unknown LEAD_SEARCH_BACKEND '{name}'")
+    return SEARCH_BACKENDS[name]()
+
+
+def rebuild_search_tokens(db, batch_size: int = 1000) -> int:
+    """Re-tokenize every lead into lead_search_tokens in batches (sync session)
+
+    Returns the number of leads indexed.
+    """
+    indexed = 0
+    last_id = 0
+    try:
+        db.execute(delete(LeadSearchToken))
+        while True:
+            leads = db.execute(
+                select(Lead.id, Lead.name, Lead.email, Lead.phone, Lead.company)
+                .where(Lead.id > last_id)
+                .order_by(Lead.id)
+                .limit(batch_size)
+            ).all()
+            if not leads:
+                break
+            rows = [{"token": t, "lead_id": lead.id} for lead in leads for t in lead_tokens(lead)]
+            if rows:
+                db.execute(insert(LeadSearchToken), rows)
+            db.commit()
+            indexed += len(leads)
+            last_id = leads[-1].id
+        db.commit()
+        logger.info(f"Indexed search tokens for {indexed} leads")
+        return indexed
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Error rebuilding search tokens: {str(e)}")
+        raise
@@ -1,34 +1,74 @@
 """
 Lead service for business logic
 """
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+import base64
+import json
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from sqlalchemy import and_, or_, func, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from sqlalchemy.orm.exc import StaleDataError
 from models.lead import Lead, LeadStatus, LeadSource, LeadPriority
 from models.user import User
+from core.database import read_from_replica
+from core.normalization import normalize_email, normalize_phone
 from schemas.lead import LeadCreate, LeadUpdate
+from services.lead_counter_service import LeadCounterService, lead_bucket
+from services.lead_lifecycle_service import LeadConflictError
+from services.lead_search import SEARCHABLE_FIELDS, get_search_backend
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Load creator/assignee in the same statement as the lead (avoids N+1 lookups)
+LEAD_USER_OPTIONS = (joinedload(Lead.creator), joinedload(Lead.assignee))
+
+
+def encode_lead_cursor(lead: Lead) -> str:
+    """Encode the (created_at, id) position of a lead as an opaque cursor"""
+    payload = json.dumps({"created_at": lead.created_at.isoformat(), "id": lead.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_lead_cursor(cursor: str) -> tuple[datetime, int]:
+    """Decode a cursor produced by encode_lead_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError("Invalid pagination cursor") from e
+
 
 class LeadService:
     """Lead service for business logic operations"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
+        self.counters = LeadCounterService(db)
+        self.search = get_search_backend(db.get_bind().dialect.name)
 
-    def create_lead(self, lead_data: LeadCreate, created_by: int) -> Lead:
-        """Create a new lead"""
+    async def create_lead(
+        self,
+        lead_data: LeadCreate,
+        created_by: int,
+        before_commit: Optional[Callable[[Lead], Awaitable[None]]] = None
+    ) -> Lead:
+        """Create a new lead
+
+        before_commit gets the lead (creator/assignee loaded) inside the
+        creating transaction, e.g. to store the idempotent response with it.
+        """
         try:
             # Check for duplicate by phone or email
-            existing_lead = self.get_lead_by_phone_or_email(
+            existing_lead_id = await self.find_duplicate_lead_id(
                 phone=lead_data.phone,
                 email=lead_data.email
             )
             
-            if existing_lead:
-                logger.warning(f"Duplicate lead found: {existing_lead.id}")
+            if existing_lead_id:
+                logger.warning(f"Duplicate lead found: {existing_lead_id}")
                 # For now, we'll still create the lead but log the duplicate
                 # In future, we might want to merge or reject duplicates
 
@@ -39,22 +79,72 @@ class LeadService:
             )
             
             self.db.add(lead)
-            self.db.commit()
-            self.db.refresh(lead)
+            await self.db.flush()
+            await self.search.index_new_leads(self.db, [lead])
+            await self.counters.record_change(None, lead_bucket(lead))
+            if before_commit is not None:
+                await before_commit(await self.reload_lead(lead.id))
+            await self.db.commit()
+            lead = await self.reload_lead(lead.id)
             
             logger.info(f"Lead created successfully: {lead.id}")
             return lead
             
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error creating lead: {str(e)}")
             raise
 
-    def get_lead(self, lead_id: int) -> Optional[Lead]:
-        """Get a lead by ID"""
-        return self.db.query(Lead).filter(Lead.id == lead_id).first()
+    async def create_leads_bulk(self, leads_data: List[LeadCreate], created_by: Optional[int] = None) -> List[Lead]:
+        """Create many leads in one transaction (one duplicate probe, one commit)"""
+        try:
+            phones = {normalize_phone(data.phone) for data in leads_data}
+            emails = {normalize_email(data.email) for data in leads_data} - {None}
+            duplicates = await self.db.execute(
+                select(Lead.id, Lead.phone_e164, Lead.email_norm)
+                .where(or_(Lead.phone_e164.in_(phones), Lead.email_norm.in_(emails)))
+            )
+            for lead_id, phone_e164, email_norm in duplicates.all():
+                logger.warning(f"Duplicate lead found: {lead_id} ({phone_e164 or email_norm})")
+            
+            leads = [Lead(**data.dict(), created_by=created_by) for data in leads_data]
+            self.db.add_all(leads)
+            await self.db.flush()
+            await self.search.index_new_leads(self.db, leads)
+            await self.counters.record_created([lead_bucket(lead) for lead in leads])
+            await self.db.commit()
+            
+            logger.info(f"Bulk created {len(leads)} leads")
+            return leads
+            
+        except Exception as e:
+            await self.db.rollback()
+            logger.error(f"Error bulk creating leads: {str(e)}")
+            raise
+
+    async def get_lead(self, lead_id: int, use_replica: bool = True) -> Optional[Lead]:
+        """Get a lead by ID with creator and assignee loaded
+
+        Pass use_replica=False when the lead is about to be modified, so the
+        write starts from the primary's copy.
+        """
+        with read_from_replica(self.db, use_replica):
+            result = await self.db.execute(
+                select(Lead).options(*LEAD_USER_OPTIONS).where(Lead.id == lead_id)
+            )
+        return result.scalars().first()
 
-    def get_leads(
+    async def reload_lead(self, lead_id: int) -> Optional[Lead]:
+        """Re-read a lead after a write, overwriting stale session state"""
+        result = await self.db.execute(
+            select(Lead)
+            .options(*LEAD_USER_OPTIONS)
+            .where(Lead.id == lead_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalars().first()
+
+    async def get_leads(
         self,
         skip: int = 0,
         limit: int = 100,
@@ -64,157 +154,212 @@ class LeadService:
         assigned_to: Optional[int] = None,
         search: Optional[str] = None,
         user_role: Optional[str] = None,
-        user_id: Optional[int] = None
-    ) -> tuple[List[Lead], int]:
-        """Get leads with filtering and pagination"""
+        user_id: Optional[int] = None,
+        after: Optional[str] = None
+    ) -> tuple[List[Lead], Optional[int], Optional[str]]:
+        """Get leads with filtering and pagination
+
+        When an ``after`` cursor is given, skip is ignored and the page starts
+        right after the cursor position (keyset seek on created_at, id). Such
+        pages skip the filtered COUNT(*) (O(matching rows) on every page of a
+        deep scroll) and return total None; the first page already had it.
+        """
         
-        query = self.db.query(Lead)
+        query = select(Lead)
         
         # Apply role-based filtering
         if user_role == "SALESPERSON" and user_id:
             # Salesperson can only see their assigned leads
-            query = query.filter(Lead.assigned_to == user_id)
+            query = query.where(Lead.assigned_to == user_id)
         elif user_role == "RECOVERY_AGENT" and user_id:
             # Recovery agent can see leads assigned to them
-            query = query.filter(Lead.assigned_to == user_id)
+            query = query.where(Lead.assigned_to == user_id)
         # Admin and other roles can see all leads
         
         # Apply filters
         if status:
-            query = query.filter(Lead.status == status)
+            query = query.where(Lead.status == status)
         
         if source:
-            query = query.filter(Lead.source == source)
+            query = query.where(Lead.source == source)
         
         if priority:
-            query = query.filter(Lead.priority == priority)
+            query = query.where(Lead.priority == priority)
         
         if assigned_to:
-            query = query.filter(Lead.assigned_to == assigned_to)
+            query = query.where(Lead.assigned_to == assigned_to)
         
         if search:
-            search_filter = or_(
-                Lead.name.ilike(f"%{search}%"),
-                Lead.email.ilike(f"%{search}%"),
-                Lead.phone.ilike(f"%{search}%"),
-                Lead.company.ilike(f"%{search}%")
-            )
-            query = query.filter(search_filter)
+            # Matches are ordered by relevance first (see services/lead_search.py)
+            if after:
+                raise ValueError("Cursor pagination is not supported together with search")
+            query = self.search.apply(query, search)
+        
+        # Apply pagination and ordering (id breaks ties between equal timestamps)
+        page = query.order_by(Lead.created_at.desc(), Lead.id.desc())
+        if after:
+            cursor_created_at, cursor_id = decode_lead_cursor(after)
+            page = page.where(or_(
+                Lead.created_at < cursor_created_at,
+                and_(Lead.created_at == cursor_created_at, Lead.id < cursor_id)
+            ))
+        else:
+            page = page.offset(skip)
         
-        # Get total count
-        total = query.count()
+        with read_from_replica(self.db):
+            # Get total count
+            total = None
+            if not after:
+                total = await self.db.scalar(select(func.count()).select_from(query.subquery()))
+            
+            # Fetch one extra row to know whether another page exists
+            result = await self.db.execute(page.options(*LEAD_USER_OPTIONS).limit(limit + 1))
+            leads = result.scalars().all()
         
-        # Apply pagination and ordering
-        leads = query.order_by(Lead.created_at.desc()).offset(skip).limit(limit).all()
+        next_cursor = None
+        if len(leads) > limit:
+            leads = leads[:limit]
+            next_cursor = encode_lead_cursor(leads[-1])
         
-        return leads, total
+        return leads, total, next_cursor
 
-    def update_lead(self, lead_id: int, lead_data: LeadUpdate, updated_by: int) -> Optional[Lead]:
+    async def update_lead(self, lead_id: int, lead_data: LeadUpdate, updated_by: int) -> Optional[Lead]:
         """Update a lead"""
         try:
-            lead = self.get_lead(lead_id)
+            lead = await self.db.get(Lead, lead_id)
             if not lead:
                 return None
             
             # Update fields
+            before = lead_bucket(lead)
             update_data = lead_data.dict(exclude_unset=True)
             for field, value in update_data.items():
                 setattr(lead, field, value)
             
-            self.db.commit()
-            self.db.refresh(lead)
+            if SEARCHABLE_FIELDS & update_data.keys():
+                await self.search.index_lead(self.db, lead)
+            await self.counters.record_change(before, lead_bucket(lead))
+            await self.db.commit()
+            lead = await self.reload_lead(lead_id)
             
             logger.info(f"Lead updated successfully: {lead.id}")
             return lead
             
+        except StaleDataError:
+            # The version_id_col guard: a lifecycle change committed since the lead was read
+            await self.db.rollback()
+            raise LeadConflictError(f"Lead {lead_id} was changed concurrently; reload and retry")
+            
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error updating lead: {str(e)}")
             raise
 
-    def delete_lead(self, lead_id: int) -> bool:
+    async def delete_lead(self, lead_id: int) -> bool:
         """Delete a lead (soft delete by changing status)"""
         try:
-            lead = self.get_lead(lead_id)
+            lead = await self.db.get(Lead, lead_id)
             if not lead:
                 return False
             
             # Soft delete by changing status to dropped
+            before = lead_bucket(lead)
             lead.status = LeadStatus.DROPPED
-            self.db.commit()
+            await self.counters.record_change(before, lead_bucket(lead))
+            await self.db.commit()
             
             logger.info(f"Lead soft deleted: {lead.id}")
             return True
             
+        except StaleDataError:
+            await self.db.rollback()
+            raise LeadConflictError(f"Lead {lead_id} was changed concurrently; reload and retry")
+            
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error deleting lead: {str(e)}")
             raise
 
-    def get_lead_by_phone_or_email(self, phone: str, email: Optional[str] = None) -> Optional[Lead]:
-        """Check for duplicate leads by phone or email"""
-        query = self.db.query(Lead).filter(Lead.phone == phone)
+    async def find_duplicate_lead_id(self, phone: str, email: Optional[str] = None) -> Optional[int]:
+        """Id of an existing lead with the same normalized phone or email
+
+        Each branch is an index-only probe on (phone_e164, id) / (email_norm, id).
+        """
+        query = select(Lead.id).where(Lead.phone_e164 == normalize_phone(phone))
         
-        if email:
-            query = query.filter(or_(Lead.phone == phone, Lead.email == email))
+        email_norm = normalize_email(email)
+        if email_norm:
+            query = union_all(query, select(Lead.id).where(Lead.email_norm == email_norm))
         
-        return query.first()
+        return await self.db.scalar(query.limit(1))
+
+    async def get_lead_by_phone_or_email(self, phone: str, email: Optional[str] = None) -> Optional[Lead]:
+        """Check for duplicate leads by phone or email"""
+        lead_id = await self.find_duplicate_lead_id(phone, email)
+        return await self.get_lead(lead_id) if lead_id else None
+
+    async def get_lead_stats(self, user_role: Optional[str] = None, user_id: Optional[int] = None) -> Dict[str, Any]:
+        """Get lead statistics
 
-    def get_lead_stats(self, user_role: Optional[str] = None, user_id: Optional[int] = None) -> Dict[str, Any]:
-        """Get lead statistics"""
-        query = self.db.query(Lead)
+        Read from the lead_counters rollup, so the cost depends on the number
+        of (status, source, priority) buckets rather than the number of leads.
+        """
+        assigned_to = None
         
         # Apply role-based filtering
         if user_role == "SALESPERSON" and user_id:
-            query = query.filter(Lead.assigned_to == user_id)
+            assigned_to = user_id
         elif user_role == "RECOVERY_AGENT" and user_id:
-            query = query.filter(Lead.assigned_to == user_id)
-        
-        # Get counts by status
-        status_counts = {}
-        for status in LeadStatus:
-            count = query.filter(Lead.status == status).count()
-            status_counts[status.value] = count
-        
-        # Get counts by source
-        source_counts = {}
-        for source in LeadSource:
-            count = query.filter(Lead.source == source).count()
-            source_counts[source.value] = count
-        
-        # Get counts by priority
-        priority_counts = {}
-        for priority in LeadPriority:
-            count = query.filter(Lead.priority == priority).count()
-            priority_counts[priority.value] = count
+            assigned_to = user_id
+        
+        with read_from_replica(self.db):
+            buckets = await self.counters.get_bucket_counts(assigned_to=assigned_to)
+        
+        status_counts = {status.value: 0 for status in LeadStatus}
+        source_counts = {source.value: 0 for source in LeadSource}
+        priority_counts = {priority.value: 0 for priority in LeadPriority}
+        total_leads = 0
+        
+        for status, source, priority, count in buckets:
+            total_leads += count
+            status_counts[LeadStatus[status].value] += count
+            if source:
+                source_counts[LeadSource[source].value] += count
+            priority_counts[LeadPriority[priority].value] += count
         
         return {
-            "total_leads": query.count(),
+            "total_leads": total_leads,
             "status_counts": status_counts,
             "source_counts": source_counts,
             "priority_counts": priority_counts
         }
 
-    def assign_lead(self, lead_id: int, assigned_to: int, assigned_by: int) -> Optional[Lead]:
+    async def assign_lead(self, lead_id: int, assigned_to: int, assigned_by: int) -> Optional[Lead]:
         """Assign a lead to a user"""
         try:
-            lead = self.get_lead(lead_id)
+            lead = await self.db.get(Lead, lead_id)
             if not lead:
                 return None
             
             # Verify the assignee exists
-            assignee = self.db.query(User).filter(User.id == assigned_to).first()
+            assignee = await self.db.get(User, assigned_to)
             if not assignee:
                 raise ValueError("Assignee not found")
             
+            before = lead_bucket(lead)
             lead.assigned_to = assigned_to
-            self.db.commit()
-            self.db.refresh(lead)
+            await self.counters.record_change(before, lead_bucket(lead))
+            await self.db.commit()
+            lead = await self.reload_lead(lead_id)
             
             logger.info(f"Lead {lead_id} assigned to user {assigned_to}")
             return lead
             
+        except StaleDataError:
+            await self.db.rollback()
+            raise LeadConflictError(f"Lead {lead_id} was changed concurrently; reload and retry")
+            
         except Exception as e:
-            self.db.rollback()
+            await self.db.rollback()
             logger.error(f"Error assigning lead: {str(e)}")
             raise
@@ -0,0 +1,66 @@
+"""
+Replica lag monitor - decides whether read_from_replica() blocks may use the replica
+
+Every REPLICA_HEARTBEAT_INTERVAL_SECONDS the primary's heartbeat row is
+bumped and read back from the replica. The difference is the replication
+lag; above REPLICA_MAX_LAG_SECONDS (or when the replica is unreachable)
+replica_state.healthy is cleared and reads fall back to the primary.
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select
+from core.database import AsyncSessionLocal, replica_engine, replica_state
+from models.replica_heartbeat import ReplicaHeartbeat
+import logging
+
+logger = logging.getLogger(__name__)
+
+REPLICA_MAX_LAG_SECONDS = float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5"))
+REPLICA_HEARTBEAT_INTERVAL_SECONDS = float(os.getenv("REPLICA_HEARTBEAT_INTERVAL_SECONDS", "1"))
+
+
+async def write_heartbeat(session_factory=AsyncSessionLocal) -> datetime:
+    """Stamp the heartbeat row on the primary"""
+    now = datetime.utcnow()
+    async with session_factory() as db:
+        await db.merge(ReplicaHeartbeat(id=1, beat_at=now))
+        await db.commit()
+    return now
+
+
+async def measure_replica_lag(engine=None) -> Optional[float]:
+    """Seconds between now and the heartbeat the replica has seen (None if unknown)"""
+    engine = engine or replica_engine
+    async with engine.connect() as connection:
+        beat_at = await connection.scalar(select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1))
+    if beat_at is None:
+        return None
+    return (datetime.utcnow() - beat_at.replace(tzinfo=None)).total_seconds()
+
+
+async def check_replica(engine=None, session_factory=AsyncSessionLocal) -> bool:
+    """Refresh replica_state; returns whether the replica may serve reads"""
+    try:
+        await write_heartbeat(session_factory)
+        lag = await measure_replica_lag(engine)
+    except Exception as e:
+        logger.warning(f"Replica check failed, reading from primary: {str(e)}")
+        lag = None
+
+    was_healthy = replica_state.healthy
+    replica_state.lag_seconds = lag
+    replica_state.healthy = lag is not None and lag <= REPLICA_MAX_LAG_SECONDS
+    if was_healthy and not replica_state.healthy:
+        logger.warning(f"Replica lag {lag}s over {REPLICA_MAX_LAG_SECONDS}s, reading from primary")
+    elif replica_state.healthy and not was_healthy:
+        logger.info(f"Replica caught up (lag {lag:.2f}s), routing reads to it")
+    return replica_state.healthy
+
+
+async def monitor_replica_periodically(interval_seconds: float = REPLICA_HEARTBEAT_INTERVAL_SECONDS) -> None:
+    """Background loop keeping replica_state current"""
+    while True:
+        await check_replica()
+        await asyncio.sleep(interval_seconds)
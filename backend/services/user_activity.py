@@ -0,0 +1,140 @@
+"""
+Write-behind buffer for user activity timestamps (last_login)
+
+Login records the timestamp here instead of committing it. A background
+task writes everything buffered with one bulk UPDATE per column every
+USER_ACTIVITY_FLUSH_INTERVAL_SECONDS, or sooner once
+USER_ACTIVITY_FLUSH_MAX_ENTRIES users are pending, and once more on
+shutdown. A worker crash loses at most one interval of timestamps.
+Timestamps whose flush keeps failing are dropped after
+USER_ACTIVITY_MAX_FLUSH_ATTEMPTS tries so one bad batch cannot block the rest.
+"""
+import asyncio
+import os
+from datetime import datetime
+from typing import Dict, Optional
+from sqlalchemy import bindparam, update
+from core.database import AsyncSessionLocal
+from models.user import User
+import logging
+
+logger = logging.getLogger(__name__)
+
+USER_ACTIVITY_FLUSH_INTERVAL_SECONDS = float(os.getenv("USER_ACTIVITY_FLUSH_INTERVAL_SECONDS", "5"))
+USER_ACTIVITY_FLUSH_MAX_ENTRIES = int(os.getenv("USER_ACTIVITY_FLUSH_MAX_ENTRIES", "500"))
+USER_ACTIVITY_MAX_FLUSH_ATTEMPTS = int(os.getenv("USER_ACTIVITY_MAX_FLUSH_ATTEMPTS", "3"))
+
+# User columns the buffer may write
+ACTIVITY_COLUMNS = ("last_login",)
+
+
+class UserActivityBuffer:
+    """Latest timestamp per (column, user id), flushed in bulk by one worker task"""
+
+    def __init__(
+        self,
+        flush_interval: float = USER_ACTIVITY_FLUSH_INTERVAL_SECONDS,
+        max_entries: int = USER_ACTIVITY_FLUSH_MAX_ENTRIES,
+        max_attempts: int = USER_ACTIVITY_MAX_FLUSH_ATTEMPTS,
+        session_factory=AsyncSessionLocal
+    ):
+        self.flush_interval = flush_interval
+        self.max_entries = max_entries
+        self.max_attempts = max_attempts
+        self.session_factory = session_factory
+        self._pending: Dict[str, Dict[int, datetime]] = {column: {} for column in ACTIVITY_COLUMNS}
+        # Failed flushes per (column, user id) still pending
+        self._failures: Dict[str, Dict[int, int]] = {column: {} for column in ACTIVITY_COLUMNS}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushes = 0
+        self.written = 0
+        self.dropped = 0
+
+    def record(self, user_id: int, column: str = "last_login", at: Optional[datetime] = None) -> datetime:
+        """Buffer a timestamp for a user; returns the recorded value"""
+        at = at or datetime.utcnow()
+        pending = self._pending[column]
+        if user_id not in pending or pending[user_id] < at:
+            pending[user_id] = at
+        if self._wakeup is not None and self.pending_count() >= self.max_entries:
+            self._wakeup.set()
+        return at
+
+    def pending_count(self) -> int:
+        return sum(len(pending) for pending in self._pending.values())
+
+    async def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows updated"""
+        written = 0
+        for column in ACTIVITY_COLUMNS:
+            pending = self._pending[column]
+            if not pending:
+                continue
+            self._pending[column] = {}
+            rows = [{"user_id": user_id, "at": at} for user_id, at in pending.items()]
+            users = User.__table__
+            try:
+                async with self.session_factory() as db:
+                    # Core executemany, one per column; ids of deleted users simply match no row
+                    result = await db.execute(
+                        update(users).where(users.c.id == bindparam("user_id")).values({column: bindparam("at")}),
+                        rows
+                    )
+                    await db.commit()
+                written += result.rowcount if result.rowcount >= 0 else len(rows)
+                for user_id in pending:
+                    self._failures[column].pop(user_id, None)
+            except Exception as e:
+                logger.error(f"Error flushing {len(rows)} {column} timestamps: {str(e)}")
+                self._requeue(column, pending)
+        if written:
+            self.flushes += 1
+            self.written += written
+        return written
+
+    def _requeue(self, column: str, pending: Dict[int, datetime]) -> None:
+        """Put failed timestamps back unless newer values arrived meanwhile or they failed too often"""
+        failures = self._failures[column]
+        dropped = 0
+        for user_id, at in pending.items():
+            failures[user_id] = failures.get(user_id, 0) + 1
+            if failures[user_id] >= self.max_attempts:
+                del failures[user_id]
+                dropped += 1
+                continue
+            if user_id not in self._pending[column] or self._pending[column][user_id] < at:
+                self._pending[column][user_id] = at
+        if dropped:
+            self.dropped += dropped
+            logger.warning(f"Dropped {dropped} {column} timestamps after {self.max_attempts} failed flushes")
+
+    async def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker after a final flush"""
+        if self._worker is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._worker
+        self._worker = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+            if self._stopping:
+                return
+
+
+user_activity = UserActivityBuffer()
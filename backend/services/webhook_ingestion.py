@@ -0,0 +1,202 @@
+"""
+Webhook ingestion pipeline - queue webhook leads and insert them in batches
+"""
+import asyncio
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from core.database import AsyncSessionLocal
+from models.lead import LeadSource
+from schemas.lead import LeadCreate, WebhookLeadCreate
+from services.lead_service import LeadService
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Pipeline settings
+WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "200"))
+WEBHOOK_FLUSH_INTERVAL_SECONDS = float(os.getenv("WEBHOOK_FLUSH_INTERVAL_SECONDS", "0.5"))
+WEBHOOK_QUEUE_MAX_DEPTH = int(os.getenv("WEBHOOK_QUEUE_MAX_DEPTH", "50000"))
+WEBHOOK_BULK_MAX_LEADS = int(os.getenv("WEBHOOK_BULK_MAX_LEADS", "5000"))
+# Number of recent ingestions whose status can still be looked up
+WEBHOOK_TRACKED_INGESTIONS = 10000
+
+
+def webhook_to_lead_create(lead_data: WebhookLeadCreate) -> LeadCreate:
+    """Convert webhook data to LeadCreate format (unknown sources become 'other')"""
+    try:
+        source = LeadSource(lead_data.source) if lead_data.source else LeadSource.OTHER
+    except ValueError:
+        source = LeadSource.OTHER
+
+    return LeadCreate(
+        name=lead_data.name,
+        email=lead_data.email,
+        phone=lead_data.phone,
+        company=lead_data.company,
+        source=source,
+        notes=lead_data.notes,
+        budget=lead_data.budget,
+        language=lead_data.language
+    )
+
+
+class QueueFullError(Exception):
+    """Raised when accepting a payload would exceed WEBHOOK_QUEUE_MAX_DEPTH"""
+
+
+@dataclass
+class QueuedLead:
+    ingestion_id: str
+    lead_data: WebhookLeadCreate
+    enqueued_at: float
+
+
+class WebhookIngestionQueue:
+    """In-process queue drained by a single worker task
+
+    Leads are inserted WEBHOOK_BATCH_SIZE at a time with one commit per
+    batch. A batch that fails as a whole is retried lead by lead so one bad
+    row only fails itself.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = WEBHOOK_BATCH_SIZE,
+        flush_interval: float = WEBHOOK_FLUSH_INTERVAL_SECONDS,
+        max_depth: int = WEBHOOK_QUEUE_MAX_DEPTH,
+        session_factory=AsyncSessionLocal
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_depth = max_depth
+        self.session_factory = session_factory
+        self._items: deque = deque()
+        self._ingestions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.processed = 0
+        self.failed = 0
+        self.batches = 0
+        self.last_batch_lag_seconds = 0.0
+
+    def submit(self, leads: List[WebhookLeadCreate]) -> str:
+        """Queue leads for insertion and return their ingestion id"""
+        if len(self._items) + len(leads) > self.max_depth:
+            raise QueueFullError(f"Webhook queue is full ({len(self._items)} leads pending)")
+
+        ingestion_id = uuid.uuid4().hex
+        self._ingestions[ingestion_id] = {
+            "ingestion_id": ingestion_id,
+            "status": "queued",
+            "accepted": len(leads),
+            "created": 0,
+            "failed": 0,
+            "lead_ids": [],
+            "errors": [],
+        }
+        while len(self._ingestions) > WEBHOOK_TRACKED_INGESTIONS:
+            self._ingestions.popitem(last=False)
+
+        now = time.monotonic()
+        self._items.extend(QueuedLead(ingestion_id, lead_data, now) for lead_data in leads)
+        if self._wakeup is not None and len(self._items) >= self.batch_size:
+            self._wakeup.set()
+        return ingestion_id
+
+    def get_ingestion(self, ingestion_id: str) -> Optional[Dict[str, Any]]:
+        return self._ingestions.get(ingestion_id)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and lag for monitoring"""
+        lag = time.monotonic() - self._items[0].enqueued_at if self._items else 0.0
+        return {
+            "depth": len(self._items),
+            "lag_seconds": round(lag, 3),
+            "last_batch_lag_seconds": round(self.last_batch_lag_seconds, 3),
+            "processed": self.processed,
+            "failed": self.failed,
+            "batches": self.batches,
+            "running": self._worker is not None and not self._worker.done(),
+        }
+
+    async def start(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._stopping = False
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the worker after draining everything already queued"""
+        if self._worker is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._worker
+        self._worker = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._items:
+                batch = [self._items.popleft() for _ in range(min(self.batch_size, len(self._items)))]
+                try:
+                    await self._process(batch)
+                except Exception as e:
+                    logger.error(f"Webhook batch failed unexpectedly: {str(e)}")
+
+            if self._stopping:
+                return
+
+    async def _process(self, batch: List[QueuedLead]) -> None:
+        self.last_batch_lag_seconds = time.monotonic() - batch[0].enqueued_at
+        self.batches += 1
+
+        async with self.session_factory() as db:
+            service = LeadService(db)
+            try:
+                leads = await service.create_leads_bulk(
+                    [webhook_to_lead_create(item.lead_data) for item in batch], created_by=None
+                )
+                for item, lead in zip(batch, leads):
+                    self._record(item, lead_id=lead.id)
+                return
+            except Exception as e:
+                logger.warning(f"Webhook batch of {len(batch)} failed, retrying individually: {str(e)}")
+
+            for item in batch:
+                try:
+                    lead = await service.create_lead(webhook_to_lead_create(item.lead_data), created_by=None)
+                    self._record(item, lead_id=lead.id)
+                except Exception as e:
+                    self._record(item, error=str(e))
+
+    def _record(self, item: QueuedLead, lead_id: Optional[int] = None, error: Optional[str] = None) -> None:
+        if lead_id is not None:
+            self.processed += 1
+        else:
+            self.failed += 1
+
+        ingestion = self._ingestions.get(item.ingestion_id)
+        if ingestion is None:
+            return
+        if lead_id is not None:
+            ingestion["created"] += 1
+            ingestion["lead_ids"].append(lead_id)
+        else:
+            ingestion["failed"] += 1
+            ingestion["errors"].append(error)
+        if ingestion["created"] + ingestion["failed"] == ingestion["accepted"]:
+            ingestion["status"] = "completed" if ingestion["failed"] == 0 else "completed_with_errors"
+
+
+webhook_queue = WebhookIngestionQueue()
@@ -0,0 +1,120 @@
+"""
+Shared fixtures for backend API tests (runs against a throwaway SQLite database)
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+sys.path.insert(0, BACKEND_DIR)
+
+TEST_DB_DIR = tempfile.mkdtemp(prefix="tracklie-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(TEST_DB_DIR, 'tracklie_test.db')}"
+os.environ["ENVIRONMENT"] = "test"
+
+from fastapi.testclient import TestClient  # noqa: E402
+from core.database import Base, SessionLocal, engine  # noqa: E402
+from core.schema import migrate  # noqa: E402
+from core.auth import create_access_token, hash_password, verified_token_cache  # noqa: E402
+from core.token_revocation import token_revocations  # noqa: E402
+from core.user_cache import user_principal_cache  # noqa: E402
+from models.user import User, UserRole  # noqa: E402
+from models.lead import Lead, LeadSource, LeadPriority  # noqa: E402
+from services.lead_counter_service import rebuild_lead_counters  # noqa: E402
+from services.lead_search import rebuild_search_tokens  # noqa: E402
+from main import app  # noqa: E402
+
+TEST_PASSWORD = "secret123"
+
+
+@pytest.fixture(scope="session")
+def password_hash():
+    """Hash the shared test password once (sha256_crypt is deliberately slow)"""
+    return hash_password(TEST_PASSWORD)
+
+
+@pytest.fixture(autouse=True)
+def reset_database():
+    """Start every test from an empty schema (and empty auth caches)"""
+    Base.metadata.drop_all(bind=engine)
+    migrate(engine)
+    user_principal_cache.clear()
+    verified_token_cache.clear()
+    token_revocations.clear()
+    yield
+
+
+@pytest.fixture
+def db():
+    """Sync session for arranging and inspecting test data"""
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def client():
+    """Test client bound to a single event loop for the whole test"""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def make_user(db, password_hash):
+    """Factory creating active users with the shared test password"""
+    def _make_user(role=UserRole.ADMIN, email=None, name=None):
+        count = db.query(User).count() + 1
+        user = User(
+            email=email or f"user{count}@tracklie.com",
+            password_hash=password_hash,
+            name=name or f"{role.value.title()} {count}",
+            role=role,
+            is_active=True
+        )
+        db.add(user)
+        db.commit()
+        db.refresh(user)
+        return user
+    return _make_user
+
+
+@pytest.fixture
+def make_leads(db):
+    """Factory bulk-creating leads, optionally assigned to a user
+
+    Leads get explicit, distinct created_at values so ordering is deterministic.
+    """
+    def _make_leads(count, created_by=None, assigned_to=None, **overrides):
+        leads = []
+        start = datetime(2024, 1, 1) + timedelta(days=db.query(Lead).count())
+        for i in range(count):
+            fields = dict(
+                name=f"Lead {i}",
+                email=f"lead{i}@example.com",
+                phone=f"98765{i:05d}",
+                source=LeadSource.WEBSITE,
+                priority=LeadPriority.MEDIUM,
+                created_by=created_by,
+                assigned_to=assigned_to,
+                created_at=start + timedelta(minutes=i)
+            )
+            fields.update(overrides)
+            leads.append(Lead(**fields))
+        db.add_all(leads)
+        db.commit()
+        # Direct inserts bypass LeadService, so bring the rollup and search index up to date
+        rebuild_lead_counters(db)
+        rebuild_search_tokens(db)
+        return leads
+    return _make_leads
+
+
+def auth_headers(user):
+    """Bearer headers for a user, bypassing the login endpoint"""
+    token = create_access_token({"sub": str(user.id), "email": user.email, "role": user.role.value})
+    return {"Authorization": f"Bearer {token}"}
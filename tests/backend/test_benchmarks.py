@@ -0,0 +1,112 @@
+"""
+Smoke tests for the synthetic data generator and the benchmark scenarios
+"""
+import asyncio
+import json
+
+import httpx
+from sqlalchemy import func, select
+
+from benchmarks.generate_data import generate, role_counts
+from benchmarks.regression_gate import BASELINE_PATH, compare, endpoint_metrics
+from benchmarks.scenarios import SCENARIOS, prepare_context, run_scenario
+from conftest import app
+from models.lead import Lead
+from models.lead_counter import LeadCounter
+from models.lead_status_history import LeadStatusHistory
+from models.user import User, UserRole
+
+
+def test_generate_creates_users_in_every_role_leads_and_history(db):
+    result = generate(users=20, leads=40, history_per_lead=3, batch_size=15)
+
+    assert result["leads"] == 40 and result["status_history"] == 120
+    roles = {role for (role,) in db.execute(select(User.role)).all()}
+    assert roles == set(UserRole)
+    assert db.scalar(select(func.count()).select_from(Lead)) == 40
+    assert db.scalar(select(func.count()).select_from(LeadStatusHistory)) == 120
+    assert db.scalar(select(func.sum(LeadCounter.lead_count))) == 40
+    # Every lead's last history entry matches its current status
+    lead = db.get(Lead, 7)
+    last = db.scalars(
+        select(LeadStatusHistory.new_status).where(LeadStatusHistory.lead_id == 7).order_by(LeadStatusHistory.changed_at.desc())
+    ).first()
+    assert last == lead.status.value
+
+    # Re-running adds leads but reuses the existing users
+    generate(users=20, leads=5, history_per_lead=0)
+    assert db.scalar(select(func.count()).select_from(User)) == sum(role_counts(20).values())
+    assert db.scalar(select(func.count()).select_from(Lead)) == 45
+
+
+def test_scenarios_report_latency_and_query_counts():
+    generate(users=20, leads=60, history_per_lead=2, search_index=False)
+
+    async def run():
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                ctx = await prepare_context(client, users=20, salespeople=2)
+                return {
+                    name: await run_scenario(client, ctx, name, concurrency=2, total_requests=6)
+                    for name in SCENARIOS if name != "login"
+                }
+
+    results = asyncio.run(run())
+    for name, result in results.items():
+        assert result["requests"] == 6 and result["errors"] == 0, name
+        assert 0 < result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+        assert result["queries_per_request"] >= 1
+    assert results["leads_list"]["max_queries"] == 2
+    assert set(results["lifecycle"]["endpoints"]) <= {
+        "PATCH /leads/{lead_id}/status", "PATCH /leads/{lead_id}/interest", "POST /leads/{lead_id}/cnp"
+    }
+    assert sum(e["requests"] for e in results["lifecycle"]["endpoints"].values()) == 6
+
+
+def report(p95_ms, queries, errors=0):
+    endpoints = {
+        "GET /leads/": {"requests": 10, "errors": errors, "p95_ms": p95_ms, "queries_per_request": queries},
+        "POST /auth/login": {"requests": 10, "errors": 0, "p95_ms": 900.0, "queries_per_request": 1.0},
+    }
+    return {"total_leads": 100, "scenarios": {"leads_list": {"endpoints": endpoints}}}
+
+
+def test_regression_gate_flags_extra_queries_and_slower_p95():
+    baseline = report(p95_ms=40.0, queries=2.0)
+
+    assert compare(baseline, report(p95_ms=60.0, queries=2.3)) == ([], [])
+    assert compare(baseline, report(p95_ms=40.0, queries=52.0)) == (
+        ["leads_list: GET /leads/: 52.0 queries/request (baseline 2.0)"], []
+    )
+    assert compare(baseline, report(p95_ms=90.0, queries=2.0)) == (
+        ["leads_list: GET /leads/: p95 90.0ms (baseline 40.0ms, limit 65.0ms)"], []
+    )
+    assert "2 of 10 requests failed" in compare(baseline, report(40.0, 2.0, errors=2))[0][0]
+    assert compare(baseline, {"scenarios": {}}) == (["leads_list: GET /leads/: missing from this run"], [])
+
+
+def test_regression_gate_only_warns_on_latency_from_another_host():
+    regressions, warnings = compare(report(40.0, 2.0), report(90.0, 2.0), latency_fatal=False)
+
+    assert regressions == []
+    assert warnings == ["leads_list: GET /leads/: p95 90.0ms (baseline 40.0ms, limit 65.0ms)"]
+
+
+def test_regression_gate_fails_without_query_counts():
+    regressions, _ = compare(report(40.0, 2.0), report(40.0, None))
+    assert regressions == [
+        "leads_list: GET /leads/: queries/request missing (no Server-Timing header; is the query monitor on?)"
+    ]
+    regressions, _ = compare(report(40.0, None), report(40.0, 2.0))
+    assert regressions == [
+        "leads_list: GET /leads/: baseline has no queries/request (no Server-Timing header when recorded)"
+    ]
+
+
+def test_committed_baseline_covers_lead_endpoints():
+    with open(BASELINE_PATH) as f:
+        gated = endpoint_metrics(json.load(f))
+    assert "leads_list: GET /leads/" in gated
+    assert "lifecycle: PATCH /leads/{lead_id}/status" in gated
+    assert not any("/auth/" in key for key in gated)
@@ -0,0 +1,150 @@
+"""
+Tests for Idempotency-Key handling on lead creation and webhooks
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from conftest import auth_headers
+from core.database import AsyncSessionLocal
+from models.idempotency_key import IdempotencyKey
+from models.lead import Lead
+from models.user import UserRole
+from services.idempotency_service import IdempotencyService, hash_idempotency_key
+from services.lead_service import LeadService
+
+WEBHOOK_KEY = "webhook_key_123"
+
+
+def test_retried_create_replays_first_response(client, db, make_user):
+    user = make_user(UserRole.ADMIN)
+    headers = {**auth_headers(user), "Idempotency-Key": "create-1"}
+    payload = {"name": "Asha", "phone": "9876543210"}
+
+    first = client.post("/leads/", json=payload, headers=headers)
+    retry = client.post("/leads/", json=payload, headers=headers)
+
+    assert first.status_code == retry.status_code == 201
+    assert retry.json()["id"] == first.json()["id"]
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert db.query(Lead).count() == 1
+
+
+def test_keys_are_scoped_per_user(client, db, make_user):
+    payload = {"name": "Asha", "phone": "9876543210"}
+    for email in ("a@example.com", "b@example.com"):
+        user = make_user(UserRole.ADMIN, email=email)
+        response = client.post("/leads/", json=payload, headers={**auth_headers(user), "Idempotency-Key": "same"})
+        assert response.status_code == 201
+
+    assert db.query(Lead).count() == 2
+
+
+def test_webhook_retry_does_not_duplicate_lead(client, db):
+    payload = {"name": "FB Lead", "phone": "9000000001", "source": "facebook"}
+    headers = {"Idempotency-Key": "fb-event-42"}
+
+    responses = [
+        client.post("/leads/webhook/", params={"key": WEBHOOK_KEY}, json=payload, headers=headers)
+        for _ in range(3)
+    ]
+
+    assert {r.json()["id"] for r in responses} == {responses[0].json()["id"]}
+    assert db.query(Lead).count() == 1
+
+
+def test_failed_request_releases_key(client, db, monkeypatch):
+    payload = {"name": "FB Lead", "phone": "9000000001"}
+    headers = {"Idempotency-Key": "fail-then-retry"}
+    original = LeadService.create_lead
+
+    async def failing_create(self, *args, **kwargs):
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(LeadService, "create_lead", failing_create)
+    failed = client.post("/leads/webhook/", params={"key": WEBHOOK_KEY}, json=payload, headers=headers)
+    assert failed.status_code == 500
+    assert db.query(IdempotencyKey).count() == 0
+
+    monkeypatch.setattr(LeadService, "create_lead", original)
+    retried = client.post("/leads/webhook/", params={"key": WEBHOOK_KEY}, json=payload, headers=headers)
+    assert retried.status_code == 201
+    assert "Idempotent-Replayed" not in retried.headers
+
+
+def test_in_flight_key_conflicts(client, db, make_user):
+    user = make_user(UserRole.ADMIN)
+    db.add(IdempotencyKey(
+        key_hash=hash_idempotency_key(f"lead_create:{user.id}", "pending"),
+        scope=f"lead_create:{user.id}",
+        expires_at=datetime.utcnow() + timedelta(hours=1)
+    ))
+    db.commit()
+
+    response = client.post(
+        "/leads/", json={"name": "Asha", "phone": "9876543210"},
+        headers={**auth_headers(user), "Idempotency-Key": "pending"}
+    )
+    assert response.status_code == 409
+
+
+def test_abandoned_claim_is_taken_over_after_lease(client, db, make_user):
+    user = make_user(UserRole.ADMIN)
+    # A worker claimed the key and crashed before storing a response
+    db.add(IdempotencyKey(
+        key_hash=hash_idempotency_key(f"lead_create:{user.id}", "crashed"),
+        scope=f"lead_create:{user.id}",
+        claimed_at=datetime.utcnow() - timedelta(minutes=5),
+        expires_at=datetime.utcnow() + timedelta(hours=1)
+    ))
+    db.commit()
+    headers = {**auth_headers(user), "Idempotency-Key": "crashed"}
+    payload = {"name": "Asha", "phone": "9876543210"}
+
+    taken_over = client.post("/leads/", json=payload, headers=headers)
+    assert taken_over.status_code == 201
+    assert "Idempotent-Replayed" not in taken_over.headers
+
+    replay = client.post("/leads/", json=payload, headers=headers)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["id"] == taken_over.json()["id"]
+    assert db.query(Lead).count() == 1
+
+
+def test_response_is_stored_with_the_lead(client, db, monkeypatch):
+    payload = {"name": "FB Lead", "phone": "9000000001"}
+    headers = {"Idempotency-Key": "fail-after-commit"}
+    original = LeadService.reload_lead
+    calls = []
+
+    async def reload_failing_after_commit(self, lead_id):
+        calls.append(lead_id)
+        if len(calls) == 2:
+            raise RuntimeError("connection lost")
+        return await original(self, lead_id)
+
+    monkeypatch.setattr(LeadService, "reload_lead", reload_failing_after_commit)
+    failed = client.post("/leads/webhook/", params={"key": WEBHOOK_KEY}, json=payload, headers=headers)
+    assert failed.status_code == 500
+
+    # The lead committed together with its response, so the retry replays it
+    monkeypatch.setattr(LeadService, "reload_lead", original)
+    retried = client.post("/leads/webhook/", params={"key": WEBHOOK_KEY}, json=payload, headers=headers)
+    assert retried.status_code == 201
+    assert retried.headers["Idempotent-Replayed"] == "true"
+    assert retried.json()["id"] == db.query(Lead).one().id
+
+
+def test_purge_removes_only_expired_keys(db):
+    now = datetime.utcnow()
+    db.add_all([
+        IdempotencyKey(key_hash="old", scope="webhook", expires_at=now - timedelta(minutes=1)),
+        IdempotencyKey(key_hash="live", scope="webhook", expires_at=now + timedelta(hours=1)),
+    ])
+    db.commit()
+
+    async def purge():
+        async with AsyncSessionLocal() as session:
+            return await IdempotencyService(session).purge_expired()
+
+    assert asyncio.run(purge()) == 1
+    assert [k.key_hash for k in db.query(IdempotencyKey).all()] == ["live"]
@@ -0,0 +1,73 @@
+"""
+Tests for the incrementally maintained lead_counters rollup
+"""
+from sqlalchemy.dialects import postgresql
+
+from conftest import auth_headers
+from core.database import engine
+from core.schema import migrate
+from models.lead import Lead, LeadStatus
+from models.lead_counter import LeadCounter
+from models.user import UserRole
+from services.lead_counter_service import (
+    find_counter_drift,
+    increment_statement,
+    rebuild_lead_counters,
+    stored_bucket_counts,
+)
+
+
+def test_counters_follow_service_writes(client, db, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    agent = make_user(UserRole.SALESPERSON)
+    existing = make_leads(3, created_by=admin.id, assigned_to=agent.id)
+    headers = auth_headers(admin)
+
+    created = client.post("/leads/", json={"name": "New", "phone": "9123456789", "source": "google"}, headers=headers).json()
+    client.put(f"/leads/{created['id']}", json={"assigned_to": agent.id, "priority": "high"}, headers=headers)
+    client.patch(f"/leads/{existing[0].id}/status", json={"status": "In Progress"}, headers=headers)
+    client.post(f"/leads/{existing[1].id}/cnp", json={}, headers=headers)
+    client.post(f"/leads/{existing[1].id}/convert", json={"product": "Plan", "payment_amount": 100}, headers=headers)
+    client.post(f"/leads/{existing[2].id}/drop", json={"reason": "Other - Other reasons"}, headers=headers)
+    client.delete(f"/leads/{created['id']}", headers=headers)
+
+    db.expire_all()
+    assert find_counter_drift(db) == {}
+
+    stats = client.get("/leads/stats/overview", headers=auth_headers(agent)).json()
+    assert stats["total_leads"] == 4
+    assert stats["leads_by_source"]["google"] == 1
+    assert stats["leads_by_priority"]["high"] == 1
+
+
+def test_drift_is_detected_and_repaired_by_rebuild(db, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    make_leads(2, created_by=admin.id)
+
+    # Simulate a write that bypassed the services
+    lead = db.query(Lead).first()
+    lead.status = LeadStatus.LOST
+    db.commit()
+
+    drift = find_counter_drift(db)
+    assert sorted(drift.values()) == [(0, 1), (2, 1)]
+
+    rebuild_lead_counters(db)
+    assert find_counter_drift(db) == {}
+
+
+def test_increment_statement_supports_postgres():
+    statement = increment_statement("postgresql", (0, "NEW", "", "MEDIUM"), 1)
+
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (assigned_to, status, source, priority) DO UPDATE" in sql
+
+
+def test_migrate_fills_counters_for_existing_leads(db, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    make_leads(3, created_by=admin.id)
+    LeadCounter.__table__.drop(bind=engine)
+
+    migrate(engine)
+    assert find_counter_drift(db) == {}
+    assert sum(stored_bucket_counts(db).values()) == 3
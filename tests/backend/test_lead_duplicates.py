@@ -0,0 +1,74 @@
+"""
+Tests for normalized contact columns and duplicate detection
+"""
+import asyncio
+
+import pytest
+
+from conftest import auth_headers
+from core.database import AsyncSessionLocal
+from core.normalization import normalize_email, normalize_phone
+from models.lead import Lead
+from models.user import UserRole
+from services.lead_service import LeadService
+
+
+@pytest.mark.parametrize("raw", ["+91 98765 43210", "098765-43210", "9876543210", "0091 9876543210", "91-98765-43210"])
+def test_indian_number_formats_share_one_e164(raw):
+    assert normalize_phone(raw) == "+919876543210"
+
+
+def test_email_is_trimmed_and_lowercased():
+    assert normalize_email("  Asha.Rao@Example.COM ") == "asha.rao@example.com"
+    assert normalize_email("   ") is None
+
+
+def test_model_keeps_normalized_columns_in_step(db):
+    lead = Lead(name="Asha", phone="098765 43210", email="Asha@Example.com")
+    db.add(lead)
+    db.commit()
+    assert (lead.phone_e164, lead.email_norm) == ("+919876543210", "asha@example.com")
+
+    lead.phone = "+1 415 555 0100"
+    lead.email = None
+    db.commit()
+    assert (lead.phone_e164, lead.email_norm) == ("+14155550100", None)
+
+
+def find_duplicate(phone, email=None):
+    async def _find():
+        async with AsyncSessionLocal() as session:
+            return await LeadService(session).find_duplicate_lead_id(phone, email)
+    return asyncio.run(_find())
+
+
+def test_duplicate_found_by_phone_or_email(make_leads):
+    lead = make_leads(1, phone="+91 98765 43210", email="asha@example.com")[0]
+
+    assert find_duplicate("98765-43210") == lead.id
+    assert find_duplicate("9000000000", "ASHA@example.com") == lead.id
+    assert find_duplicate("9000000000", "someone@example.com") is None
+
+
+def test_backfill_fills_missing_normalized_contacts(db, make_leads):
+    from backfill_lead_contacts import backfill
+
+    leads = make_leads(3)
+    db.query(Lead).update({Lead.phone_e164: None, Lead.email_norm: None})
+    db.commit()
+
+    assert backfill(batch_size=2, refresh_all=False) == 3
+
+    db.expire_all()
+    for lead in db.query(Lead).filter(Lead.id.in_([lead.id for lead in leads])):
+        assert (lead.phone_e164, lead.email_norm) == (normalize_phone(lead.phone), normalize_email(lead.email))
+        assert lead.version == 1
+
+
+def test_phone_longer_than_e164_is_rejected(client, make_user):
+    assert normalize_phone("+1234567890123456") is None
+    assert normalize_phone("00 123456789012345") == "+123456789012345"
+
+    admin = make_user(UserRole.ADMIN)
+    response = client.post("/leads/", json={"name": "Asha", "phone": "1" * 20}, headers=auth_headers(admin))
+    assert response.status_code == 422
@@ -0,0 +1,205 @@
+"""
+API tests for lead lifecycle endpoints
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from conftest import auth_headers
+from models.lead import Lead
+from models.lead_status_history import LeadStatusHistory
+from models.user import UserRole
+from services.lead_counter_service import find_counter_drift
+
+
+def test_cnp_increments_and_records_history(client, make_user, make_leads):
+    agent = make_user(UserRole.SALESPERSON)
+    lead = make_leads(1, assigned_to=agent.id)[0]
+
+    for attempt in (1, 2):
+        response = client.post(f"/leads/{lead.id}/cnp", json={"reason": "No answer"}, headers=auth_headers(agent))
+        assert response.status_code == 200
+        assert response.json()["cnp_count"] == attempt
+
+    response = client.get(f"/leads/{lead.id}/status-history", headers=auth_headers(agent))
+    assert response.status_code == 200
+    history = response.json()
+    assert len(history) == 2
+    assert all(entry["new_status"] == "CNP" for entry in history)
+
+
+def test_status_convert_and_drop(client, make_user, make_leads):
+    agent = make_user(UserRole.SALESPERSON)
+    first, second = make_leads(2, assigned_to=agent.id)
+    headers = auth_headers(agent)
+
+    response = client.patch(f"/leads/{first.id}/status", json={"status": "In Progress"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["old_status"] == "New"
+
+    response = client.patch(f"/leads/{first.id}/interest", json={"interest_level": 4}, headers=headers)
+    assert response.json()["interest_level"] == 4
+
+    response = client.post(f"/leads/{first.id}/convert", json={"product": "Course", "payment_amount": 5000}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["product"] == "Course"
+
+    response = client.post(f"/leads/{second.id}/drop", json={"reason": "Price - Too expensive"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["drop_reason"] == "Price - Too expensive"
+
+
+def test_unknown_lead_is_rejected(client, make_user):
+    agent = make_user(UserRole.SALESPERSON)
+
+    response = client.post("/leads/999/cnp", json={}, headers=auth_headers(agent))
+    assert response.status_code == 400
+
+
+def test_concurrent_cnp_marks_never_lose_increments(client, db, make_user, make_leads):
+    agent = make_user(UserRole.SALESPERSON)
+    lead = make_leads(1, assigned_to=agent.id)[0]
+    headers = auth_headers(agent)
+
+    def mark(_):
+        return client.post(f"/leads/{lead.id}/cnp", json={"reason": "No answer"}, headers=headers)
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        responses = list(pool.map(mark, range(40)))
+
+    statuses = [response.status_code for response in responses]
+    assert set(statuses) <= {200, 409}
+    succeeded = statuses.count(200)
+    assert succeeded > 0
+
+    db.expire_all()
+    stored = db.get(Lead, lead.id)
+    assert stored.cnp_count == succeeded
+    assert stored.version == 1 + succeeded
+    assert db.query(LeadStatusHistory).filter_by(lead_id=lead.id).count() == succeeded
+    assert sorted(r.json()["cnp_count"] for r in responses if r.status_code == 200) == list(range(1, succeeded + 1))
+    assert find_counter_drift(db) == {}
+
+
+def test_stale_expected_version_is_rejected_with_409(client, db, make_user, make_leads):
+    agent = make_user(UserRole.SALESPERSON)
+    lead = make_leads(1, assigned_to=agent.id)[0]
+    headers = auth_headers(agent)
+
+    version = client.get(f"/leads/{lead.id}", headers=headers).json()["version"]
+    response = client.patch(
+        f"/leads/{lead.id}/status", json={"status": "In Progress", "expected_version": version}, headers=headers
+    )
+    assert response.status_code == 200
+    assert response.json()["version"] == version + 1
+
+    # A second agent acting on the same stale view loses
+    response = client.post(
+        f"/leads/{lead.id}/drop", json={"reason": "Price - Too expensive", "expected_version": version}, headers=headers
+    )
+    assert response.status_code == 409
+    history = client.get(f"/leads/{lead.id}/status-history", headers=headers).json()
+    assert [entry["new_status"] for entry in history] == ["In Progress"]
+
+
+def test_bulk_drop_updates_leads_history_and_counters(client, db, make_user, make_leads):
+    team_lead = make_user(UserRole.TEAM_LEAD)
+    agent = make_user(UserRole.SALESPERSON)
+    leads = make_leads(5, assigned_to=agent.id)
+    lead_ids = [lead.id for lead in leads]
+
+    response = client.post(
+        "/leads/bulk/lifecycle",
+        json={"lead_ids": lead_ids + [999999, lead_ids[0]], "action": "drop", "params": {"reason": "Campaign ended"}},
+        headers=auth_headers(team_lead)
+    )
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["requested"], body["succeeded"], body["failed"]) == (6, 5, 1)
+    assert [result["lead_id"] for result in body["results"]] == lead_ids + [999999]
+    assert body["results"][-1] == {"lead_id": 999999, "success": False, "version": None, "error": "Lead not found"}
+    assert all(result["version"] == 2 for result in body["results"][:5])
+
+    db.expire_all()
+    assert {lead.status.value for lead in db.query(Lead).filter(Lead.id.in_(lead_ids))} == {"Dropped"}
+    history = db.query(LeadStatusHistory).filter(LeadStatusHistory.lead_id.in_(lead_ids)).all()
+    assert sorted(entry.lead_id for entry in history) == sorted(lead_ids)
+    assert {entry.drop_reason for entry in history} == {"Campaign ended"}
+    assert find_counter_drift(db) == {}
+
+
+def test_bulk_cnp_increments_each_lead_across_chunks(client, db, make_user, make_leads, monkeypatch):
+    monkeypatch.setattr("services.lead_lifecycle_service.LIFECYCLE_BULK_CHUNK_SIZE", 2)
+    agent = make_user(UserRole.SALESPERSON)
+    lead_ids = [lead.id for lead in make_leads(5, assigned_to=agent.id)]
+    headers = auth_headers(make_user(UserRole.MANAGER))
+
+    for _ in range(2):
+        response = client.post("/leads/bulk/lifecycle", json={"lead_ids": lead_ids, "action": "cnp"}, headers=headers)
+        assert response.json()["succeeded"] == 5
+
+    db.expire_all()
+    assert [lead.cnp_count for lead in db.query(Lead).filter(Lead.id.in_(lead_ids))] == [2] * 5
+    reasons = {entry.change_reason for entry in db.query(LeadStatusHistory).filter(LeadStatusHistory.lead_id.in_(lead_ids))}
+    assert reasons == {"Marked as CNP (attempt #1)", "Marked as CNP (attempt #2)"}
+
+
+def test_bulk_params_use_single_lead_validation(client, make_user, make_leads):
+    lead = make_leads(1)[0]
+    headers = auth_headers(make_user(UserRole.ADMIN))
+
+    for body in (
+        {"lead_ids": [lead.id], "action": "status", "params": {"status": "Archived"}},
+        {"lead_ids": [lead.id], "action": "interest", "params": {"interest_level": 9}},
+        {"lead_ids": [lead.id], "action": "drop", "params": {"reason": "x", "expected_version": 1}},
+        {"lead_ids": [lead.id], "action": "delete"},
+    ):
+        assert client.post("/leads/bulk/lifecycle", json=body, headers=headers).status_code == 422
+
+    response = client.post("/leads/bulk/lifecycle", json={"lead_ids": [], "action": "cnp"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_status_history_pages_with_cursor_and_since(client, make_user, make_leads):
+    agent = make_user(UserRole.SALESPERSON)
+    lead = make_leads(1, assigned_to=agent.id)[0]
+    headers = auth_headers(agent)
+    for level in range(5):
+        client.patch(f"/leads/{lead.id}/interest", json={"interest_level": level}, headers=headers)
+
+    pages, cursor = [], None
+    while True:
+        params = {"limit": 2, **({"after": cursor} if cursor else {})}
+        response = client.get(f"/leads/{lead.id}/status-history", params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append([entry["interest_level"] for entry in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert pages == [[4, 3], [2, 1], [0]]
+
+    history = client.get(f"/leads/{lead.id}/status-history", headers=headers).json()
+    since = history[2]["changed_at"]
+    response = client.get(f"/leads/{lead.id}/status-history", params={"since": since}, headers=headers)
+    assert [entry["interest_level"] for entry in response.json()] == [4, 3]
+    assert "x-next-cursor" not in response.headers
+
+    response = client.get(f"/leads/{lead.id}/status-history", params={"after": "not-a-cursor"}, headers=headers)
+    assert response.status_code == 400
+
+
+def test_bulk_changes_are_denied_to_agents(client, db, make_user, make_leads):
+    agent = make_user(UserRole.SALESPERSON)
+    other = make_user(UserRole.SALESPERSON)
+    own = make_leads(1, assigned_to=agent.id)[0]
+    lead_ids = [own.id] + [lead.id for lead in make_leads(2, assigned_to=other.id)]
+
+    for role_user in (agent, make_user(UserRole.RECOVERY_AGENT)):
+        response = client.post(
+            "/leads/bulk/lifecycle",
+            json={"lead_ids": lead_ids, "action": "drop", "params": {"reason": "x"}},
+            headers=auth_headers(role_user)
+        )
+        assert response.status_code == 403
+
+    db.expire_all()
+    assert {lead.status.value for lead in db.query(Lead).filter(Lead.id.in_(lead_ids))} == {"New"}
+    assert db.query(LeadStatusHistory).count() == 0
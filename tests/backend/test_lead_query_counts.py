@@ -0,0 +1,75 @@
+"""
+Guards against N+1 creator/assignee lookups in lead endpoints
+"""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from conftest import auth_headers
+from core.database import async_engine
+from models.user import UserRole
+
+
+@contextmanager
+def count_queries():
+    """Count SQL statements executed through the async engine"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+def list_query_count(client, admin, per_page):
+    with count_queries() as statements:
+        response = client.get(f"/leads/?per_page={per_page}", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert len(response.json()["leads"]) == per_page
+    return len(statements)
+
+
+def test_list_query_count_is_independent_of_page_size(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    agents = [make_user(UserRole.SALESPERSON) for _ in range(5)]
+    for agent in agents:
+        make_leads(20, created_by=agent.id, assigned_to=agent.id)
+
+    first = list_query_count(client, admin, per_page=5)
+    small = list_query_count(client, admin, per_page=5)
+    large = list_query_count(client, admin, per_page=100)
+
+    # count + page (with joined creator/assignee); the user lookup only
+    # happens on the first request, later ones hit the principal cache
+    assert first == small + 1
+    assert small == large
+    assert large <= 2
+
+
+def test_detail_create_and_update_load_names_without_extra_queries(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    agent = make_user(UserRole.SALESPERSON)
+    lead = make_leads(1, created_by=admin.id, assigned_to=agent.id)[0]
+    headers = auth_headers(admin)
+
+    with count_queries() as statements:
+        response = client.get(f"/leads/{lead.id}", headers=headers)
+    assert response.json()["assignee_name"] == agent.name
+    assert len(statements) <= 2
+
+    with count_queries() as statements:
+        response = client.put(f"/leads/{lead.id}", json={"assigned_to": admin.id}, headers=headers)
+    assert response.json()["assignee_name"] == admin.name
+    # user + lead + UPDATE + two counter upserts + reload
+    assert len(statements) <= 6
+
+    with count_queries() as statements:
+        response = client.post("/leads/", json={"name": "New", "phone": "9123456789", "assigned_to": agent.id}, headers=headers)
+    assert response.json()["creator_name"] == admin.name
+    assert response.json()["assignee_name"] == agent.name
+    # user + duplicate check + INSERT + search tokens + counter upsert + reload
+    assert len(statements) <= 6
@@ -0,0 +1,44 @@
+"""
+Tests for the token index search backend (the SQLite default)
+"""
+from conftest import auth_headers
+from models.user import UserRole
+from services.lead_search import lead_tokens, tokenize
+from models.lead import Lead
+
+
+def search_names(client, user, term):
+    response = client.get("/leads/", params={"search": term, "per_page": 50}, headers=auth_headers(user))
+    assert response.status_code == 200
+    return [lead["name"] for lead in response.json()["leads"]]
+
+
+def test_tokenize_splits_on_punctuation_and_lowercases():
+    assert tokenize("Asha.Rao@Example.com") == ["asha", "rao", "example", "com"]
+    lead = Lead(name="Asha", phone="+91 98765-43210", email=None, company=None)
+    assert {"91", "98765", "43210", "919876543210"} <= lead_tokens(lead)
+
+
+def test_search_matches_prefixes_across_fields(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    make_leads(1, name="Asha Rao", email="asha@acme.io", phone="9876500001", company="Acme Corp")
+    make_leads(1, name="Ravi Kumar", email="ravi@globex.com", phone="9123400002", company="Globex")
+
+    assert search_names(client, admin, "ash") == ["Asha Rao"]
+    assert search_names(client, admin, "globex") == ["Ravi Kumar"]
+    assert search_names(client, admin, "91234") == ["Ravi Kumar"]
+    assert search_names(client, admin, "acme rao") == ["Asha Rao"]
+    assert search_names(client, admin, "acme ravi") == []
+
+
+def test_search_orders_by_relevance_and_tracks_updates(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    headers = auth_headers(admin)
+    prefix_only = client.post("/leads/", json={"name": "Shahrukh Tanwar", "phone": "9000000001"}, headers=headers).json()
+    exact = client.post("/leads/", json={"name": "Shah Traders", "phone": "9000000002"}, headers=headers).json()
+
+    assert search_names(client, admin, "shah") == ["Shah Traders", "Shahrukh Tanwar"]
+
+    client.put(f"/leads/{prefix_only['id']}", json={"name": "Mehul Tanwar"}, headers=headers)
+    assert search_names(client, admin, "shah") == [exact["name"]]
+    assert search_names(client, admin, "mehul") == ["Mehul Tanwar"]
@@ -0,0 +1,125 @@
+"""
+API tests for lead CRUD endpoints
+"""
+from sqlalchemy import update
+
+from conftest import auth_headers
+from core.database import engine
+from models.lead import Lead, LeadPriority, LeadSource, LeadStatus
+from models.user import UserRole
+import services.lead_service as lead_service_module
+
+
+def test_create_and_get_lead(client, make_user):
+    admin = make_user(UserRole.ADMIN)
+    payload = {"name": "Asha Rao", "phone": "9876543210", "email": "asha@example.com", "assigned_to": admin.id}
+
+    response = client.post("/leads/", json=payload, headers=auth_headers(admin))
+    assert response.status_code == 201
+    created = response.json()
+    assert created["creator_name"] == admin.name
+    assert created["assignee_name"] == admin.name
+
+    response = client.get(f"/leads/{created['id']}", headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert response.json()["name"] == "Asha Rao"
+
+
+def test_list_leads_is_scoped_for_salesperson(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    sales = make_user(UserRole.SALESPERSON)
+    make_leads(3, created_by=admin.id, assigned_to=sales.id)
+    make_leads(2, created_by=admin.id, assigned_to=admin.id)
+
+    response = client.get("/leads/", headers=auth_headers(sales))
+    assert response.status_code == 200
+    body = response.json()
+    assert body["total"] == 3
+    assert all(lead["assignee_name"] == sales.name for lead in body["leads"])
+
+    response = client.get("/leads/", headers=auth_headers(admin))
+    assert response.json()["total"] == 5
+
+
+def test_update_and_delete_lead(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    lead = make_leads(1, created_by=admin.id)[0]
+
+    response = client.put(f"/leads/{lead.id}", json={"company": "Acme"}, headers=auth_headers(admin))
+    assert response.status_code == 200
+    assert response.json()["company"] == "Acme"
+
+    response = client.delete(f"/leads/{lead.id}", headers=auth_headers(admin))
+    assert response.status_code == 200
+
+
+def test_update_racing_a_lifecycle_change_returns_409(client, db, make_user, make_leads, monkeypatch):
+    admin = make_user(UserRole.ADMIN)
+    lead = make_leads(1, created_by=admin.id)[0]
+    lead_bucket = lead_service_module.lead_bucket
+
+    def bucket_after_concurrent_change(row):
+        # Another request commits a lifecycle transition after the PUT read the lead
+        with engine.begin() as connection:
+            connection.execute(update(Lead).where(Lead.id == lead.id).values(version=Lead.version + 1))
+        monkeypatch.setattr(lead_service_module, "lead_bucket", lead_bucket)
+        return lead_bucket(row)
+
+    monkeypatch.setattr(lead_service_module, "lead_bucket", bucket_after_concurrent_change)
+    response = client.put(f"/leads/{lead.id}", json={"company": "Acme"}, headers=auth_headers(admin))
+    assert response.status_code == 409
+
+    db.expire_all()
+    assert db.get(Lead, lead.id).company != "Acme"
+    response = client.put(f"/leads/{lead.id}", json={"company": "Acme"}, headers=auth_headers(admin))
+    assert response.status_code == 200
+
+
+def test_cursor_pagination_walks_all_leads_in_order(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    make_leads(7, created_by=admin.id)
+    headers = auth_headers(admin)
+
+    first_page = client.get("/leads/?per_page=3", headers=headers).json()
+    assert first_page["total"] == 7
+    seen = [lead["id"] for lead in first_page["leads"]]
+    cursor = first_page["next_cursor"]
+    while cursor:
+        body = client.get(f"/leads/?per_page=3&after={cursor}", headers=headers).json()
+        assert body["total"] is None  # cursor pages skip the COUNT
+        seen.extend(lead["id"] for lead in body["leads"])
+        cursor = body["next_cursor"]
+
+    offset_ids = []
+    for page in (1, 2, 3):
+        body = client.get(f"/leads/?per_page=3&page={page}", headers=headers).json()
+        offset_ids.extend(lead["id"] for lead in body["leads"])
+
+    assert len(seen) == 7
+    assert seen == offset_ids
+    assert body["next_cursor"] is None
+
+
+def test_invalid_cursor_is_rejected(client, make_user):
+    admin = make_user(UserRole.ADMIN)
+
+    response = client.get("/leads/?after=not-a-cursor", headers=auth_headers(admin))
+    assert response.status_code == 400
+
+
+def test_stats_overview_counts_by_dimension(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    sales = make_user(UserRole.SALESPERSON)
+    make_leads(3, assigned_to=sales.id, source=LeadSource.FACEBOOK, priority=LeadPriority.HIGH)
+    make_leads(2, assigned_to=admin.id, source=None, status=LeadStatus.CONVERTED)
+
+    body = client.get("/leads/stats/overview", headers=auth_headers(admin)).json()
+    assert body["total_leads"] == 5
+    assert body["leads_by_source"]["facebook"] == 3
+    assert body["leads_by_source"]["website"] == 0
+    assert sum(body["leads_by_source"].values()) == 3
+    assert body["leads_by_priority"] == {"low": 0, "medium": 2, "high": 3}
+
+    body = client.get("/leads/stats/overview", headers=auth_headers(sales)).json()
+    assert body["total_leads"] == 3
+    assert body["leads_by_priority"]["high"] == 3
@@ -0,0 +1,75 @@
+"""
+Tests for the per-route request metrics exposed on /metrics
+"""
+import pytest
+
+from conftest import auth_headers
+from core.metrics import LATENCY_BUCKETS, RequestStats, metrics_registry
+from models.user import UserRole
+
+
+@pytest.fixture(autouse=True)
+def reset_metrics():
+    metrics_registry.clear()
+    yield
+
+
+def sample(body, line_prefix):
+    """Value of the first exposition line starting with line_prefix"""
+    for line in body.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"{line_prefix} not in metrics output")
+
+
+def test_requests_are_recorded_per_route_template(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    leads = make_leads(2)
+    headers = auth_headers(admin)
+    for lead in leads:
+        assert client.get(f"/leads/{lead.id}", headers=headers).status_code == 200
+    assert client.get("/leads/999999", headers=headers).status_code == 404
+    assert client.get("/no-such-page").status_code == 404
+
+    body = client.get("/metrics").text
+    labels = 'method="GET",route="/leads/{lead_id}"'
+    assert sample(body, f'tracklie_http_requests_total{{{labels},status="200"}}') == 2
+    assert sample(body, f'tracklie_http_requests_total{{{labels},status="404"}}') == 1
+    assert sample(body, f'tracklie_http_request_duration_seconds_count{{{labels}}}') == 3
+    assert sample(body, f'tracklie_http_request_duration_seconds_bucket{{{labels},le="+Inf"}}') == 3
+    assert sample(body, f"tracklie_http_request_errors_total{{{labels}}}") == 0
+    assert sample(body, f"tracklie_db_queries_total{{{labels}}}") >= 3
+    assert sample(body, f"tracklie_db_query_seconds_total{{{labels}}}") > 0
+    assert 'route="unmatched",status="404"' in body
+    # Pool gauges are still part of the same exposition
+    assert "tracklie_db_pool_checked_out" in body
+
+
+def test_errors_and_in_flight_are_tracked(client, make_user, monkeypatch):
+    admin = make_user(UserRole.ADMIN)
+
+    async def explode(*args, **kwargs):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr("services.lead_service.LeadService.get_lead_stats", explode)
+    assert client.get("/leads/stats/overview", headers=auth_headers(admin)).status_code == 500
+
+    body = client.get("/metrics").text
+    labels = 'method="GET",route="/leads/stats/overview"'
+    assert sample(body, f'tracklie_http_requests_total{{{labels},status="500"}}') == 1
+    assert sample(body, f"tracklie_http_request_errors_total{{{labels}}}") == 1
+    # Only the /metrics request itself is in flight while it renders
+    assert sample(body, "tracklie_http_requests_in_flight") == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    for duration in (0.001, 0.03, 0.03, 20.0):
+        metrics_registry.observe("GET", "/x", 200, duration, RequestStats())
+    buckets = [
+        line for line in metrics_registry.render_prometheus()
+        if line.startswith("tracklie_http_request_duration_seconds_bucket")
+    ]
+    counts = [float(line.rsplit(" ", 1)[1]) for line in buckets]
+    assert counts == sorted(counts)
+    assert len(buckets) == len(LATENCY_BUCKETS) + 1
+    assert counts[0] == 1 and counts[-2] == 3 and counts[-1] == 4
@@ -0,0 +1,90 @@
+"""
+Tests for connection pool monitoring and load shedding
+"""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from conftest import auth_headers
+from core.database import ASYNC_DATABASE_URL
+from core.pool_monitor import MonitoredAsyncQueuePool, pool_monitor
+from models.user import UserRole
+
+
+def test_waiters_are_tracked_until_pool_timeout():
+    async def run():
+        engine = create_async_engine(
+            ASYNC_DATABASE_URL, poolclass=MonitoredAsyncQueuePool,
+            pool_size=1, max_overflow=0, pool_timeout=0.3
+        )
+        observed = []
+        try:
+            async with engine.connect() as held:
+                await held.execute(text("SELECT 1"))
+
+                async def second_checkout():
+                    async with engine.connect() as conn:
+                        await conn.execute(text("SELECT 1"))
+
+                waiter = asyncio.create_task(second_checkout())
+                await asyncio.sleep(0.1)
+                observed.append((pool_monitor.waiting_count(), pool_monitor.oldest_wait_seconds()))
+                with pytest.raises(PoolTimeoutError):
+                    await waiter
+        finally:
+            await engine.dispose()
+        return observed[0]
+
+    timeouts_before, waits_before = pool_monitor.timeouts, pool_monitor.waits
+    waiting, oldest = asyncio.run(run())
+
+    assert waiting == 1
+    assert oldest >= 0.05
+    assert pool_monitor.timeouts == timeouts_before + 1
+    assert pool_monitor.waits == waits_before + 1
+    assert pool_monitor.waiting_count() == 0
+
+
+def test_checkouts_with_a_free_connection_are_not_waits():
+    async def run():
+        engine = create_async_engine(
+            ASYNC_DATABASE_URL, poolclass=MonitoredAsyncQueuePool, pool_size=1, max_overflow=1
+        )
+        try:
+            # The first checkout opens the connection, later ones reuse it;
+            # with one held, the next opens an overflow connection
+            for _ in range(3):
+                async with engine.connect() as conn:
+                    await conn.execute(text("SELECT 1"))
+            async with engine.connect() as held, engine.connect() as overflow:
+                await held.execute(text("SELECT 1"))
+                await overflow.execute(text("SELECT 1"))
+        finally:
+            await engine.dispose()
+
+    waits_before = pool_monitor.waits
+    asyncio.run(run())
+
+    assert pool_monitor.waits == waits_before
+
+
+def test_requests_are_shed_while_pool_queue_is_slow(client, make_user, monkeypatch):
+    admin = make_user(UserRole.ADMIN)
+    shed_before = pool_monitor.shed_requests
+    monkeypatch.setitem(pool_monitor._waiters, -1, time.monotonic() - 10)
+
+    response = client.get("/leads/", headers=auth_headers(admin))
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "2"
+    assert client.get("/health").status_code == 200
+
+    metrics = client.get("/metrics").text
+    assert "tracklie_db_pool_waiting 1" in metrics
+    assert f"tracklie_db_pool_shed_requests_total {shed_before + 1}" in metrics
+
+    monkeypatch.delitem(pool_monitor._waiters, -1)
+    assert client.get("/leads/", headers=auth_headers(admin)).status_code == 200
@@ -0,0 +1,73 @@
+"""
+Tests for per-request query diagnostics (Server-Timing, query budget, N+1)
+"""
+import logging
+
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from conftest import auth_headers
+from core.database import get_async_db
+from core.query_monitor import QueryMonitorMiddleware
+from models.lead import Lead
+from models.user import UserRole
+
+
+def n_plus_one_app(**middleware_options):
+    """Minimal app whose only route loads leads one query at a time"""
+    app = FastAPI()
+
+    @app.get("/lead-names")
+    async def lead_names(db=Depends(get_async_db)):
+        ids = (await db.scalars(select(Lead.id).order_by(Lead.id))).all()
+        return [await db.scalar(select(Lead.name).where(Lead.id == lead_id)) for lead_id in ids]
+
+    app.add_middleware(QueryMonitorMiddleware, **middleware_options)
+    return app
+
+
+def test_server_timing_reports_db_work(client, make_user, make_leads):
+    admin = make_user(UserRole.ADMIN)
+    make_leads(3, created_by=admin.id)
+
+    headers = auth_headers(admin)
+    client.get("/leads/", headers=headers)  # warms the user principal cache
+    response = client.get("/leads/", headers=headers)
+    assert response.status_code == 200
+    timing = response.headers["server-timing"]
+    assert timing.startswith("db;dur=")
+    assert '"2 queries"' in timing  # count + joined page query
+    assert "total;dur=" in timing
+
+
+def test_lead_list_is_not_flagged_as_n_plus_one(client, make_user, make_leads, caplog):
+    admin = make_user(UserRole.ADMIN)
+    salesperson = make_user(UserRole.SALESPERSON)
+    make_leads(20, created_by=admin.id, assigned_to=salesperson.id)
+
+    with caplog.at_level(logging.WARNING, logger="core.query_monitor"):
+        assert client.get("/leads/?limit=20", headers=auth_headers(admin)).status_code == 200
+    assert "Suspected N+1" not in caplog.text
+
+
+def test_repeated_statement_is_flagged_and_budget_logged(make_leads, caplog):
+    make_leads(6)
+    app = n_plus_one_app(query_budget=3, n_plus_one_threshold=5)
+
+    with caplog.at_level(logging.WARNING, logger="core.query_monitor"):
+        with TestClient(app) as test_client:
+            response = test_client.get("/lead-names")
+    assert response.status_code == 200
+    assert len(response.json()) == 6
+    assert "GET /lead-names ran 7 queries (budget 3)" in caplog.text
+    assert "Suspected N+1 in GET /lead-names: ran 6 times: SELECT leads.name" in caplog.text
+    assert response.headers["server-timing"].startswith("db;dur=")
+
+
+def test_server_timing_can_be_disabled(make_leads):
+    make_leads(1)
+    with TestClient(n_plus_one_app(server_timing_enabled=False)) as test_client:
+        response = test_client.get("/lead-names")
+    assert response.status_code == 200
+    assert "server-timing" not in response.headers
@@ -0,0 +1,75 @@
+"""
+Tests for read-replica routing with a second SQLite database as the replica
+"""
+import asyncio
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+import core.database
+from conftest import TEST_DB_DIR, auth_headers
+from core.database import Base, replica_state
+from models.lead import Lead
+from models.replica_heartbeat import ReplicaHeartbeat
+from models.user import UserRole
+from services.replica_monitor import check_replica
+
+REPLICA_PATH = os.path.join(TEST_DB_DIR, "tracklie_replica.db")
+
+
+@pytest.fixture
+def replica(monkeypatch):
+    """Empty replica database wired into the routing session"""
+    sync_engine = create_engine(f"sqlite:///{REPLICA_PATH}")
+    Base.metadata.drop_all(bind=sync_engine)
+    Base.metadata.create_all(bind=sync_engine)
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{REPLICA_PATH}")
+    monkeypatch.setattr(core.database, "replica_engine", async_engine)
+    monkeypatch.setattr(replica_state, "healthy", True)
+    session = sessionmaker(bind=sync_engine)()
+    yield session, async_engine
+    session.close()
+    sync_engine.dispose()
+    asyncio.run(async_engine.dispose())
+
+
+def test_reads_go_to_replica_and_writes_to_primary(client, db, make_user, replica):
+    replica_db, _ = replica
+    admin = make_user(UserRole.ADMIN)
+    primary_lead = Lead(name="Primary Lead", phone="9000000001")
+    db.add(primary_lead)
+    db.commit()
+    replica_db.add(Lead(name="Replica Lead", phone="9000000002"))
+    replica_db.commit()
+    headers = auth_headers(admin)
+
+    names = [lead["name"] for lead in client.get("/leads/", headers=headers).json()["leads"]]
+    assert names == ["Replica Lead"]
+
+    # Writes (and the permission check before them) use the primary
+    response = client.put(f"/leads/{primary_lead.id}", json={"company": "Acme"}, headers=headers)
+    assert response.status_code == 200
+    assert response.json()["name"] == "Primary Lead"
+
+    replica_state.healthy = False
+    names = [lead["name"] for lead in client.get("/leads/", headers=headers).json()["leads"]]
+    assert names == ["Primary Lead"]
+
+
+def test_lag_check_falls_back_until_replica_catches_up(replica):
+    replica_db, replica_async_engine = replica
+
+    assert asyncio.run(check_replica(engine=replica_async_engine)) is False  # no heartbeat replicated yet
+
+    replica_db.add(ReplicaHeartbeat(id=1, beat_at=datetime.utcnow() - timedelta(minutes=5)))
+    replica_db.commit()
+    assert asyncio.run(check_replica(engine=replica_async_engine)) is False
+    assert replica_state.lag_seconds > 250
+
+    replica_db.query(ReplicaHeartbeat).update({"beat_at": datetime.utcnow()})
+    replica_db.commit()
+    assert asyncio.run(check_replica(engine=replica_async_engine)) is True
@@ -0,0 +1,53 @@
+"""
+Tests for the explicit schema migration and the startup version check
+"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+
+from conftest import app
+from core.database import Base, engine
+from core.schema import (
+    SCHEMA_VERSION,
+    SchemaVersionError,
+    check_schema_version,
+    get_schema_version,
+    migrate,
+)
+from models.schema_version import SchemaVersion
+
+
+def test_migrate_creates_tables_indexes_and_stamps_version():
+    Base.metadata.drop_all(bind=engine)
+    assert asyncio.run(get_schema_version()) is None
+
+    migrate(engine)
+    assert "leads" in inspect(engine).get_table_names()
+    assert asyncio.run(get_schema_version()) == SCHEMA_VERSION
+
+    # A later run only adds what is missing
+    with engine.begin() as connection:
+        connection.execute(text("DROP INDEX ix_leads_status_created_at_id"))
+    assert migrate(engine) == ["ix_leads_status_created_at_id"]
+    assert migrate(engine) == []
+
+
+def test_check_schema_version_modes(caplog):
+    assert asyncio.run(check_schema_version(mode="strict")) == SCHEMA_VERSION
+
+    with engine.begin() as connection:
+        connection.execute(SchemaVersion.__table__.update().values(version=SCHEMA_VERSION - 1))
+    with pytest.raises(SchemaVersionError):
+        asyncio.run(check_schema_version(mode="strict"))
+    assert asyncio.run(check_schema_version(mode="warn")) == SCHEMA_VERSION - 1
+    assert "run `python migrate.py`" in caplog.text
+    assert asyncio.run(check_schema_version(mode="off")) is None
+
+
+def test_app_refuses_to_start_on_unmigrated_database():
+    SchemaVersion.__table__.drop(bind=engine)
+    with pytest.raises(SchemaVersionError):
+        with TestClient(app):
+            pass
@@ -0,0 +1,106 @@
+"""
+Tests for refresh tokens and token revocation
+"""
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from conftest import TEST_PASSWORD, auth_headers
+from core.database import AsyncSessionLocal
+from core.token_revocation import BloomFilter, TokenRevocationList, token_revocations
+from models.revoked_token import RevokedToken
+from models.user import UserRole
+
+
+def login(client, user):
+    response = client.post("/auth/login", json={"email": user.email, "password": TEST_PASSWORD})
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_refresh_cookie_issues_new_token_pair(client, make_user):
+    user = make_user(UserRole.SALESPERSON)
+    first = login(client, user)
+
+    response = client.post("/auth/refresh")
+    assert response.status_code == 200
+    body = response.json()
+    assert body["user"]["id"] == user.id
+    assert body["access_token"] != first["access_token"]
+    assert body["refresh_token"] != first["refresh_token"]
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {body['access_token']}"}).status_code == 200
+
+
+def test_refresh_tokens_are_single_use(client, make_user):
+    user = make_user(UserRole.SALESPERSON)
+    refresh_token = login(client, user)["refresh_token"]
+    client.cookies.clear()
+
+    assert client.post("/auth/refresh", json={"refresh_token": refresh_token}).status_code == 200
+    assert client.post("/auth/refresh", json={"refresh_token": refresh_token}).status_code == 401
+
+
+def test_token_types_are_not_interchangeable(client, make_user):
+    user = make_user(UserRole.SALESPERSON)
+    tokens = login(client, user)
+    client.cookies.clear()
+
+    assert client.get("/auth/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]}).status_code == 401
+    assert client.post("/auth/refresh").status_code == 401
+
+
+def test_logout_revokes_access_and_refresh_tokens(client, make_user):
+    user = make_user(UserRole.SALESPERSON)
+    tokens = login(client, user)
+    headers = {"Authorization": f"Bearer {tokens['access_token']}"}
+    assert client.get("/leads/", headers=headers).status_code == 200
+
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+
+    assert client.get("/leads/", headers=headers).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_unrevoked_tokens_skip_the_database(client, make_user):
+    admin = make_user(UserRole.ADMIN)
+    headers = auth_headers(admin)
+    before = token_revocations.stats()
+    for _ in range(5):
+        assert client.get("/leads/", headers=headers).status_code == 200
+
+    stats = token_revocations.stats()
+    assert stats["checks"] - before["checks"] == 5
+    assert stats["filter_hits"] == before["filter_hits"]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [uuid.uuid4().hex for _ in range(1000)]
+    for key in keys:
+        bloom.add(key)
+
+    assert all(key in bloom for key in keys)
+    false_positives = sum(uuid.uuid4().hex in bloom for _ in range(10000))
+    assert false_positives < 300
+
+
+def test_sync_picks_up_revocations_from_other_workers(db):
+    now = datetime.utcnow()
+
+    async def run():
+        revocations = TokenRevocationList(capacity=100, error_rate=0.01)
+        async with AsyncSessionLocal() as session:
+            await revocations.load(session)
+            db.add(RevokedToken(jti="other-worker", token_type="access", revoked_at=datetime.utcnow(),
+                                expires_at=now + timedelta(minutes=5)))
+            db.add(RevokedToken(jti="expired", token_type="access", revoked_at=now - timedelta(days=2),
+                                expires_at=now - timedelta(days=1)))
+            db.commit()
+            before_sync = await revocations.is_revoked(session, "other-worker")
+            await revocations.sync(session)
+            after_sync = await revocations.is_revoked(session, "other-worker")
+            purged = await revocations.purge_expired(session)
+        return before_sync, after_sync, purged
+
+    assert asyncio.run(run()) == (False, True, 1)
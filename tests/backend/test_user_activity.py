@@ -0,0 +1,110 @@
+"""
+Tests for write-behind last_login updates
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from conftest import TEST_PASSWORD
+from core.database import async_engine
+from main import app
+from models.user import User, UserRole
+from services.user_activity import UserActivityBuffer, user_activity
+
+
+def test_login_does_not_write_and_shutdown_flushes(make_user, db):
+    user = make_user(UserRole.SALESPERSON)
+    writes = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if "users" in statement and not statement.lstrip().upper().startswith("SELECT"):
+            writes.append(statement)
+
+    with TestClient(app) as client:
+        event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = client.post("/auth/login", json={"email": user.email, "password": TEST_PASSWORD})
+        finally:
+            event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        assert response.status_code == 200
+        assert response.json()["user"]["last_login"] is not None
+        assert writes == []
+        assert user_activity.pending_count() == 1
+
+    # Leaving the client runs the lifespan shutdown, which flushes the buffer
+    assert user_activity.pending_count() == 0
+    db.expire_all()
+    assert db.get(User, user.id).last_login is not None
+
+
+def test_buffer_keeps_latest_timestamp_and_flushes_in_bulk(make_user, db):
+    users = [make_user(UserRole.SALESPERSON) for _ in range(3)]
+    buffer = UserActivityBuffer(flush_interval=60, max_entries=100)
+    now = datetime(2024, 1, 1, 9, 0)
+    for user in users:
+        buffer.record(user.id, at=now)
+    buffer.record(users[0].id, at=now + timedelta(minutes=5))
+    buffer.record(users[0].id, at=now - timedelta(minutes=5))
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        assert asyncio.run(buffer.flush()) == 3
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+    assert [s for s in statements if s.startswith("UPDATE")] == [statements[0]]
+    db.expire_all()
+    assert db.get(User, users[0].id).last_login.replace(tzinfo=None) == now + timedelta(minutes=5)
+    assert db.get(User, users[1].id).last_login.replace(tzinfo=None) == now
+
+
+def test_threshold_wakes_the_worker(make_user, db):
+    users = [make_user(UserRole.SALESPERSON) for _ in range(2)]
+
+    async def run():
+        buffer = UserActivityBuffer(flush_interval=60, max_entries=2)
+        await buffer.start()
+        for user in users:
+            buffer.record(user.id)
+        for _ in range(100):
+            if buffer.written == 2:
+                break
+            await asyncio.sleep(0.01)
+        await buffer.stop()
+        return buffer.written
+
+    assert asyncio.run(run()) == 2
+
+
+def test_missing_user_does_not_block_the_batch(make_user, db):
+    user = make_user(UserRole.SALESPERSON)
+    buffer = UserActivityBuffer(flush_interval=60, max_entries=100)
+    now = datetime(2024, 1, 1, 9, 0)
+    buffer.record(user.id, at=now)
+    buffer.record(999999, at=now)
+
+    assert asyncio.run(buffer.flush()) == 1
+    assert buffer.pending_count() == 0
+    db.expire_all()
+    assert db.get(User, user.id).last_login.replace(tzinfo=None) == now
+
+
+def test_failing_timestamps_are_dropped_after_max_attempts(make_user):
+    def broken_session():
+        raise RuntimeError("database unavailable")
+
+    buffer = UserActivityBuffer(flush_interval=60, max_entries=100, max_attempts=2, session_factory=broken_session)
+    buffer.record(make_user(UserRole.SALESPERSON).id)
+
+    assert asyncio.run(buffer.flush()) == 0
+    assert buffer.pending_count() == 1
+    assert asyncio.run(buffer.flush()) == 0
+    assert buffer.pending_count() == 0
+    assert buffer.dropped == 1
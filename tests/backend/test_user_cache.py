@@ -0,0 +1,101 @@
+"""
+Tests for the auth caches (user principals and verified tokens)
+"""
+from datetime import timedelta
+
+import core.auth
+from conftest import auth_headers
+from core.auth import create_access_token, hash_token, verified_token_cache
+from core.cache import ExpiringLRUCache
+from core.user_cache import UserPrincipal, user_principal_cache
+from models.user import User, UserRole
+
+
+def principal(user_id, role=UserRole.SALESPERSON):
+    return UserPrincipal(id=user_id, email=f"u{user_id}@example.com", name="U", role=role, is_active=True)
+
+
+def test_cache_counts_hits_and_misses_and_evicts_lru():
+    cache = ExpiringLRUCache(max_size=2, ttl_seconds=60)
+    assert cache.get(1) is None
+    cache.put(1, principal(1))
+    cache.put(2, principal(2))
+    assert cache.get(1).id == 1
+    cache.put(3, principal(3))  # evicts 2, the least recently used
+
+    assert cache.get(2) is None
+    assert cache.get(3).id == 3
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = ExpiringLRUCache(max_size=10, ttl_seconds=60)
+    cache.put(1, principal(1), ttl_seconds=0)
+    cache.put(2, principal(2), ttl_seconds=-5)
+    assert cache.get(1) is None
+    assert cache.get(2) is None
+
+
+def test_repeated_requests_hit_the_cache(client, make_user):
+    admin = make_user(UserRole.ADMIN)
+    before = user_principal_cache.stats()
+    for _ in range(3):
+        assert client.get("/leads/", headers=auth_headers(admin)).status_code == 200
+
+    stats = client.get("/auth/cache-stats", headers=auth_headers(admin)).json()["users"]
+    assert stats["misses"] - before["misses"] == 1
+    assert stats["hits"] - before["hits"] == 3
+
+
+def test_deactivation_and_role_change_take_effect_immediately(client, db, make_user):
+    agent = make_user(UserRole.SALESPERSON)
+    headers = auth_headers(agent)
+    assert client.get("/leads/", headers=headers).status_code == 200
+    assert user_principal_cache.get(agent.id).role == UserRole.SALESPERSON
+
+    user = db.get(User, agent.id)
+    user.role = UserRole.ADMIN
+    db.commit()
+    assert user_principal_cache.get(agent.id) is None
+    assert client.get("/auth/cache-stats", headers=headers).status_code == 200
+
+    user.is_active = False
+    db.commit()
+    assert client.get("/leads/", headers=headers).status_code == 400
+
+
+def test_cache_stats_require_admin(client, make_user):
+    agent = make_user(UserRole.SALESPERSON)
+    assert client.get("/auth/cache-stats", headers=auth_headers(agent)).status_code == 403
+
+
+def test_token_is_verified_once_and_cached_until_exp(client, make_user, monkeypatch):
+    admin = make_user(UserRole.ADMIN)
+    headers = auth_headers(admin)
+    decodes = []
+    original_decode = core.auth.jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        decodes.append(1)
+        return original_decode(*args, **kwargs)
+
+    monkeypatch.setattr(core.auth.jwt, "decode", counting_decode)
+    for _ in range(3):
+        assert client.get("/leads/", headers=headers).status_code == 200
+    assert len(decodes) == 1
+
+    token = headers["Authorization"].split()[1]
+    assert verified_token_cache.get(hash_token(token)).user_id == admin.id
+
+
+def test_expired_token_is_not_cached(client, make_user):
+    admin = make_user(UserRole.ADMIN)
+    token = create_access_token(
+        {"sub": str(admin.id), "email": admin.email, "role": admin.role.value},
+        expires_delta=timedelta(seconds=-1)
+    )
+    response = client.get("/leads/", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 401
+    assert verified_token_cache.get(hash_token(token)) is None
@@ -0,0 +1,57 @@
+"""
+Tests for the queued, batched webhook ingestion pipeline
+"""
+import time
+
+from conftest import auth_headers
+from models.lead import Lead
+from models.user import UserRole
+from services.lead_counter_service import find_counter_drift
+from services.webhook_ingestion import webhook_queue
+
+WEBHOOK_KEY = "webhook_key_123"
+
+
+def wait_for_ingestion(client, ingestion_id, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        body = client.get(f"/leads/webhook/ingestions/{ingestion_id}", params={"key": WEBHOOK_KEY}).json()
+        if body["status"] != "queued":
+            return body
+        time.sleep(0.05)
+    raise AssertionError(f"ingestion {ingestion_id} did not finish")
+
+
+def test_bulk_webhook_is_queued_and_inserted_in_batches(client, db, make_user):
+    batches_before = webhook_queue.batches
+    payload = [{"name": f"FB Lead {i}", "phone": f"98000{i:05d}", "source": "facebook"} for i in range(450)]
+
+    response = client.post("/leads/webhook/bulk", params={"key": WEBHOOK_KEY}, json=payload)
+    assert response.status_code == 202
+    assert response.json()["accepted"] == 450
+
+    result = wait_for_ingestion(client, response.json()["ingestion_id"])
+    assert result["status"] == "completed"
+    assert len(result["lead_ids"]) == 450
+    assert webhook_queue.batches - batches_before == 3  # batch size 200
+
+    assert db.query(Lead).count() == 450
+    assert find_counter_drift(db) == {}
+
+    stats = client.get("/leads/webhook/queue", headers=auth_headers(make_user(UserRole.ADMIN))).json()
+    assert stats["depth"] == 0
+    assert stats["running"] is True
+
+
+def test_single_async_webhook_maps_unknown_source_to_other(client, db):
+    response = client.post("/leads/webhook/async", params={"key": WEBHOOK_KEY}, json={"name": "Web", "phone": "9811111111"})
+    assert response.status_code == 202
+
+    result = wait_for_ingestion(client, response.json()["ingestion_id"])
+    assert result["created"] == 1
+    assert db.get(Lead, result["lead_ids"][0]).source.value == "other"
+
+
+def test_webhook_rejects_bad_key(client):
+    response = client.post("/leads/webhook/bulk", params={"key": "nope"}, json=[{"name": "X", "phone": "9811111111"}])
+    assert response.status_code == 401